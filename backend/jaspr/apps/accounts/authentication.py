@@ -1,12 +1,20 @@
-from .models import LogUserLoginAttempts
+from django.utils import timezone
+
+from .jobs import create_login_attempt_log
+from .login_attempts import clear_login_failures, record_login_failure
 
 
 def log_login_attempt(
     user_id: int, ip: str, was_successful: bool, locked_out: bool
-) -> LogUserLoginAttempts:
-    return LogUserLoginAttempts.objects.create(
-        user_id=user_id,
-        ip_address=ip,
-        was_successful=was_successful,
-        locked_out=locked_out,
+) -> None:
+    """
+    Update the failed login counters (see `jaspr.apps.accounts.login_attempts`) and
+    queue the `LogUserLoginAttempts` creation.
+    """
+    if was_successful:
+        clear_login_failures(user_id)
+    else:
+        record_login_failure(user_id, ip)
+    create_login_attempt_log.delay(
+        user_id, ip, was_successful, locked_out, timezone.now()
     )
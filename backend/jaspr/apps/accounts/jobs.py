@@ -0,0 +1,24 @@
+import datetime
+from typing import Optional
+
+from django_rq.decorators import job
+
+from .models import LogUserLoginAttempts
+
+
+@job
+def create_login_attempt_log(
+    user_id: int,
+    ip: Optional[str],
+    was_successful: bool,
+    locked_out: bool,
+    attempted_at: datetime.datetime,
+) -> None:
+    log = LogUserLoginAttempts.objects.create(
+        user_id=user_id,
+        ip_address=ip,
+        was_successful=was_successful,
+        locked_out=locked_out,
+    )
+    # `date_time` is `auto_now`, so it's set to the time of the attempt separately.
+    LogUserLoginAttempts.objects.filter(pk=log.pk).update(date_time=attempted_at)
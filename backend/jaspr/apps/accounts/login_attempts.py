@@ -0,0 +1,130 @@
+"""
+Failed login counters for the lockout checks.
+
+Instead of counting `LogUserLoginAttempts` rows, failed logins are counted in the cache
+(Redis), so a check is one `get_many` no matter how many attempts there were.
+
+- The failed logins of each `User` since their last successful login are counted, with
+  the time of the last one, without expiring (cleared by `clear_login_failures`). A
+  `User` is locked out (see `LoginBaseSerializer.validate_unauthenticated_user`) on a
+  failed login after `LOCKOUT_FAILURES` failed logins, if the last one was within
+  `LOCKOUT_RECENCY`. A count that isn't cached (E.g. after the cache was cleared) is
+  loaded from the `LogUserLoginAttempts` rows.
+- The failed logins of each IP address are counted over a sliding window of
+  `LOGIN_FAILURE_WINDOW_SECONDS`, split into `LOGIN_FAILURE_BUCKETS` buckets, each an
+  atomically incremented counter that expires after the window. Logins from an IP
+  address with `LOGIN_FAILURES_PER_IP_LIMIT` failed logins in the window (E.g.
+  credential stuffing) are refused without checking the credentials.
+
+`LogUserLoginAttempts` is still written for every attempt (asynchronously, see
+`log_login_attempt`), as the audit log.
+"""
+import datetime
+import time
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import LogUserLoginAttempts
+
+LOGIN_FAILURE_WINDOW_SECONDS = 60 * 15
+LOGIN_FAILURE_BUCKETS = 15
+# Lock after five attempts, when there are four unsuccessful attempts, that is the
+# fifth attempt.
+LOCKOUT_FAILURES = 4
+# ...and the last unsuccessful attempt was this recent.
+LOCKOUT_RECENCY = datetime.timedelta(minutes=15)
+
+
+def get_bucket_keys(scope: str, identifier) -> List[str]:
+    """Return the keys of the buckets in the window, the current one first."""
+    bucket_seconds = LOGIN_FAILURE_WINDOW_SECONDS // LOGIN_FAILURE_BUCKETS
+    current = int(time.time()) // bucket_seconds
+    return [
+        f"login-failures:{scope}:{identifier}:{bucket}"
+        for bucket in range(current, current - LOGIN_FAILURE_BUCKETS, -1)
+    ]
+
+
+def increment(scope: str, identifier) -> None:
+    key = get_bucket_keys(scope, identifier)[0]
+    cache.add(key, 0, LOGIN_FAILURE_WINDOW_SECONDS)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Expired between `add` and `incr`.
+        cache.set(key, 1, LOGIN_FAILURE_WINDOW_SECONDS)
+
+
+def count(scope: str, identifier) -> int:
+    return sum(cache.get_many(get_bucket_keys(scope, identifier)).values())
+
+
+def get_user_keys(user_id: int) -> Tuple[str, str]:
+    """Return the keys of the `User`'s failed login count and last failed login."""
+    return f"login-failures:user:{user_id}", f"login-failures:user:{user_id}:last"
+
+
+def load_login_failures(user_id: int) -> Tuple[int, Optional[datetime.datetime]]:
+    """
+    Count the `User`'s failed logins since their last successful one from the
+    `LogUserLoginAttempts` rows.
+    """
+    last_success = (
+        LogUserLoginAttempts.objects.filter(user_id=user_id, was_successful=True)
+        .order_by("-date_time")
+        .values_list("date_time", flat=True)
+        .first()
+    )
+    failures = LogUserLoginAttempts.objects.filter(user_id=user_id, was_successful=False)
+    if last_success is not None:
+        failures = failures.filter(date_time__gte=last_success)
+    aggregate = failures.aggregate(count=Count("pk"), last=Max("date_time"))
+    return aggregate["count"], aggregate["last"]
+
+
+def get_login_failures(user_id: int) -> Tuple[int, Optional[datetime.datetime]]:
+    """
+    Return the number of failed logins of the `User` since their last successful one,
+    and the time of the last failed login.
+    """
+    count_key, last_key = get_user_keys(user_id)
+    cached = cache.get_many([count_key, last_key])
+    if count_key in cached:
+        return cached[count_key], cached.get(last_key)
+    failures, last_failure = load_login_failures(user_id)
+    # Not `set_many`, so failed logins counted in the meantime aren't overwritten.
+    cache.add(last_key, last_failure, None)
+    cache.add(count_key, failures, None)
+    return failures, last_failure
+
+
+def record_login_failure(user_id: Optional[int], ip: Optional[str]) -> None:
+    if user_id is not None:
+        # Loads the count, if it isn't cached, before incrementing it.
+        get_login_failures(user_id)
+        count_key, last_key = get_user_keys(user_id)
+        try:
+            cache.incr(count_key)
+        except ValueError:
+            # Evicted since it was loaded.
+            cache.set(count_key, 1, None)
+        cache.set(last_key, timezone.now(), None)
+    if ip:
+        increment("ip", ip)
+
+
+def clear_login_failures(user_id: int) -> None:
+    """Called on a successful login, failed logins only count since the last one."""
+    count_key, last_key = get_user_keys(user_id)
+    cache.set_many({count_key: 0, last_key: None}, None)
+
+
+def is_ip_blocked(ip: Optional[str]) -> bool:
+    limit = settings.LOGIN_FAILURES_PER_IP_LIMIT
+    if not ip or not limit:
+        return False
+    return count("ip", ip) >= limit
@@ -1,14 +1,19 @@
 import datetime
 import logging
-import operator
 from typing import ClassVar, Sequence, Type
 
 from django.utils import timezone
 from ipware import get_client_ip
 from rest_framework import permissions
 
-from jaspr.apps.clinics.models import Clinic
-from jaspr.apps.kiosk.models import Encounter, Patient
+from jaspr.apps.clinics.ip_whitelist import (
+    IPWhitelist,
+    get_ip_whitelists,
+    get_technician_clinic_ids,
+    parse_ip_address,
+)
+from jaspr.apps.kiosk import heartbeats
+from jaspr.apps.kiosk.models import Patient
 from jaspr.apps.kiosk.tokens import (
     JasprExtraSecurityTokenGenerator,
     JasprSetPasswordTokenGenerator,
@@ -92,16 +97,17 @@ class SatisfiesClinicIPWhitelisting(permissions.BasePermission):
     log a warning.
     """
 
-    def get_clinics(
+    def get_ip_whitelists(
         self, request, view
-    ) -> Sequence[Clinic]:  # pragma: no cover
+    ) -> Sequence[IPWhitelist]:  # pragma: no cover
+        """Return the compiled `IPWhitelist` of each relevant `Clinic`."""
         raise NotImplementedError("Subclasses must define this method.")
 
     def has_permission(self, request, view):
-        clinics = self.get_clinics(request, view)
+        ip_whitelists = self.get_ip_whitelists(request, view)
         # NOTE: If all the `Technician` records (the example right now) are set up
         # properly, this should not happen.
-        if not clinics:
+        if not ip_whitelists:
             logger.warning(
                 "(permission=%s, request=%s, view=%s) No departments returned.",
                 str(self),
@@ -109,10 +115,10 @@ class SatisfiesClinicIPWhitelisting(permissions.BasePermission):
                 str(view),
             )
             return False
-        locations_with_whitelisting = [
-            location for location in clinics if location.has_ip_whitelisting
+        ip_whitelists_with_whitelisting = [
+            ip_whitelist for ip_whitelist in ip_whitelists if not ip_whitelist.is_empty
         ]
-        if not locations_with_whitelisting:
+        if not ip_whitelists_with_whitelisting:
             return True
         client_ip = get_client_ip(request)[0]
         if client_ip is None:
@@ -123,8 +129,9 @@ class SatisfiesClinicIPWhitelisting(permissions.BasePermission):
                 str(view),
             )
             return False
-        for location in locations_with_whitelisting:
-            if location.ip_satisfies_whitelisting(client_ip):
+        client_ip_address = parse_ip_address(client_ip)
+        for ip_whitelist in ip_whitelists_with_whitelisting:
+            if ip_whitelist.contains(client_ip_address):
                 return True
         return False
 
@@ -132,24 +139,18 @@ class SatisfiesClinicIPWhitelisting(permissions.BasePermission):
 class SatisfiesClinicIPWhitelistingFromTechnician(
     SatisfiesClinicIPWhitelisting
 ):
-    def get_clinics(self, request, view) -> Sequence[Clinic]:
-
-        return list(
-            map(
-                operator.attrgetter("department.clinic"),
-                request.user.technician.departmenttechnician_set.filter(
-                    status="active"
-                ).select_related("department").select_related("department__clinic"),
-            )
-        )
+    def get_ip_whitelists(self, request, view) -> Sequence[IPWhitelist]:
+        # Both lookups are cached, see `jaspr.apps.clinics.ip_whitelist`.
+        clinic_ids = get_technician_clinic_ids(request.user.technician.pk)
+        return list(get_ip_whitelists(clinic_ids).values())
 
 
 class SatisfiesClinicIPWhitelistingFromPatient(
     SatisfiesClinicIPWhitelisting
 ):
-    def get_clinics(self, request, view) -> Sequence[Clinic]:
+    def get_ip_whitelists(self, request, view) -> Sequence[IPWhitelist]:
         encounter = request.user.patient.current_encounter
-        return [encounter.department.clinic]
+        return [encounter.department.clinic.ip_whitelist]
 
 
 class HasRecentHeartbeat(permissions.BasePermission):
@@ -172,7 +173,7 @@ class HasRecentHeartbeat(permissions.BasePermission):
         if not encounter:
             return False
 
-        last_heartbeat = encounter.last_heartbeat
+        last_heartbeat = heartbeats.get_last_heartbeat(encounter)
         ten_minutes = datetime.timedelta(minutes=10)
         now = timezone.now()
 
@@ -188,8 +189,9 @@ class HasRecentHeartbeat(permissions.BasePermission):
             # updating because of pass-by-reference (just in case)
             encounter.last_heartbeat = now
 
-            # update last_heartbeat without causing a simple history record.
-            Encounter.objects.filter(pk=encounter.pk).update(last_heartbeat=now)
+            # Recorded in the cache and written to the database in batches, see
+            # `jaspr.apps.kiosk.heartbeats`.
+            heartbeats.set_heartbeat(encounter.pk, now)
             return True
         return False
 
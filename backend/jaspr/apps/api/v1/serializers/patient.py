@@ -6,7 +6,7 @@ from typing import Any, Dict, Literal
 
 from django.conf import settings
 from django.contrib.auth.models import BaseUserManager, Group
-from django.db import transaction
+from django.db import models, transaction
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework import serializers
@@ -285,6 +285,18 @@ class ActivateExistingPatientSerializer(TechnicianDepartmentSerializer):
         return validated_data["patient"]
 
 
+class ReadOnlyTechnicianPatientListSerializer(serializers.ListSerializer):
+    """
+    Loads the `current_encounter` of all of the `Patient`s at once (see
+    `Patient.load_current_encounters`) before serializing each of them.
+    """
+
+    def to_representation(self, data):
+        patients = list(data.all() if isinstance(data, models.Manager) else data)
+        Patient.load_current_encounters(patients)
+        return super().to_representation(patients)
+
+
 class ReadOnlyTechnicianPatientSerializer(JasprBaseModelSerializer, TechnicianDepartmentBaseSerializerMixin):
     created = serializers.SerializerMethodField()
     email = serializers.SerializerMethodField()
@@ -311,7 +323,7 @@ class ReadOnlyTechnicianPatientSerializer(JasprBaseModelSerializer, TechnicianDe
 
     def get_current_encounter_department(self, patient: Patient):
         try:
-            return patient.current_encounter.department.pk
+            return patient.current_encounter.department_id
         except AttributeError:
             return None
 
@@ -358,10 +370,11 @@ class ReadOnlyTechnicianPatientSerializer(JasprBaseModelSerializer, TechnicianDe
     def get_activities(self, obj: Patient):
         encounter = obj.current_encounter
         if encounter:
+            activity_types = encounter.activity_types
             return {
-                "csp": encounter.has_activity(ActivityType.StabilityPlan),
-                "csa": encounter.has_activity(ActivityType.SuicideAssessment),
-                "skills": encounter.has_activity(ActivityType.ComfortAndSkills)
+                "csp": ActivityType.StabilityPlan in activity_types,
+                "csa": ActivityType.SuicideAssessment in activity_types,
+                "skills": ActivityType.ComfortAndSkills in activity_types,
             }
         return {
             "csp": False,
@@ -394,6 +407,7 @@ class ReadOnlyTechnicianPatientSerializer(JasprBaseModelSerializer, TechnicianDe
             "analytics_token",
         ]
         read_only_fields = fields
+        list_serializer_class = ReadOnlyTechnicianPatientListSerializer
 
 
 class PatientSerializer(TechnicianDepartmentListSerializer, JasprBaseModelSerializer):
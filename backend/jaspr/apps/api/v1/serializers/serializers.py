@@ -13,7 +13,14 @@ from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
 
 from jaspr.apps.accounts.authentication import log_login_attempt
-from jaspr.apps.accounts.models import LogUserLoginAttempts, User
+from jaspr.apps.accounts.login_attempts import (
+    LOCKOUT_FAILURES,
+    LOCKOUT_RECENCY,
+    get_login_failures,
+    is_ip_blocked,
+    record_login_failure,
+)
+from jaspr.apps.accounts.models import User
 from jaspr.apps.clinics.models import Department
 from jaspr.apps.common.functions import check_password_complexity
 from jaspr.apps.common.jobs.rq import enqueue_in
@@ -30,6 +37,10 @@ from jaspr.apps.kiosk.emails import (
     send_tools_to_go_confirmation_email,
     send_tools_to_go_setup_email,
 )
+from jaspr.apps.kiosk.content_catalog import (
+    CUSTOM_COPING_STRATEGY_MEDIA_NAME,
+    get_content_catalog,
+)
 from jaspr.apps.kiosk.jobs import check_and_resend_tools_to_go_setup_email
 from jaspr.apps.kiosk.models import (
     Action,
@@ -59,6 +70,7 @@ from jaspr.apps.kiosk.validators import (
 from ....awsmedia.models import Media, PrivacyScreenImage
 from ....jah.models import CommonConcern, ConversationStarter
 from ....stability_plan.models import PatientWalkthroughStep
+from ....stability_plan.jobs import build_patient_walkthroughs
 from ..permissions import (
     SatisfiesClinicIPWhitelisting,
     SatisfiesClinicIPWhitelistingFromTechnician,
@@ -116,20 +128,6 @@ class LoginBaseSerializer(JasprBaseSerializer):
         "ip_not_permitted": "You are not permitted to login from this location."
     }
 
-    def _get_login_attempts(self, user, was_successful, date_time=None):
-        # date_time must have a value so if not set by call, set here;
-        # cannot set before the call
-        if not date_time:
-            date_time = timezone.make_aware(
-                datetime.datetime.strptime("10/01/15 00:00", "%m/%d/%y %H:%M")
-            )
-
-        log = LogUserLoginAttempts.objects.filter(
-            user=user, was_successful=was_successful, date_time__gte=date_time
-        ).order_by("date_time")
-
-        return log
-
     def validate_authenticated_user(self, user):
         if not user.is_active:
             return False, False, "User account is disabled."
@@ -156,29 +154,15 @@ class LoginBaseSerializer(JasprBaseSerializer):
         if user.account_locked_at:
             return user, False, True, "Credentials invalid."
 
-        # Check for lock out conditions
-        # Only fails since last successful
-        last_success_datetime = list(
-            self._get_login_attempts(user.id, was_successful=True)
-        )
-
-        if last_success_datetime:
-            last_success_datetime = last_success_datetime[-1].date_time
-        else:
-            last_success_datetime = None
-
-        total_failed_attempts = list(
-            self._get_login_attempts(user.id, False, last_success_datetime)
-        )
-
-        if len(total_failed_attempts) >= 4:
+        # Check for lock out conditions (failed logins since the last successful one,
+        # see `jaspr.apps.accounts.login_attempts`).
+        failures, last_failure = get_login_failures(user.id)
+        if failures >= LOCKOUT_FAILURES:
             # Lock after five attempts, when there are four
             # unsuccessful attempts, that is the 5th attempt
-            # since the failed attempt is not logged until after
+            # since the failed attempt is not counted until after
             # this check
-            if (
-                    timezone.now() - total_failed_attempts[-1].date_time
-            ).seconds / 60 <= 15:
+            if timezone.now() - last_failure <= LOCKOUT_RECENCY:
                 user.account_locked_at = timezone.now()
                 user.save()
 
@@ -197,6 +181,10 @@ class LoginBaseSerializer(JasprBaseSerializer):
             msg = "Need both password and user name."
             raise serializers.ValidationError(msg)
 
+        ip = get_client_ip(self.context["request"])[0]
+        if is_ip_blocked(ip):
+            raise serializers.ValidationError("Credentials invalid.")
+
         user = authenticate(self.context["request"], **credentials)
 
         if user:
@@ -222,8 +210,9 @@ class LoginBaseSerializer(JasprBaseSerializer):
 
         # TODO Should we also log attempts that were not associated with a valid user?
         if user:
-            ip = get_client_ip(self.context["request"])[0]
             log_login_attempt(user.pk, ip, was_successful, locked_out)
+        else:
+            record_login_failure(None, ip)
 
         if not was_successful:
             raise serializers.ValidationError(msg)
@@ -662,10 +651,19 @@ class ReadOnlyActivitySerializer(JasprBaseModelSerializer):
         # together constraints, and since `Activity` objects are always
         # retrieved right now from a corresponding authenticated user,
         # we know that this prefetched list has either zero or one instance within it.
-        if not obj.patient_activities:
+        # Without it (E.g. in the `ContentCatalog`), the representation is that of an
+        # `Activity` without a patient activity.
+        patient_activities = getattr(obj, "patient_activities", None)
+        return self.add_patient_activity(
+            representation, patient_activities[0] if patient_activities else None
+        )
+
+    @staticmethod
+    def add_patient_activity(representation, patient_activity: Optional[PatientActivity]):
+        if patient_activity is None:
             representation["patient_activity"] = None
             return representation
-        nested_data = ReadOnlyPatientActivitySerializer(obj.patient_activities[0]).data
+        nested_data = ReadOnlyPatientActivitySerializer(patient_activity).data
         representation["patient_activity"] = nested_data.pop("id")
         representation.update(nested_data)
         return representation
@@ -1024,6 +1022,11 @@ class PatientSetPasswordSerializer(
 
                 instance.user.save()
                 instance.save()
+                # Build the walkthrough from the new plan before it's first requested.
+                patient_id = instance.pk
+                transaction.on_commit(
+                    lambda: build_patient_walkthroughs.delay([patient_id])
+                )
             send_tools_to_go_confirmation_email(instance.user)
         else:
             instance.user.save()
@@ -1243,12 +1246,8 @@ class ReadOnlyGenericCopingStrategySerializer(JasprBaseSerializer):
         if hasattr(obj, "image"):
             return obj.image.url
         else:
-            try:
-                url = Media.objects.get(name="Custom Coping Strategy").file_field.url
-
-            except Media.DoesNotExist:
-                url = ""
-            return url
+            media = get_content_catalog().get_media_by_name(CUSTOM_COPING_STRATEGY_MEDIA_NAME)
+            return media.file_field.url if media is not None else ""
 
 
 class ActivateTechnicianSerializer(JasprBaseSerializer):
@@ -69,6 +69,37 @@ class TestPatientActionAPI(JasprApiTestCase):
         self.assertGreater(action.timestamp, initial_time)
         self.assertEqual(action.client_timestamp, initial_time)
 
+    def test_valid_actions_posted_together(self):
+        """Can an authenticated patient post several valid actions at once?"""
+        initial_time = timezone.now()
+        response = self.client.post(
+            self.uri,
+            data=[
+                {"action": ActionNames.EXPLORE, "client_timestamp": initial_time},
+                {
+                    "action": ActionNames.ARRIVE,
+                    "section_uid": [*self.encounter.sections_dictionary][0],
+                    "client_timestamp": initial_time,
+                },
+            ],
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Action.objects.filter(patient=self.patient).values_list("action", flat=True)),
+            sorted([ActionNames.EXPLORE, ActionNames.ARRIVE]),
+        )
+
+    def test_invalid_action_posted_together_creates_none(self):
+        """Is nothing created if any of the actions posted at once is invalid?"""
+        response = self.client.post(
+            self.uri,
+            data=[{"action": ActionNames.EXPLORE}, {"action": ActionNames.ARRIVE}],
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Action.objects.exists())
+
     def test_valid_action_with_section_uid(self):
         """Can an authenticated patient post a valid action with a section uid?"""
         initial_time = timezone.now()
@@ -319,7 +350,7 @@ class TestArriveActionAssessmentCurrentSectionUidUpdating(JasprApiTransactionTes
             self.assertEqual(response.data["metadata"]["current_section_uid"], "shameDescribe")
 
         with before_after.before(
-            "jaspr.apps.kiosk.models.Action.save", run_before_arrive
+            "jaspr.apps.kiosk.action_buffer.create_actions", run_before_arrive
         ):
             response = self.client.post(
                 self.create_action_uri,
@@ -369,7 +400,7 @@ class TestArriveActionAssessmentCurrentSectionUidUpdating(JasprApiTransactionTes
     #         self.assertEqual(response.data["metadata"]["current_section_uid"], "ssfaFinish")
     #
     #     with before_after.after(
-    #         "jaspr.apps.kiosk.models.Action.save", run_after_arrive
+    #         "jaspr.apps.kiosk.action_buffer.create_actions", run_after_arrive
     #     ):
     #         response = self.client.post(
     #             self.create_action_uri,
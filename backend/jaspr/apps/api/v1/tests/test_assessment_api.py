@@ -4,6 +4,8 @@ import time
 from datetime import timedelta
 
 import before_after
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from freezegun import freeze_time
@@ -67,6 +69,75 @@ class TestPatientAssessmentAPI(JasprApiTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["metadata"]["current_section_uid"], None)
 
+    def test_interview_encounter_loaded_once(self):
+        """
+        Is the encounter loaded with its state once for the whole request, rather than
+        the activities being loaded one query at a time?
+        """
+        with self.assertQueryBudget(max_queries=12):
+            response = self.client.get("/v1/patient/interview")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+
+        with self.assertQueryBudget(max_queries=8):
+            response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, 200)
+
+    def test_interview_not_modified(self):
+        """
+        Is a GET with the `ETag` of the encounter answered with a 304, without loading
+        the activities, until the interview changes?
+        """
+        for uri in ("/v1/patient/interview", self.uri):
+            response = self.client.get(uri)
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+            self.assertFalse(
+                [query for query in queries if "kiosk_assignedactivity" in query["sql"]]
+            )
+
+            response = self.client.patch(self.uri, data={"rate_psych": 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+            response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_interview_version_bumped(self):
+        """Do locking an activity and assigning activities change the `ETag`?"""
+        etag = self.client.get(self.uri)["ETag"]
+        self.encounter.get_activity(ActivityType.SuicideAssessment).lock()
+        response = self.client.get(self.uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        self.encounter.add_activities([ActivityType.ComfortAndSkills])
+        response = self.client.get(self.uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_answers_changed_since(self):
+        """Does a GET with `since` only have the answers changed since that `ETag`?"""
+        response = self.client.patch(self.uri, data={"rate_psych": 2, "time_here": "Now"})
+        etag = response["ETag"]
+        response = self.client.patch(self.uri, data={"rate_psych": 3, "time_here": "Now"})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.uri, {"since": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["answers"], {"rate_psych": 3})
+        self.assertEqual(response.data["metadata"]["current_section_uid"], "ratePsych")
+
+        response = self.client.get(self.uri, {"since": response["ETag"]})
+        self.assertEqual(response.data["answers"], {})
+        # An `ETag` of another encounter gets all of the answers.
+        response = self.client.get(self.uri, {"since": f'"{self.encounter.pk + 1}.1"'})
+        self.assertEqual(response.data["answers"]["time_here"], "Now")
+
     def test_update_assessment(self):
         """Can the user add answers to assessment?"""
         data = {
@@ -8,6 +8,8 @@ from jaspr.apps.test_infrastructure.permissions_testcases import (
 from jaspr.apps.test_infrastructure.testcases import JasprApiTestCase
 from rest_framework import status
 
+from jaspr.apps.kiosk import heartbeats
+
 from .helpers import assert_kiosk_instance_not_logged_out
 
 
@@ -46,6 +48,12 @@ class TestPatientHeartbeatView(JasprApiTestCase):
         )
         self.encounter.refresh_from_db()
 
+        # The heartbeat is recorded in the cache and written to the database in
+        # batches.
+        self.assertIsNone(self.encounter.last_heartbeat)
+        self.assertEqual(heartbeats.get_last_heartbeat(self.encounter), now)
+        self.assertEqual(heartbeats.flush_heartbeats(), 1)
+        self.encounter.refresh_from_db()
         self.assertEqual(self.encounter.last_heartbeat, now)
 
         # verify that we've only changed the last_heartbeat, and haven't added a history record.
@@ -123,3 +131,40 @@ class TestPatientHeartbeatView(JasprApiTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, response.data)
         assert_kiosk_instance_not_logged_out(self, self.patient, now)
+
+    def test_timeout_uses_cached_heartbeat(self):
+        """
+        Is the cached heartbeat used over the (not yet flushed) database value when
+        checking for a timeout?
+        """
+        self.set_patient_creds(self.patient, in_er=True, encounter=self.encounter)
+        now = timezone.now()
+        with freeze_time(now):
+            response = self.client.post(self.uri, data={})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # Still within 10 minutes of the cached heartbeat.
+        with freeze_time(now + timedelta(minutes=9)):
+            response = self.client.post(self.uri, data={})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        with freeze_time(now + timedelta(minutes=19, seconds=1)):
+            response = self.client.post(self.uri, data={})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_saved_heartbeat_replaces_cached_heartbeat(self):
+        """
+        Does saving a new `last_heartbeat` (E.g. when a lockout is reset) take
+        precedence over a heartbeat in the cache?
+        """
+        self.set_patient_creds(self.patient, in_er=True, encounter=self.encounter)
+        response = self.client.post(self.uri, data={})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        eleven_minutes_ago = timezone.now() - timedelta(minutes=11)
+        self.encounter.last_heartbeat = eleven_minutes_ago
+        self.encounter.save()
+        self.assertEqual(heartbeats.get_last_heartbeat(self.encounter), eleven_minutes_ago)
+
+        response = self.client.post(self.uri, data={})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
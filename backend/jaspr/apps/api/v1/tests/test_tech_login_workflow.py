@@ -1,6 +1,10 @@
 import datetime
 
+from django.core.cache import cache
+from django.test import override_settings
 from django.utils import timezone
+from freezegun import freeze_time
+
 from jaspr.apps.accounts.models import LogUserLoginAttempts, User
 from jaspr.apps.test_infrastructure.testcases import JasprApiTestCase
 
@@ -185,3 +189,96 @@ class TestAccountLock(JasprApiTestCase):
 
         user.refresh_from_db()
         self.assertTrue(user.account_locked_at is None)
+
+    def test_failed_logins_outside_window_no_lockout(self):
+        """
+        If the earlier failed logins were more than 15 minutes ago, is the fifth failed
+        login not a lockout?
+        """
+        data = {
+            "email": self.technician.user.email,
+            "password": "notthisone",
+            "organization_code": "generic",
+        }
+        now = timezone.now()
+        with freeze_time(now - datetime.timedelta(minutes=20)):
+            for _ in range(4):
+                self.client.post(self.uri, data=data)
+        with freeze_time(now):
+            self.client.post(self.uri, data=data)
+
+        self.assertEqual(
+            LogUserLoginAttempts.objects.filter(
+                user=self.technician.user, was_successful=False
+            ).count(),
+            5,
+        )
+        user = User.objects.get(id=self.technician.user.id)
+        self.assertIsNone(user.account_locked_at)
+
+    def test_failed_logins_spread_out_since_last_success_cause_lockout(self):
+        """
+        If the failed logins since the last success were more than 15 minutes apart, is
+        the fifth failed login still a lockout (the fourth being recent)?
+        """
+        data = {
+            "email": self.technician.user.email,
+            "password": "notthisone",
+            "organization_code": "generic",
+        }
+        now = timezone.now()
+        for minutes_ago in (70, 50, 30, 10, 0):
+            with freeze_time(now - datetime.timedelta(minutes=minutes_ago)):
+                self.client.post(self.uri, data=data)
+
+        user = User.objects.get(id=self.technician.user.id)
+        self.assertIsNotNone(user.account_locked_at)
+
+    def test_failed_logins_counted_after_cache_cleared(self):
+        """
+        Are the failed logins since the last success still counted (from the login
+        attempt logs) after the cache was cleared?
+        """
+        data = {
+            "email": self.technician.user.email,
+            "password": "notthisone",
+            "organization_code": "generic",
+        }
+        for _ in range(4):
+            self.client.post(self.uri, data=data)
+        cache.clear()
+        self.client.post(self.uri, data=data)
+
+        user = User.objects.get(id=self.technician.user.id)
+        self.assertIsNotNone(user.account_locked_at)
+
+    @override_settings(LOGIN_FAILURES_PER_IP_LIMIT=3)
+    def test_logins_from_ip_with_too_many_failures_refused(self):
+        """
+        Are logins refused, even with the right credentials, from an IP address with too
+        many failed logins (for any email)?
+        """
+        for loop in range(3):
+            response = self.client.post(
+                self.uri,
+                {
+                    "email": f"nobody{loop}@jasprhealth.com",
+                    "password": "password",
+                    "organization_code": "generic",
+                },
+            )
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            self.uri,
+            {
+                "email": self.technician.user.email,
+                "password": "password",
+                "organization_code": "generic",
+            },
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["non_field_errors"], ["Credentials invalid."])
+        self.assertFalse(
+            LogUserLoginAttempts.objects.filter(user=self.technician.user).exists()
+        )
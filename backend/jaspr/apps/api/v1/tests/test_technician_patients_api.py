@@ -2,6 +2,8 @@ import random
 from datetime import date, timedelta
 import datetime
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 import before_after
 from freezegun import freeze_time
@@ -21,7 +23,8 @@ from .helpers import (
 from jaspr.apps.api.v1.serializers import (
     ActivateNewPatientSerializer,
 )
-from jaspr.apps.kiosk.models import ActivateRecord, Patient
+from jaspr.apps.kiosk.activities.activity_utils import ActivityType
+from jaspr.apps.kiosk.models import ActivateRecord, Patient, RecentPatient
 
 class TestTechnicianPatientsAPIPermissions(JasprTestResourcePermissions):
     """ Test for 401, 403, 404, 405 """
@@ -702,6 +705,86 @@ class TestTechnicianPatientsListAPI(JasprApiTestCase):
             self.assertEqual(data["id"], pk)
             self.assertEqual(data["last_logged_in_at"], latest)
 
+    def test_recent_patients_queries_dont_grow_with_patients(self):
+        """
+        Are the current encounters and their activities of the listed patients loaded
+        at once, instead of for each of them?
+        """
+        department = (
+            self.technician.departmenttechnician_set.select_related("department")
+            .get(department__name="unassigned")
+            .department
+        )
+
+        def add_patient():
+            patient = self.create_patient()
+            self.create_patient_department_sharing(patient=patient, department=department)
+            self.create_patient_encounter(patient=patient, department=department)
+            encounter = self.create_patient_encounter(patient=patient, department=department)
+            encounter.add_activities([ActivityType.SuicideAssessment])
+            return patient, encounter
+
+        add_patient()
+        # What's only loaded by the first request (E.g. authenticating the token).
+        self.client.get(self.uri)
+        with CaptureQueriesContext(connection) as one_patient_queries:
+            self.client.get(self.uri)
+        for _ in range(3):
+            patient, encounter = add_patient()
+        with CaptureQueriesContext(connection) as four_patient_queries:
+            response = self.client.get(self.uri)
+
+        self.assertEqual(len(four_patient_queries), len(one_patient_queries))
+        self.assertEqual(len(response.data), 4)
+        response_dict = next(data for data in response.data if data["id"] == patient.pk)
+        self.assertEqual(response_dict["current_encounter"], encounter.pk)
+        self.assertEqual(response_dict["current_encounter_department"], department.pk)
+        self.assertEqual(
+            response_dict["activities"], {"csp": False, "csa": True, "skills": False}
+        )
+
+    def test_recent_patients_follow_sharing_and_activations(self):
+        """
+        Do the recent patients follow archived sharings, and only activations by
+        technicians of the department's system?
+        """
+        department = (
+            self.technician.departmenttechnician_set.select_related("department")
+            .get(department__name="unassigned")
+            .department
+        )
+        patient = self.create_patient()
+        sharing = self.create_patient_department_sharing(
+            patient=patient, department=department
+        )
+        now = timezone.now()
+        self.create_activate_record(
+            technician=self.technician, patient=patient, timestamp=now
+        )
+        other_system_technician = self.create_technician(
+            system=self.create_healthcare_system(name="Other System")
+        )
+        self.create_activate_record(
+            technician=other_system_technician,
+            patient=patient,
+            timestamp=now + timedelta(minutes=1),
+        )
+
+        response = self.client.get(self.uri)
+        self.assertEqual(response.data[0]["id"], patient.pk)
+        self.assertEqual(response.data[0]["last_logged_in_at"], now)
+        entries = list(RecentPatient.objects.values_list("department", "last_logged_in_at"))
+        RecentPatient.rebuild_for_patient(patient)
+        self.assertEqual(
+            list(RecentPatient.objects.values_list("department", "last_logged_in_at")),
+            entries,
+        )
+
+        sharing.status = "archived"
+        sharing.save()
+        response = self.client.get(self.uri)
+        self.assertEqual(response.data, [])
+
     def test_empty_query(self):
         department = (
             self.technician.departmenttechnician_set.select_related(
@@ -1049,6 +1132,60 @@ class TestTechnicianPatientsListAPI(JasprApiTestCase):
         self.assertEqual(len(response.data), 0)
 
 
+    def test_name_query_matches_close_and_full_names(self):
+        department = (
+            self.technician.departmenttechnician_set.select_related(
+                "department"
+            )
+            .get(department__name="unassigned")
+            .department
+        )
+        patient1 = self.create_patient(first_name="Jonathan", last_name="Smith")
+        patient2 = self.create_patient(first_name="Mary", last_name="Jones")
+        for patient in (patient1, patient2):
+            self.create_patient_department_sharing(patient=patient, department=department)
+            self.create_activate_record(technician=self.technician, patient=patient)
+
+        for q in ("onathan", "Jonathan Smith", "smi"):
+            with self.subTest(q=q):
+                response = self.client.get(self.uri, data={"q": q})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual([p["id"] for p in response.data], [patient1.pk])
+
+        # Short queries match the start of values.
+        response = self.client.get(self.uri, data={"q": "Jo"})
+        self.assertEqual(
+            {p["id"] for p in response.data}, {patient1.pk, patient2.pk}
+        )
+
+    def test_search_index_updated_on_save(self):
+        department = (
+            self.technician.departmenttechnician_set.select_related(
+                "department"
+            )
+            .get(department__name="unassigned")
+            .department
+        )
+        patient = self.create_patient(mrn="OLDMRN123", date_of_birth=date(1980, 4, 2))
+        self.create_patient_department_sharing(patient=patient, department=department)
+        self.create_activate_record(technician=self.technician, patient=patient)
+
+        patient.mrn = "NEWMRN456"
+        patient.date_of_birth = date(1981, 5, 3)
+        patient.save()
+
+        for q, expected in (
+            ("OLDMRN123", []),
+            ("NEWMRN456", [patient.pk]),
+            ("04/02/1980", []),
+            ("05/03/1981", [patient.pk]),
+            ("5/3", [patient.pk]),
+        ):
+            with self.subTest(q=q):
+                response = self.client.get(self.uri, data={"q": q})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual([p["id"] for p in response.data], expected)
+
 class TestTechnicianPatientsViewSetAPI(JasprApiTestCase):
     serializer_class = ActivateNewPatientSerializer
     def setUp(self):
@@ -185,6 +185,44 @@ class TestPatientWalkthroughAPI(JasprApiTestCase):
             obj_data["value"]["id"], patient_walkthrough_step.step.object_id
         )
 
+    def test_steps_served_from_their_payloads(self):
+        """
+        Are the steps served from the payloads serialized when they were built, and
+        serialized again after a step changed?
+        """
+        step = self.create_step(
+            name="Paced Breathing",
+            content_type=None,
+            object_id=None,
+            skip_if_blank=False,
+            frontend_render_type="breathe",
+        )
+        self.create_walkthrough_step(walkthrough=self.walkthrough, step=step)
+        self.manager.handle()
+        patient_walkthrough = PatientWalkthrough.objects.get(
+            patient=self.patient, status="active"
+        )
+        patient_walkthrough.step_payloads[0]["value"] = "From the payloads"
+        PatientWalkthrough.objects.filter(pk=patient_walkthrough.pk).update(
+            step_payloads=patient_walkthrough.step_payloads
+        )
+
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data[0]["value"], "From the payloads")
+
+        step.name = "Breathe"
+        step.save()
+
+        response = self.client.get(self.uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(
+            response.data,
+            [{"step_name": "Breathe", "frontend_render_type": "breathe", "value": None}],
+        )
+        patient_walkthrough.refresh_from_db()
+        self.assertEqual(patient_walkthrough.step_payloads, response.data)
+
     def test_comfort_skills_puppies(self):
         """ Can the Comfort & Skill Video: Puppies (an example of video without description) be seen in walkthrough?"""
         puppy_video = self.create_media(
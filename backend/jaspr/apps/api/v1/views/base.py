@@ -1,6 +1,8 @@
 import logging
 from typing import ClassVar, List, Optional, Tuple, Type
 
+from knox.models import AuthToken
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.request import Request
@@ -8,13 +10,29 @@ from rest_framework import serializers
 
 from jaspr.apps.common.mixins import AssureNonFieldErrorsMixin
 from jaspr.apps.kiosk.models import Patient
-from jaspr.apps.kiosk.authentication import JasprTokenAuthentication, JasprTokenAuthenticationNoRenew
+from jaspr.apps.kiosk.authentication import (
+    JasprTokenAuthentication,
+    JasprTokenAuthenticationNoRenew,
+    load_session_encounter_if_not_modified,
+    load_session_encounter_state,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class JasprBaseView(AssureNonFieldErrorsMixin, APIView):
     authentication_classes = ()
+    # If `True`, the `Encounter` of a `Patient`'s `JasprSession` is loaded with its state
+    # once, right after authenticating (see `load_session_encounter_state`).
+    loads_encounter_state: ClassVar[bool] = False
+    # If `True`, responses have the `etag` of the `Encounter` of the `Patient`'s
+    # `JasprSession` (see `Encounter.version`), and a GET with a current
+    # `If-None-Match` gets a 304 without the `Encounter`'s state being loaded (see
+    # `not_modified`).
+    uses_encounter_etag: ClassVar[bool] = False
+    # Whether the request is a GET with the current `etag` of the `Encounter`.
+    encounter_not_modified = False
+
     def get_authenticators(self):
         if self.request.headers.get("Heartbeat") == "ignore":
             return [JasprTokenAuthenticationNoRenew()]
@@ -22,6 +40,36 @@ class JasprBaseView(AssureNonFieldErrorsMixin, APIView):
             return [auth() for auth in self.authentication_classes]
         return [JasprTokenAuthentication()]
 
+    def perform_authentication(self, request: Request) -> None:
+        super().perform_authentication(request)
+        if not isinstance(request.auth, AuthToken):
+            return
+        if (
+            self.uses_encounter_etag
+            and request.method == "GET"
+            and "If-None-Match" in request.headers
+        ):
+            self.encounter_not_modified = load_session_encounter_if_not_modified(
+                request.user, request.auth, request.headers["If-None-Match"]
+            )
+        if self.loads_encounter_state and not self.encounter_not_modified:
+            load_session_encounter_state(request.user, request.auth)
+
+    @staticmethod
+    def not_modified() -> Response:
+        return Response(status=status.HTTP_304_NOT_MODIFIED)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            self.uses_encounter_etag
+            and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED)
+            and isinstance(request.auth, AuthToken)
+            and request.auth.jaspr_session.encounter_id is not None
+        ):
+            response["ETag"] = request.auth.jaspr_session.encounter.etag
+        return response
+
     def get_serializer_context(self):
         return {"request": self.request, "view": self, "format": self.format_kwarg}
 
@@ -4,6 +4,7 @@ from rest_condition import And, Or
 
 from rest_framework.response import Response
 
+from jaspr.apps.common.query_budget import QueryBudget
 from .base import JasprBaseView
 
 from ..permissions import (
@@ -34,6 +35,7 @@ class MeView(JasprBaseView):
             ),
         ),
     )
+    query_budgets = {"GET": QueryBudget(max_queries=12, max_duplicate_queries=2)}
 
     def get_serializer_class(self):
         # NOTE: Just using `hasattr` here because `permission_classes` above will
@@ -5,8 +5,7 @@ from rest_framework import status
 from rest_framework.response import Response
 
 from jaspr.apps.epic.models import NotesLog
-from jaspr.apps.kiosk.jobs import queue_action_creation
-from jaspr.apps.kiosk.narrative_note import NarrativeNote
+from jaspr.apps.kiosk.jobs import queue_actions_creation, queue_note_generation
 
 from ..permissions import IsAuthenticated, IsPatient
 from ..serializers import ActionSerializer
@@ -16,10 +15,32 @@ logger = logging.getLogger(__name__)
 
 
 class PatientActionView(JasprBaseView):
+    """
+    Record an `Action`, or several (sent as an array) at once.
+    """
+
     permission_classes = (IsAuthenticated, IsPatient)
 
     def post(self, request):
-        data = {**request.data}
+        many = isinstance(request.data, list)
+        if many:
+            data = [self.get_action_data(action_data) for action_data in request.data]
+        else:
+            data = self.get_action_data(request.data)
+        serializer = ActionSerializer(data=data, many=many, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        validated_actions = serializer.validated_data if many else [serializer.validated_data]
+        queue_actions_creation(validated_actions)
+
+        for validated_data in validated_actions:
+            self.handle_arrival_triggers(request, validated_data)
+
+        # Don't return any data right now because the frontend doesn't currently
+        # use/need the returned data.
+        return Response(status=status.HTTP_201_CREATED)
+
+    def get_action_data(self, action_data: dict) -> dict:
+        data = {**action_data}
         if "section_uid" in data:
             # Convert the sent section uid from camel case to snake case.
             data["section_uid"] = [
@@ -27,31 +48,20 @@ class PatientActionView(JasprBaseView):
                     {data["section_uid"]: ""}, no_underscore_before_number=True
                 )
             ][0]
-        serializer = ActionSerializer(data=data, context={"request": request})
-        serializer.is_valid(raise_exception=True)
-        validated_data = serializer.validated_data
-        queue_action_creation(validated_data)
+        return data
 
-        # Handle arrival triggers
+    def handle_arrival_triggers(self, request, validated_data: dict) -> None:
+        # The notes are rendered and sent to the EHR by a job (see
+        # `queue_note_generation`).
         # Send SSI Note if arrive at SSI end question
         if validated_data.get("section_uid", None) == "talk_it_through":
             encounter = request.auth.jaspr_session.encounter
-            note = NarrativeNote(encounter)
-            try:
-                note.save_narrative_note(trigger="SSI Finish")
-            except Exception as e:
-                if NotesLog.error_messages["duplicate"] not in e.messages:
-                    raise e
+            queue_note_generation(
+                encounter.pk, NotesLog.NOTE_TYPES.narrative_note, "SSI Finish"
+            )
         # Send CSP note if arrive at CSP end question
         elif validated_data.get("section_uid", None) == "thanks_plan_to_cope":
             encounter = request.auth.jaspr_session.encounter
-            note = NarrativeNote(encounter)
-            try:
-                note.save_stability_plan_note(trigger="CSP Finish")
-            except Exception as e:
-                if NotesLog.error_messages["duplicate"] not in e.messages:
-                    raise e
-
-        # Don't return any data right now because the frontend doesn't currently
-        # use/need the returned data.
-        return Response(status=status.HTTP_201_CREATED)
+            queue_note_generation(
+                encounter.pk, NotesLog.NOTE_TYPES.stability_plan, "CSP Finish"
+            )
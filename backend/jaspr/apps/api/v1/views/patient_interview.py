@@ -3,6 +3,8 @@ from .base import JasprBaseView
 from rest_framework import status
 from rest_framework.response import Response
 
+from jaspr.apps.common.query_budget import QueryBudget
+
 from ..permissions import (
     HasRecentHeartbeat,
     IsAuthenticated,
@@ -23,14 +25,13 @@ class PatientInterviewView(JasprBaseView):
         SatisfiesClinicIPWhitelistingFromPatient,
         HasRecentHeartbeat,
     )
+    loads_encounter_state = True
+    uses_encounter_etag = True
+    query_budgets = {"GET": QueryBudget(max_queries=14, max_duplicate_queries=3)}
 
-    @staticmethod
-    def get(request):
+    def get(self, request):
+        if self.encounter_not_modified:
+            return self.not_modified()
         encounter = request.auth.jaspr_session.encounter
         questions = AssignedActivitySerializer(encounter.filter_activities(active_only=True), many=True)
         return Response(questions.data, status=status.HTTP_200_OK)
-
-
-
-
-
@@ -2,11 +2,12 @@ import logging
 from rest_framework import status
 from rest_framework.response import Response
 
+from jaspr.apps.common.query_budget import QueryBudget
 from jaspr.apps.epic.models import NotesLog
 from jaspr.apps.kiosk.models import AssignedActivity
 from jaspr.apps.kiosk.activities.errors import ActivityValidationError
 from jaspr.apps.kiosk.activities.question_json import camelcase_to_underscore
-from jaspr.apps.kiosk.narrative_note import NarrativeNote
+from jaspr.apps.kiosk.jobs import queue_note_generation
 
 from ..permissions import (
     HasRecentHeartbeat,
@@ -24,6 +25,9 @@ class PatientInterviewAnswersView(JasprBaseView):
     """Expects a PATCH/PUT of assessment answers
 
     /v1/patient/answers
+
+    A GET with `?since=<etag>` (an `ETag` of a previous response) only has the
+    answers that changed since then.
     """
 
     permission_classes = (
@@ -34,6 +38,9 @@ class PatientInterviewAnswersView(JasprBaseView):
         SatisfiesClinicIPWhitelistingFromPatient,
         HasRecentHeartbeat
     )
+    loads_encounter_state = True
+    uses_encounter_etag = True
+    query_budgets = {"GET": QueryBudget(max_queries=10, max_duplicate_queries=2)}
 
     def patch(self, request):
         activity = request.GET.get('activity')
@@ -62,17 +69,14 @@ class PatientInterviewAnswersView(JasprBaseView):
         answers = encounter.get_answers()
 
         if is_takeaway:
-            note = NarrativeNote(encounter)
-            try:
-                note.save_stability_plan_note(trigger="Takeaway Edit")
-            except Exception as e:
-                if NotesLog.error_messages["duplicate"] not in e.messages:
-                    raise e
-            try:
-                note.save_narrative_note(trigger="Takeaway Edit")
-            except Exception as e:
-                if NotesLog.error_messages["duplicate"] not in e.messages:
-                    raise e
+            # The notes are rendered and sent to the EHR by a job (see
+            # `queue_note_generation`).
+            queue_note_generation(
+                encounter.pk, NotesLog.NOTE_TYPES.stability_plan, "Takeaway Edit"
+            )
+            queue_note_generation(
+                encounter.pk, NotesLog.NOTE_TYPES.narrative_note, "Takeaway Edit"
+            )
 
         return Response(
             answers,
@@ -80,8 +84,15 @@ class PatientInterviewAnswersView(JasprBaseView):
         )
 
     def get(self, request):
+        if self.encounter_not_modified:
+            return self.not_modified()
         encounter = request.auth.jaspr_session.encounter
-        answers = encounter.get_answers()
+        since = request.query_params.get("since")
+        version = encounter.parse_etag_version(since) if since else None
+        if version is not None:
+            answers = encounter.get_answers_since(version)
+        else:
+            answers = encounter.get_answers()
         return Response(
             answers,
             status=status.HTTP_200_OK,
@@ -3,6 +3,7 @@ from typing import Sequence
 from django.utils import timezone
 
 from jaspr.apps.kiosk.models import ActivateRecord
+from jaspr.apps.clinics.ip_whitelist import IPWhitelist, get_ip_whitelists
 from jaspr.apps.clinics.models import Clinic, Department, HealthcareSystem
 from jaspr.apps.epic.models import EpicDepartmentSettings
 
@@ -26,7 +27,7 @@ logger = logging.getLogger(__name__)
 class SatisfiesClinicIPWhitelistingFromPatientPin(
     SatisfiesClinicIPWhitelisting
 ):
-    def get_clinics(self, request, view) -> Sequence[Clinic]:
+    def get_ip_whitelists(self, request, view) -> Sequence[IPWhitelist]:
         department_code = request.data.get("department_code")
         system_code = request.data.get("system_code")
         if department_code:
@@ -43,14 +44,15 @@ class SatisfiesClinicIPWhitelistingFromPatientPin(
             except (EpicDepartmentSettings.DoesNotExist, Department.DoesNotExist):
                 logger.warning(f"Unable to find department with department code {department_code}")
                 return []
-            return [department.clinic]
+            return [department.clinic.ip_whitelist]
         elif system_code:
             try:
                 system = HealthcareSystem.objects.get(tablet_system_code=request.data.get("system_code"))
             except (EpicDepartmentSettings.DoesNotExist, HealthcareSystem.DoesNotExist):
                 logger.warning(f"Unable to find system with system code {system_code}")
                 return []
-            return Clinic.objects.filter(system=system).all()
+            clinic_ids = Clinic.objects.filter(system=system).values_list("pk", flat=True)
+            return list(get_ip_whitelists(clinic_ids).values())
         return []
 
 
@@ -2,15 +2,16 @@ import logging
 
 from rest_framework.response import Response
 
-from ....stability_plan.models import PatientWalkthrough, PatientWalkthroughStep
-from ....stability_plan.walkthrough_manager import WalkthroughManager
+from jaspr.apps.common.query_budget import QueryBudget, set_query_budget
+from ....stability_plan.models import PatientWalkthrough
+from ....stability_plan.walkthrough_manager import (
+    WalkthroughManager,
+    update_step_payloads,
+)
 from ..permissions import (
     HasRecentHeartbeat,
     IsNotInER,
 )
-from ..serializers import (
-    ReadOnlyPatientWalkthroughStepSerializer,
-)
 
 from .base import JasprBaseView
 
@@ -42,32 +43,34 @@ class PatientWalkthroughView(JasprBaseView):
             {stepName:  “Make Home Safer”, "frontendRenderType": "videoDescription", value: {serialized Media object},
             {stepName:  “National Hotline”, "frontendRenderType": "nationalHotline", value: {name="National Hotline", phone="206 555 1232", text="206 234 2345"}},
             {stepName: “Recap”, frontendRenderType: "recap", value: null}
-        ]"""
+        ]
+
+    The steps are serialized when they're built (see `PatientWalkthrough.step_payloads`),
+    so this is a read of the active `PatientWalkthrough`, unless the `Patient` doesn't
+    have one yet (or a step changed), when the request has `build_query_budget`."""
 
     permission_classes = (IsAuthenticated, IsPatient, HasRecentHeartbeat, IsNotInER)
+    query_budgets = {"GET": QueryBudget(max_queries=6, max_duplicate_queries=1)}
+    build_query_budget = QueryBudget(max_queries=35, max_duplicate_queries=3)
 
     def get(self, request):
         patient = self.request.user.patient
 
-        patient_walkthrough = PatientWalkthrough.objects.filter(
-            status="active",
-            patient=patient,
+        patient_walkthrough = (
+            PatientWalkthrough.objects.filter(status="active", patient=patient)
+            .only("pk", "step_payloads")
+            .first()
         )
 
-        if not patient_walkthrough:
-            WalkthroughManager(patient).handle()
-
-        patient_walkthrough_steps = PatientWalkthroughStep.objects.filter(
-            status="active",
-            patient_walkthrough__status="active",
-            patient_walkthrough__patient=patient,
-        )
+        if patient_walkthrough is None:
+            set_query_budget(request, self.build_query_budget)
+            manager = WalkthroughManager(patient)
+            manager.handle()
+            patient_walkthrough = manager.patient_walkthrough
 
-        if patient_walkthrough_steps:
-            serializer = ReadOnlyPatientWalkthroughStepSerializer(
-                patient_walkthrough_steps,
-                context=self.get_serializer_context(),
-                many=True,
-            )
-            return Response(serializer.data)
-        return Response([])
+        step_payloads = patient_walkthrough.step_payloads
+        if step_payloads is None:
+            # Cleared when a step changed.
+            set_query_budget(request, self.build_query_budget)
+            step_payloads = update_step_payloads(patient_walkthrough)
+        return Response(step_payloads)
@@ -21,6 +21,7 @@ from ..viewsets import (
     PatientVideoViewSet,
 )
 from jaspr.apps.kiosk.activities.activity_utils import ActivityType
+from jaspr.apps.common.query_budget import QueryBudget
 from .base import JasprBaseView
 
 logger = logging.getLogger(__name__)
@@ -44,6 +45,7 @@ class TechnicianPatientDataView(JasprBaseView):
         SatisfiesClinicIPWhitelistingFromTechnician,
         SharesClinic
     )
+    query_budgets = {"GET": QueryBudget(max_queries=20, max_duplicate_queries=2)}
 
     def get_skills(self, patient):
         queryset = ActivityViewSet.queryset_for_patient_user(
@@ -1,4 +1,7 @@
+import copy
+
 from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.response import Response
 from django.db.models import Prefetch
 
 from .jaspr_base import JasprBaseViewSetMixin
@@ -8,6 +11,7 @@ from jaspr.apps.api.v1.permissions import (
 from jaspr.apps.api.v1.serializers import (
     ReadOnlyActivitySerializer,
 )
+from jaspr.apps.kiosk.content_catalog import get_content_catalog
 from jaspr.apps.kiosk.models import (
     PatientActivity,
     Activity
@@ -41,3 +45,24 @@ class ActivityViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return self.queryset_for_patient_user(super().get_queryset(), self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        # The `Activity`s come from the `ContentCatalog` (see
+        # `jaspr.apps.kiosk.content_catalog`), only the patient activities are queried.
+        catalog = get_content_catalog()
+        patient_activities = {
+            patient_activity.activity_id: patient_activity
+            for patient_activity in PatientActivity.objects.filter(patient__user=request.user)
+        }
+        data = []
+        for activity in catalog.activities:
+            if activity.status != "active":
+                continue
+            representation = copy.deepcopy(
+                catalog.get_payload(ReadOnlyActivitySerializer, activity, request)
+            )
+            data.append(
+                ReadOnlyActivitySerializer.add_patient_activity(
+                    representation, patient_activities.get(activity.pk)
+                )
+            )
+        return Response(data)
@@ -1,4 +1,8 @@
+from typing import List
+
+from django.db.models import Model
 from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .jaspr_base import JasprBaseViewSetMixin
@@ -40,10 +44,39 @@ from jaspr.apps.kiosk.models import (
 from jaspr.apps.clinics.models import Department
 from jaspr.apps.awsmedia.models import Media
 from jaspr.apps.jah.models import CommonConcern, ConversationStarter
+from jaspr.apps.kiosk.content_catalog import ContentCatalog, get_content_catalog
 from jaspr.apps.api.v1.permissions import HasRecentHeartbeat, IsAuthenticated
 
 
-class ConversationStarterViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class ContentCatalogListMixin:
+    """
+    Lists the content from the process local `ContentCatalog` (see
+    `jaspr.apps.kiosk.content_catalog`), with payloads serialized once per snapshot,
+    instead of querying and serializing it for every request.
+    """
+
+    def get_catalog_instances(self, catalog: ContentCatalog) -> List[Model]:
+        """
+        Return the instances to list, filtered like `queryset`: by default, the active
+        instances of its model.
+        """
+        instances = getattr(catalog, catalog.MODEL_ATTRIBUTES[self.queryset.model])
+        return [instance for instance in instances if instance.status == "active"]
+
+    def list(self, request, *args, **kwargs):
+        catalog = get_content_catalog()
+        return Response(
+            catalog.get_payloads(
+                self.get_serializer_class(),
+                self.get_catalog_instances(catalog),
+                request,
+            )
+        )
+
+
+class ConversationStarterViewSet(
+    ContentCatalogListMixin, JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Viewset for allowing Patients to
     list and retrieve Conversation Starters.
@@ -56,7 +89,9 @@ class ConversationStarterViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelVi
     permission_classes = (IsAuthenticated, IsPatient, HasRecentHeartbeat)
 
 
-class CommonConcernViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class CommonConcernViewSet(
+    ContentCatalogListMixin, JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Viewset for allowing Patients to
     list and retrieve Common Concerns.
@@ -69,7 +104,9 @@ class CommonConcernViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet)
     permission_classes = (IsAuthenticated, IsPatient, HasRecentHeartbeat)
 
 
-class JasprMediaViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class JasprMediaViewSet(
+    ContentCatalogListMixin, JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Viewset for allowing Patients to
     list and retrieve Jaspr video files.
@@ -80,8 +117,17 @@ class JasprMediaViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAuthenticated, IsPatient, HasRecentHeartbeat)
     filter_backends = (JasprMediaFilterBackend,)
 
+    def get_catalog_instances(self, catalog):
+        # See `JasprMediaFilterBackend`.
+        tag = self.request.query_params.get("tag")
+        if tag:
+            return catalog.media_by_tag.get(tag.casefold(), [])
+        return catalog.media
+
 
-class SharedStoryViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class SharedStoryViewSet(
+    ContentCatalogListMixin, JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Viewset for allowing Patients to view shared stories.
     """
@@ -151,7 +197,9 @@ class DepartmentViewSet(
     filter_backends = (DepartmentFilterBackend,)
 
 
-class CopingStrategyViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class CopingStrategyViewSet(
+    ContentCatalogListMixin, JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """Viewset to allow Patients to view coping strategies with an optional filter on category.
 
     GET
@@ -183,4 +231,13 @@ class CopingStrategyViewSet(JasprBaseViewSetMixin, viewsets.ReadOnlyModelViewSet
     filter_backends = [DjangoFilterBackend]
     filterset_fields = [
         "category__slug",
-    ]
\ No newline at end of file
+    ]
+
+    def get_catalog_instances(self, catalog):
+        # See `filterset_fields`.
+        slug = self.request.query_params.get("category__slug")
+        return [
+            coping_strategy
+            for coping_strategy in super().get_catalog_instances(catalog)
+            if not slug or coping_strategy.category.slug == slug
+        ]
\ No newline at end of file
@@ -1,6 +1,7 @@
 import datetime
 
-from django.db.models import DateTimeField, OuterRef, Prefetch, Subquery
+from django.db.models import Prefetch
+from django.http import Http404
 
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
@@ -8,7 +9,6 @@ from rest_framework.exceptions import MethodNotAllowed
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.request import Request
-from rest_framework.generics import get_object_or_404
 
 from .jaspr_base import JasprBaseViewSetMixin
 from jaspr.apps.api.v1.permissions import (
@@ -23,9 +23,10 @@ from jaspr.apps.api.v1.serializers import (
 )
 from jaspr.apps.kiosk.models import (
     Patient,
-    ActivateRecord,
     Encounter,
     PatientDepartmentSharing,
+    PatientSearchToken,
+    RecentPatient,
 )
 from jaspr.apps.api.v1.permissions import HasRecentHeartbeat, IsAuthenticated
 
@@ -35,6 +36,10 @@ from ..exceptions import AlreadyExistsError
 from ..serializers import ActivateNewPatientSerializer
 
 PATIENT_SEARCH_PROPERTIES = ("mrn", "ssid", "first_name", "last_name")
+# The most `Patient`s returned by a search.
+PATIENT_SEARCH_RESULT_LIMIT = 30
+# The most candidates from the search index that are fuzzy matched for a search.
+PATIENT_SEARCH_CANDIDATE_LIMIT = 300
 
 
 class TechnicianPatientViewSet(
@@ -138,10 +143,12 @@ class TechnicianPatientViewSet(
         try:
             serializer.is_valid(raise_exception=True)
         except AlreadyExistsError as e:
-            existing_patient = get_object_or_404(
-                TechnicianPatientViewSet.base_query(request.user.technician),
-                pk=e.object_id,
+            existing_patients = self.get_patients(
+                request.user.technician, patient_ids=[e.object_id], limit=1
             )
+            if not existing_patients:
+                raise Http404
+            existing_patient = existing_patients[0]
             serialized_existing_patient = ReadOnlyTechnicianPatientSerializer(
                 instance=existing_patient, context={"request": request}
             ).data
@@ -193,68 +200,89 @@ class TechnicianPatientViewSet(
 
     @staticmethod
     def base_query(technician):
+        """
+        The `RecentPatient`s of the technician's departments, most recently activated
+        first.
+        """
         # get the department ids for the technician
         department_ids = technician.departmenttechnician_set.filter(
             status="active"
         ).values_list("department", flat=True)
 
-        activate_record_subquery = (
-            ActivateRecord.objects.filter(
-                patient_id=OuterRef("pk"),
-                # NOTE: This currently partially assumes to some extent that the
-                # `Technician`'s `clinic` doesn't change after being initially set. If
-                # `clinic` is added to `ActivateRecord` (and/or `department`),
-                # then we can refactor this and use that instead.
-                technician__system=technician.system,
-            )
-                .order_by("-timestamp")
-                .values("timestamp")[:1]
-        )
+        # NOTE: `RecentPatient.last_logged_in_at` is when the `Patient` was last
+        # activated by a `Technician` of the department's system, which currently
+        # partially assumes to some extent that the `Technician`'s `clinic` doesn't
+        # change after being initially set.
+        return RecentPatient.objects.for_departments(department_ids)
+
+    @classmethod
+    def get_patients(cls, technician, patient_ids=None, limit=PATIENT_SEARCH_RESULT_LIMIT):
+        """
+        Return at most `limit` of the `Patient`s of the technician's departments (out of
+        `patient_ids` if given), most recently activated first, with
+        `last_logged_in_at` set.
+        """
+        recent_patients = cls.base_query(technician)
+        if patient_ids is not None:
+            recent_patients = recent_patients.filter(patient__in=patient_ids)
+
+        # A `Patient` shared with more than one of the departments is listed once for
+        # each of them.
+        last_logged_in_at = {}
+        for patient_id, logged_in_at in recent_patients.values_list(
+            "patient_id", "last_logged_in_at"
+        ).iterator(chunk_size=limit):
+            last_logged_in_at.setdefault(patient_id, logged_in_at)
+            if len(last_logged_in_at) >= limit:
+                break
 
-        patient_query = Patient.objects.select_related('user') \
+        # The `current_encounter`s are loaded when serializing the `Patient`s (see
+        # `ReadOnlyTechnicianPatientListSerializer`).
+        patients = (
+            Patient.objects.select_related("user")
             .prefetch_related(
-            Prefetch("patientdepartmentsharing_set",
-                     queryset=PatientDepartmentSharing.objects.filter(status="active"))) \
-            .filter(patientdepartmentsharing__department__in=department_ids) \
-            .distinct()
-
-        query = Patient.get_related_query(patient_query).annotate(
-            last_logged_in_at=Subquery(
-                activate_record_subquery, output_field=DateTimeField(null=True)
+                Prefetch(
+                    "patientdepartmentsharing_set",
+                    queryset=PatientDepartmentSharing.objects.filter(status="active"),
+                )
             )
-        ).order_by("-last_logged_in_at")
-
-        return query
+            .in_bulk(list(last_logged_in_at))
+        )
+        results = []
+        for patient_id, logged_in_at in last_logged_in_at.items():
+            patient = patients[patient_id]
+            patient.last_logged_in_at = logged_in_at
+            results.append(patient)
+        return results
 
     def get_patients_by_dob(self, technician, dob):
-        results = []
-        for patient in self.base_query(technician):
-            if patient.date_of_birth == dob:
-                results.append(patient)
-            # We only want to return a max of 30
-            if len(results) >= 30:
-                break
+        results = self.get_patients(
+            technician,
+            patient_ids=PatientSearchToken.objects.patient_ids_with_date_of_birth(dob),
+        )
         serializer = ReadOnlyTechnicianPatientSerializer(results, context={"request": self.request}, many=True)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
     def get_patients_by_month_and_day(self, technician, month, day):
-        results = []
-        for patient in self.base_query(technician):
-            if (
-                    patient.date_of_birth is not None
-                    and patient.date_of_birth.month == month
-                    and patient.date_of_birth.day == day
-            ):
-                results.append(patient)
-            # We only want to return a max of 30
-            if len(results) >= 30:
-                break
+        results = self.get_patients(
+            technician,
+            patient_ids=PatientSearchToken.objects.patient_ids_with_birth_month_and_day(
+                month, day
+            ),
+        )
         serializer = ReadOnlyTechnicianPatientSerializer(results, context={"request": self.request}, many=True)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
     def search(self, technician, query):
+        # The search index narrows things down to the `Patient`s that could match in
+        # SQL, so only a bounded number of them are decrypted and fuzzy matched.
+        candidates = self.get_patients(
+            technician,
+            patient_ids=PatientSearchToken.objects.candidate_patient_ids(query),
+            limit=PATIENT_SEARCH_CANDIDATE_LIMIT,
+        )
         results = []
-        for patient in self.base_query(technician):
+        for patient in candidates:
             for prop in PATIENT_SEARCH_PROPERTIES:
                 patient_value = getattr(patient, prop)
                 if patient_value is not None:
@@ -263,8 +291,7 @@ class TechnicianPatientViewSet(
                 if fuzz_value >= 90:
                     results.append(patient)
                     break
-            # We only want to return a max of 30
-            if len(results) >= 30:
+            if len(results) >= PATIENT_SEARCH_RESULT_LIMIT:
                 break
 
         serializer = ReadOnlyTechnicianPatientSerializer(results, context={"request": self.request}, many=True)
@@ -272,14 +299,12 @@ class TechnicianPatientViewSet(
 
     def get_recent_patients(self, technician):
 
-        query = self.base_query(technician)
-
         # NOTE (EBPI-936): Return at most `30` recent `Patient`s right now.
         # With upcoming search work, current spec is to not paginate, but
         # rather just return this relatively high number and let the technician
         # search for more specific information if the last `30` isn't enough
         # without a search.
-        queryset = query[:30]
-        serializer = ReadOnlyTechnicianPatientSerializer(queryset, context={"request": self.request}, many=True)
+        patients = self.get_patients(technician, limit=30)
+        serializer = ReadOnlyTechnicianPatientSerializer(patients, context={"request": self.request}, many=True)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
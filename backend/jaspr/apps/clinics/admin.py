@@ -1,11 +1,11 @@
-import csv
 import datetime
+import tempfile
 from django.utils import timezone
 
 from django.conf.urls import url
 from django.contrib import admin
 from django.contrib.admin import StackedInline
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import FileResponse, Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.template.response import TemplateResponse
 from django.shortcuts import get_object_or_404, reverse
 from django.utils.html import format_html
@@ -126,7 +126,8 @@ class HealthcareSystemAdmin(SimpleHistoryAdmin):
             '<a class="button" href="{}">Activities</a>&nbsp;'
             '<a class="button" href="{}">Technicians</a>&nbsp;'
             '<a class="button" href="{}">Videos</a>&nbsp;'
-            '<a class="button" href="{}">Encounters</a>',
+            '<a class="button" href="{}">Encounters</a>&nbsp;'
+            '<a class="button" href="{}">All</a>',
             reverse("admin:export-kiosk-analytics", args=[obj.pk, "visits"]),
             reverse("admin:export-kiosk-analytics", args=[obj.pk, "actions"]),
             reverse("admin:export-kiosk-analytics", args=[obj.pk, "ssi"]),
@@ -134,6 +135,7 @@ class HealthcareSystemAdmin(SimpleHistoryAdmin):
             reverse("admin:export-kiosk-analytics", args=[obj.pk, "technicians"]),
             reverse("admin:export-kiosk-analytics", args=[obj.pk, "videos"]),
             reverse("admin:export-kiosk-analytics", args=[obj.pk, "encounters"]),
+            reverse("admin:export-kiosk-analytics", args=[obj.pk, "all"]),
         )
 
     jaspr_analytics.short_description = "Jaspr Analytics"
@@ -145,32 +147,22 @@ class HealthcareSystemAdmin(SimpleHistoryAdmin):
         system = get_object_or_404(HealthcareSystem, pk=system_id)
         exporter = AnalyticsExporter(system, start_date, end_date, include_mrn=include_mrn,
                                      include_analytics_token=include_analytics_token)
-        if data_name == "visits":
-            iterator = exporter.visit_log_iterator
-        elif data_name == "actions":
-            iterator = exporter.action_log_iterator
-        elif data_name == "ssi":
-            iterator = exporter.assessment_iterator
-        elif data_name == "activities":
-            iterator = exporter.skills_iterator
-        elif data_name == "technicians":
-            iterator = exporter.technicians_iterator
-        elif data_name == "videos":
-            iterator = exporter.videos_iterator
-        elif data_name == "encounters":
-            iterator = exporter.encounters_iterator
-        else:
+        if data_name == "all":
+            # The zip is written to a temporary file (rather than memory) before it is
+            # sent.
+            file = tempfile.TemporaryFile()
+            exporter.write_zip(file)
+            file.seek(0)
+            return FileResponse(
+                file,
+                as_attachment=True,
+                filename=exporter.get_filename(data_name, "zip"),
+                content_type="application/zip",
+            )
+        if data_name not in AnalyticsExporter.SHEETS:
             raise Http404(f"Invalid data name: {data_name}")
-        # NOTE: If the files ever get big enough to need streaming,
-        # we could do something like this:
-        # https://docs.djangoproject.com/en/1.11/howto/outputting-csv/#streaming-large-csv-files
-        response = HttpResponse(content_type="text/csv")
-        response[
-            "Content-Disposition"
-        ] = f'attachment; filename="system_{system.id}_jaspr_{data_name}_{start_date}--{end_date}.csv"'
-        writer = csv.writer(response)
-        for row in iterator:
-            writer.writerow(row)
+        response = StreamingHttpResponse(exporter.stream_csv(data_name), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{exporter.get_filename(data_name)}"'
         return response
 
 
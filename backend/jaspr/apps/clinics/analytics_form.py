@@ -13,6 +13,7 @@ class AnalyticsActionForm(forms.Form):
         ('activities', 'Activities'),
         ('videos', 'Videos'),
         ('encounters', 'Encounters'),
+        ('all', 'All (Zip)'),
     )
     system = forms.ModelChoiceField(queryset=HealthcareSystem.objects.all())
     analytics = forms.TypedChoiceField(choices=analytic_choices)
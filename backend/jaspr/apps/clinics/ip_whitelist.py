@@ -0,0 +1,156 @@
+"""
+Compiled `Clinic` IP whitelists, and cached lookups of what a request needs to check
+them.
+
+- `IPWhitelist` is the compiled form of a `Clinic`'s whitelists: a hash set of the
+  whitelisted addresses and, per IP version, a sorted table of the (merged) whitelisted
+  ranges to binary search. They are compiled once per process per distinct whitelist.
+- The whitelists of each `Clinic` and the active `Clinic` ids of each `Technician` are
+  kept in the cache (Redis), and deleted when a `Clinic`, `Department` or
+  `DepartmentTechnician` is saved or deleted (see the receivers in
+  `jaspr.apps.clinics.models.healthcare_system`).
+"""
+import bisect
+import ipaddress
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from django.apps import apps
+from django.core.cache import cache
+
+# A safety net for changes that don't go through `save`/`delete` (E.g. `update`).
+CACHE_TIMEOUT = 60 * 5
+
+IPInterface = Union[ipaddress.IPv4Interface, ipaddress.IPv6Interface]
+
+
+@dataclass(frozen=True)
+class IPWhitelist:
+    addresses: frozenset
+    # IP version -> (range starts, range ends), sorted and non overlapping.
+    ranges: Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...]]]
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.addresses and not self.ranges
+
+    def contains(self, ip_address: Optional[IPInterface]) -> bool:
+        if ip_address is None:
+            return False
+        if ip_address in self.addresses:
+            return True
+        starts, ends = self.ranges.get(ip_address.version, ((), ()))
+        value = int(ip_address)
+        index = bisect.bisect_right(starts, value) - 1
+        return index >= 0 and value <= ends[index]
+
+
+@lru_cache(maxsize=4096)
+def parse_ip_address(ip_address: str) -> Optional[IPInterface]:
+    """
+    Parse a client IP address the same way `InetAddressField` does, returning `None`
+    if it isn't valid.
+    """
+    try:
+        return ipaddress.ip_interface(ip_address)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def compile_ip_whitelist(addresses: Tuple[str, ...], ranges: Tuple[str, ...]) -> IPWhitelist:
+    intervals: Dict[int, List[Tuple[int, int]]] = {}
+    for network in map(ipaddress.ip_network, ranges):
+        intervals.setdefault(network.version, []).append(
+            (int(network.network_address), int(network.broadcast_address))
+        )
+    compiled_ranges = {}
+    for version, version_intervals in intervals.items():
+        merged: List[List[int]] = []
+        for start, end in sorted(version_intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        compiled_ranges[version] = (
+            tuple(start for start, _ in merged),
+            tuple(end for _, end in merged),
+        )
+    return IPWhitelist(
+        addresses=frozenset(map(ipaddress.ip_interface, addresses)),
+        ranges=compiled_ranges,
+    )
+
+
+def get_whitelist_key(clinic) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """The (hashable) whitelists of `clinic`, as strings."""
+    return (
+        tuple(str(address) for address in clinic.ip_addresses_whitelist),
+        tuple(str(network) for network in clinic.ip_address_ranges_whitelist),
+    )
+
+
+def get_clinic_ip_whitelist_cache_key(clinic_id: int) -> str:
+    return f"clinic-ip-whitelist:{clinic_id}"
+
+
+def get_ip_whitelists(clinic_ids: Iterable[int]) -> Dict[int, IPWhitelist]:
+    """Return the compiled `IPWhitelist`s of `clinic_ids`."""
+    Clinic = apps.get_model("clinics", "Clinic")
+
+    keys = {get_clinic_ip_whitelist_cache_key(clinic_id): clinic_id for clinic_id in clinic_ids}
+    whitelist_keys = {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+    missing = [clinic_id for clinic_id in keys.values() if clinic_id not in whitelist_keys]
+    if missing:
+        fetched = {
+            clinic.pk: get_whitelist_key(clinic)
+            for clinic in Clinic.objects.filter(pk__in=missing).only(
+                "ip_addresses_whitelist", "ip_address_ranges_whitelist"
+            )
+        }
+        cache.set_many(
+            {
+                get_clinic_ip_whitelist_cache_key(clinic_id): whitelist_key
+                for clinic_id, whitelist_key in fetched.items()
+            },
+            CACHE_TIMEOUT,
+        )
+        whitelist_keys.update(fetched)
+    return {
+        clinic_id: compile_ip_whitelist(*whitelist_key)
+        for clinic_id, whitelist_key in whitelist_keys.items()
+    }
+
+
+def invalidate_clinic_ip_whitelist(clinic_id: int) -> None:
+    cache.delete(get_clinic_ip_whitelist_cache_key(clinic_id))
+
+
+def get_technician_clinic_ids_cache_key(technician_id: int) -> str:
+    return f"technician-clinic-ids:{technician_id}"
+
+
+def get_technician_clinic_ids(technician_id: int) -> List[int]:
+    """
+    Return the ids of the `Clinic`s of the `Technician`'s active
+    `DepartmentTechnician`s.
+    """
+    DepartmentTechnician = apps.get_model("clinics", "DepartmentTechnician")
+
+    cache_key = get_technician_clinic_ids_cache_key(technician_id)
+    clinic_ids = cache.get(cache_key)
+    if clinic_ids is None:
+        clinic_ids = list(
+            DepartmentTechnician.objects.filter(technician_id=technician_id, status="active")
+            .values_list("department__clinic", flat=True)
+            .distinct()
+        )
+        cache.set(cache_key, clinic_ids, CACHE_TIMEOUT)
+    return clinic_ids
+
+
+def invalidate_technician_clinic_ids(technician_ids: Iterable[int]) -> None:
+    cache.delete_many(
+        [get_technician_clinic_ids_cache_key(technician_id) for technician_id in technician_ids]
+    )
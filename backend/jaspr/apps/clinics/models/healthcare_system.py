@@ -7,6 +7,8 @@ from typing import Any, Dict, Optional, Tuple, Union
 from django.core.exceptions import ValidationError
 from django.apps import apps
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from django_better_admin_arrayfield.models.fields import (
     ArrayField as BetterAdminArrayField,
@@ -17,6 +19,14 @@ from netfields import CidrAddressField, InetAddressField
 from simple_history.models import HistoricalRecords
 
 from jaspr.apps.common.models import JasprAbstractBaseModel, RoutableModel
+from ..ip_whitelist import (
+    IPWhitelist,
+    compile_ip_whitelist,
+    get_whitelist_key,
+    invalidate_clinic_ip_whitelist,
+    invalidate_technician_clinic_ids,
+    parse_ip_address,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -310,20 +320,18 @@ class Clinic(JasprAbstractBaseModel):
             self.ip_address_ranges_whitelist
         )
 
+    @property
+    def ip_whitelist(self) -> IPWhitelist:
+        """The compiled IP whitelists, see `jaspr.apps.clinics.ip_whitelist`."""
+        return compile_ip_whitelist(*get_whitelist_key(self))
+
     def ip_satisfies_whitelisting(self, ip_address: str) -> bool:
         if not self.has_ip_whitelisting:
             return True
         # NOTE: `ip_address` at this point is assumed to be a valid IPv4 or IPv6
         # string. Validation, if needed, should have been done before calling this
         # method.
-        given_ip_address_value = InetAddressField().to_python(ip_address)
-        for ip_address_value in self.ip_addresses_whitelist:
-            if given_ip_address_value == ip_address_value:
-                return True
-        for ip_address_range in self.ip_address_ranges_whitelist:
-            if given_ip_address_value in ip_address_range:
-                return True
-        return False
+        return self.ip_whitelist.contains(parse_ip_address(ip_address))
 
     def get_departments(self):
         return Department.objects.filter(clinic=self, status="active")
@@ -414,3 +422,23 @@ class DepartmentTechnician(JasprAbstractBaseModel):
         self.full_clean()
 
         super().save(*args, **kwargs)
+
+
+# Invalidate the cached IP whitelist lookups, see `jaspr.apps.clinics.ip_whitelist`.
+@receiver([post_save, post_delete], sender=Clinic)
+def clinic_changed(sender, instance: Clinic, **kwargs) -> None:
+    invalidate_clinic_ip_whitelist(instance.pk)
+
+
+@receiver(post_save, sender=Department)
+def department_changed(sender, instance: Department, **kwargs) -> None:
+    invalidate_technician_clinic_ids(
+        DepartmentTechnician.objects.filter(department=instance).values_list(
+            "technician", flat=True
+        )
+    )
+
+
+@receiver([post_save, post_delete], sender=DepartmentTechnician)
+def department_technician_changed(sender, instance: DepartmentTechnician, **kwargs) -> None:
+    invalidate_technician_clinic_ids([instance.technician_id])
@@ -1,4 +1,11 @@
+import ipaddress
 from copy import deepcopy
+
+from jaspr.apps.clinics.ip_whitelist import (
+    get_ip_whitelists,
+    get_technician_clinic_ids,
+    parse_ip_address,
+)
 from jaspr.apps.test_infrastructure.testcases import JasprTestCase
 
 
@@ -148,3 +155,69 @@ class TestClinicLocationModel(JasprTestCase):
         )
 
 
+
+    def test_ip_satisfies_whitelisting_with_overlapping_and_adjacent_ranges(self):
+        clinic = self.create_clinic(
+            system=self.system,
+            name="IP Range Test Clinic",
+            ip_address_ranges_whitelist=[
+                "10.0.0.0/24",
+                "10.0.1.0/24",
+                "10.0.0.128/25",
+                "10.0.4.0/24",
+            ],
+        )
+
+        self.assertEqual(
+            clinic.ip_whitelist.ranges[4][0],
+            (int(ipaddress.ip_address("10.0.0.0")), int(ipaddress.ip_address("10.0.4.0"))),
+            "Overlapping and adjacent ranges should be merged.",
+        )
+        self.assertTrue(clinic.ip_satisfies_whitelisting("10.0.0.1"))
+        self.assertTrue(clinic.ip_satisfies_whitelisting("10.0.1.255"))
+        self.assertTrue(clinic.ip_satisfies_whitelisting("10.0.4.17"))
+        self.assertFalse(clinic.ip_satisfies_whitelisting("10.0.2.0"))
+        self.assertFalse(clinic.ip_satisfies_whitelisting("9.255.255.255"))
+        # Same integer value, different IP version.
+        self.assertFalse(clinic.ip_satisfies_whitelisting("::a00:1"))
+        self.assertFalse(clinic.ip_satisfies_whitelisting("not an ip address"))
+
+    def test_cached_ip_whitelists_invalidated_on_save(self):
+        clinic = self.create_clinic(
+            system=self.system,
+            name="IP Cache Test Clinic",
+            ip_addresses_whitelist=["192.192.192.195"],
+        )
+        self.assertTrue(
+            get_ip_whitelists([clinic.pk])[clinic.pk].contains(
+                parse_ip_address("192.192.192.195")
+            )
+        )
+        with self.assertNumQueries(0):
+            get_ip_whitelists([clinic.pk])
+
+        clinic.ip_addresses_whitelist = ["192.192.192.196"]
+        clinic.save()
+
+        ip_whitelist = get_ip_whitelists([clinic.pk])[clinic.pk]
+        self.assertFalse(ip_whitelist.contains(parse_ip_address("192.192.192.195")))
+        self.assertTrue(ip_whitelist.contains(parse_ip_address("192.192.192.196")))
+
+    def test_cached_technician_clinic_ids_invalidated_on_change(self):
+        technician = self.create_technician(system=self.system)
+        clinic_ids = get_technician_clinic_ids(technician.pk)
+        self.assertEqual(len(clinic_ids), 1)
+
+        department = self.create_department(
+            clinic=self.create_clinic(system=self.system, name="Other Clinic")
+        )
+        department_technician = self.create_department_technician(
+            technician=technician, department=department
+        )
+        self.assertCountEqual(
+            get_technician_clinic_ids(technician.pk), clinic_ids + [department.clinic_id]
+        )
+
+        department_technician.status = "inactive"
+        department_technician.save()
+        self.assertEqual(get_technician_clinic_ids(technician.pk), clinic_ids)
@@ -1,9 +1,9 @@
 import logging
 from datetime import timedelta
-from typing import Mapping, Optional, Tuple, Union
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.db.models import F
 from django.template.exceptions import TemplateDoesNotExist
 from django.template.loader import render_to_string
@@ -14,6 +14,7 @@ from rq.job import Job
 from twilio.base.exceptions import TwilioRestException
 
 from jaspr.apps.accounts.models import User
+from jaspr.apps.common import message_buffer
 from jaspr.apps.message_logs.models import EmailLog, SMSLog
 
 from .rq import enqueue_in
@@ -26,17 +27,25 @@ def message_user_from_template(
     base: str,
     context: Optional[Mapping] = None,
     from_email: Optional[str] = None,
-) -> Union[Job, Tuple[Job, Job]]:
+    buffered: bool = False,
+) -> Union[Optional[Job], Tuple[Optional[Job], Optional[Job]]]:
+    """
+    With `buffered`, the messages are sent in bulk with other buffered messages (see
+    `jaspr.apps.common.message_buffer`) instead of by a job each, and no `Job`s are
+    returned.
+    """
     if isinstance(user, int):
         user = User.objects.get(id=user)
     if user.preferred_message_type == "email":
-        return email_user_from_templates(user.id, base, context, from_email=from_email)
+        return email_user_from_templates(
+            user.id, base, context, from_email=from_email, buffered=buffered
+        )
     elif user.preferred_message_type == "sms":
-        return text_user_from_templates(user.id, base, context)
+        return text_user_from_templates(user.id, base, context, buffered=buffered)
     elif user.preferred_message_type == "email and sms":
-        sms_job = text_user_from_templates(user.id, base, context)
+        sms_job = text_user_from_templates(user.id, base, context, buffered=buffered)
         email_job = email_user_from_templates(
-            user.id, base, context, from_email=from_email
+            user.id, base, context, from_email=from_email, buffered=buffered
         )
         return email_job, sms_job
 
@@ -64,12 +73,17 @@ def find_sms_title(base: str, context: Mapping) -> str:
 
 
 def text_user_from_templates(
-    user_id: int, base: str, context: Optional[Mapping] = None
-) -> Job:
+    user_id: int, base: str, context: Optional[Mapping] = None, buffered: bool = False
+) -> Optional[Job]:
     if context is None:
         context = {}
     title = find_sms_title(base, context)
     body = render_to_string(f"{base}_sms.txt", context=context).strip()
+    if buffered:
+        queue_messages(
+            message_buffer.SMS, [{"user_id": user_id, "title": title, "body": body}]
+        )
+        return None
     return text_user.delay(user_id, title, body)
 
 
@@ -78,7 +92,8 @@ def email_user_from_templates(
     base: str,
     context: Optional[Mapping] = None,
     from_email: Optional[str] = None,
-) -> Job:
+    buffered: bool = False,
+) -> Optional[Job]:
     if context is None:
         context = {}
     subject = "".join(
@@ -90,9 +105,37 @@ def email_user_from_templates(
         html = render_to_string(f"{base}_email.html", context=context)
     except TemplateDoesNotExist:
         html = None
+    if buffered:
+        queue_messages(
+            message_buffer.EMAIL,
+            [
+                {
+                    "user_id": user_id,
+                    "subject": subject,
+                    "txt": txt,
+                    "html": html,
+                    "from_email": from_email,
+                }
+            ],
+        )
+        return None
     return email_user.delay(user_id, subject, txt, html=html, from_email=from_email)
 
 
+def queue_messages(channel: str, messages: List[Dict]) -> None:
+    """
+    Buffer the messages for sending in bulk (see `jaspr.apps.common.message_buffer`).
+    """
+    message_buffer.buffer_messages(channel, messages, drain_message_buffer.delay)
+
+
+@job
+def drain_message_buffer() -> int:
+    return message_buffer.drain_message_buffer(
+        {message_buffer.EMAIL: send_emails, message_buffer.SMS: send_texts}
+    )
+
+
 @job
 def email_engineering(
     subject: str,
@@ -178,6 +221,179 @@ def email_user(
     ).id
 
 
+def open_connection(connection) -> None:
+    """
+    Open the email `connection`, logging instead of raising if it can't be opened (each
+    email is then sent over a connection of its own, see `send_emails`).
+    """
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Error opening email connection in background job. Error: {str(e)}")
+
+
+def close_connection(connection) -> None:
+    try:
+        connection.close()
+    except Exception as e:
+        logger.error(f"Error closing email connection in background job. Error: {str(e)}")
+
+
+@job
+def send_emails(messages: List[Mapping]) -> List[int]:
+    """
+    Send the emails (each with the `user_id`, `subject`, `txt`, `html` and `from_email`
+    of `email_user`) over one connection, and create their `EmailLog`s at once. Like
+    `email_user`, an email that can't be sent (E.g. the connection can't be opened)
+    is still logged.
+
+    NOTE: Like `send_texts`, nothing raises once the first email is sent.
+
+    Returns the ids of the `EmailLog`s created.
+    """
+    users = User.objects.in_bulk({message["user_id"] for message in messages})
+    email_logs = []
+    connection = get_connection(fail_silently=False)
+    open_connection(connection)
+    try:
+        for message in messages:
+            user = users.get(message["user_id"])
+            if user is None:
+                logger.error(f"Not emailing deleted user {message['user_id']}.")
+                continue
+            from_email = message.get("from_email") or settings.DEFAULT_FROM_EMAIL
+            html = message.get("html")
+            email = EmailMultiAlternatives(
+                message["subject"],
+                message["txt"],
+                from_email,
+                [user.email],
+                connection=connection,
+            )
+            if html:
+                email.attach_alternative(html, "text/html")
+            response = None
+            try:
+                response = connection.send_messages([email])
+            except Exception as e:
+                logger.error(f"Error sending email in background job. Error: {str(e)}")
+                # The connection may not be usable anymore, so it's opened again for
+                # the next email.
+                close_connection(connection)
+                open_connection(connection)
+            email_logs.append(
+                EmailLog(
+                    user=user,
+                    user_email=user.email,
+                    from_email=from_email,
+                    date=timezone.now(),
+                    subject=message["subject"],
+                    text_body=message["txt"],
+                    html_body=html or "",
+                    # '1' or '0'
+                    email_response=response,
+                )
+            )
+    finally:
+        close_connection(connection)
+    return [email_log.id for email_log in create_email_logs(email_logs)]
+
+
+def create_email_logs(email_logs: List[EmailLog]) -> List[EmailLog]:
+    """
+    Create the `EmailLog`s of sent (or attempted) emails at once, or one at a time if
+    that fails, logging (rather than raising) the ones that can't be created.
+    """
+    try:
+        return EmailLog.objects.bulk_create(email_logs)
+    except Exception:
+        logger.exception("Unable to create Email Logs at once, creating them one at a time.")
+    created = []
+    for email_log in email_logs:
+        try:
+            email_log.save()
+        except Exception:
+            logger.exception(f"Unable to create Email Log: {email_log}")
+        else:
+            created.append(email_log)
+    return created
+
+
+@job
+def send_texts(messages: List[Mapping]) -> List[Tuple[int, str]]:
+    """
+    Send the text messages (each with the `user_id`, `title` and `body` of
+    `text_user`) over the one Twilio session, creating and updating their `SMSLog`s at
+    once. The ones that couldn't be sent are retried like `text_user` does.
+
+    NOTE: Nothing raises once the first text message is sent (a text message that
+    can't be sent, for whatever reason, is retried instead), so a batch of the message
+    buffer is never put back (see `jaspr.apps.common.message_buffer`) and sent twice.
+
+    Returns the id and the status of each `SMSLog`.
+    """
+    users = User.objects.in_bulk({message["user_id"] for message in messages})
+    sms_logs = []
+    for message in messages:
+        user = users.get(message["user_id"])
+        if user is None or not user.mobile_phone:
+            logger.error(
+                f"User {message['user_id']} does not have a mobile phone number set."
+            )
+            continue
+        sms_logs.append(
+            SMSLog(
+                recipient=user,
+                mobile_phone=user.mobile_phone.as_e164,
+                title=message["title"],
+                body=message["body"],
+            )
+        )
+    SMSLog.objects.bulk_create(sms_logs)
+
+    for sms_log in sms_logs:
+        try:
+            sent_message = twilio_client.messages.create(
+                to=sms_log.mobile_phone, from_=settings.TWILIO_PHONE_NUMBER, body=sms_log.body
+            )
+        except Exception:
+            logger.exception(f"Exception when sending text message, SMS Log: {sms_log}")
+            sms_log.status = "retry"
+        else:
+            sms_log.message_id = sent_message.sid
+            sms_log.status = "sent"
+            # Set by `save` otherwise (see `SMSLog.sent`).
+            sms_log.sent = timezone.now()
+        sms_log.modified = timezone.now()
+    update_sms_logs(sms_logs)
+
+    for sms_log in sms_logs:
+        if sms_log.status == "retry":
+            try:
+                retry_text_user.delay(sms_log.id)
+            except Exception:
+                logger.exception(f"Unable to queue a retry of SMS Log: {sms_log}")
+    return [(sms_log.id, sms_log.status) for sms_log in sms_logs]
+
+
+def update_sms_logs(sms_logs: List[SMSLog]) -> None:
+    """
+    Save the `SMSLog`s of sent (or attempted) text messages at once, or one at a time if
+    that fails, logging (rather than raising) the ones that can't be saved.
+    """
+    fields = ["message_id", "status", "sent", "modified"]
+    try:
+        SMSLog.objects.bulk_update(sms_logs, fields)
+        return
+    except Exception:
+        logger.exception("Unable to update SMS Logs at once, updating them one at a time.")
+    for sms_log in sms_logs:
+        try:
+            sms_log.save(update_fields=fields)
+        except Exception:
+            logger.exception(f"Unable to update SMS Log: {sms_log}")
+
+
 @job
 def text_user(
     user_id: int, title: str, body: str, existing_sms_log_id: Optional[int] = None
@@ -61,6 +61,7 @@ def enqueue_in(
 @django_rq.job  # Don't have to use it as a job, but here in case we want/need it.
 def cleanup_failed_jobs(
     high_delta: timedelta = timedelta(days=1),
+    notes_delta: timedelta = timedelta(days=1),
     default_delta: timedelta = timedelta(days=1),
     low_delta: timedelta = timedelta(days=1),
     log_regular: Callable[[str], Any] = logger.info,
@@ -72,12 +73,15 @@ def cleanup_failed_jobs(
     jobs successfully deleted.
     """
     time_now = timezone.now()
-    deltas_string = f"high = {high_delta}, default = {default_delta}, low = {low_delta}"
+    deltas_string = (
+        f"high = {high_delta}, notes = {notes_delta}, default = {default_delta}, "
+        f"low = {low_delta}"
+    )
     log_regular(
         f"Preparing to delete failed jobs at {time_now} with specified deltas: {deltas_string}."
     )
     deleted_jobs_count = 0
-    for name in ("high", "default", "low"):
+    for name in ("high", "notes", "default", "low"):
         delta = locals()[f"{name}_delta"]
         queue = django_rq.get_queue(name)
         failed_registry = queue.failed_job_registry
@@ -107,7 +111,8 @@ def cleanup_all_rq_data() -> None:
     priority at the time.
     """
     queues = [
-        django_rq.get_queue(queue_name) for queue_name in ("high", "default", "low")
+        django_rq.get_queue(queue_name)
+        for queue_name in ("high", "notes", "default", "low")
     ]
     for queue in queues:
         queue.empty()
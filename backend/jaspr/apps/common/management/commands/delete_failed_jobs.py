@@ -20,6 +20,12 @@ class Command(JasprBaseCommand):
             default=24,
             help="Failed jobs in the 'high' queue older than this number of hours should be deleted.",
         )
+        parser.add_argument(
+            "--notes",
+            type=int,
+            default=24,
+            help="Failed jobs in the 'notes' queue older than this number of hours should be deleted.",
+        )
         parser.add_argument(
             "--default",
             type=int,
@@ -36,6 +42,7 @@ class Command(JasprBaseCommand):
     def handle(self, *app_labels, **options):
         cleanup_failed_jobs(
             high_delta=timedelta(hours=options["high"]),
+            notes_delta=timedelta(hours=options["notes"]),
             default_delta=timedelta(hours=options["default"]),
             low_delta=timedelta(hours=options["low"]),
             log_regular=self.stdout.write,
@@ -0,0 +1,13 @@
+from jaspr.apps.common.jobs.messaging import drain_message_buffer
+from jaspr.apps.common.management.base import JasprBaseCommand
+
+
+class Command(JasprBaseCommand):
+    """
+    Run this command to send the emails and text messages buffered in Redis
+    """
+
+    help = __doc__
+
+    def handle(self, *args, **options) -> None:
+        drain_message_buffer()
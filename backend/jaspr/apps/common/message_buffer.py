@@ -0,0 +1,140 @@
+"""
+Buffered sending of emails and text messages.
+
+Each `email_user` or `text_user` job sends one message, opening an SMTP connection (and
+a Twilio connection, in the job's work horse) for it. For messages sent in bulk (E.g.
+the Tools to Go reminder emails, see `check_and_resend_tools_to_go_setup_email`), the
+rendered messages are instead appended to a list per channel in Redis
+(`buffer_messages`), and `drain_message_buffer` (see
+`jaspr.apps.common.jobs.messaging.drain_message_buffer`) sends them
+`MESSAGE_BUFFER_BATCH_SIZE` at a time (see `send_emails` and `send_texts`): the emails
+of a batch over one SMTP connection, the text messages over one Twilio session, and
+their `EmailLog`s and `SMSLog`s created with `bulk_create`.
+
+Like the `Action` buffer (see `jaspr.apps.kiosk.action_buffer`), the buffer is drained
+(a job is queued) when a channel holds `MESSAGE_BUFFER_BATCH_SIZE` messages, or when a
+message is buffered and the oldest one of its channel has been waiting for
+`MESSAGE_BUFFER_MAX_LATENCY_SECONDS`. The buffer is also drained periodically (every
+minute, see the "Drain Message Buffer" cron job).
+
+A batch is removed from the buffer before it's sent. A sender only raises before it
+sends any message of the batch (E.g. when its users can't be loaded); a message that
+can't be sent is logged (and a text message retried) instead, see `send_emails` and
+`send_texts`. So a batch whose sender raises hasn't been sent, and is put back at the
+front of the buffer, and left for the next drain.
+
+NOTE: A worker dying while sending a batch loses it.
+"""
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Mapping
+
+import django_rq
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EMAIL = "email"
+SMS = "sms"
+CHANNELS = (EMAIL, SMS)
+
+# Set while a job draining the buffer is queued, so one isn't queued per message.
+MESSAGE_BUFFER_DRAIN_QUEUED_KEY = "message-buffer:drain-queued"
+
+
+def get_connection():
+    return django_rq.get_connection("default")
+
+
+def get_buffer_key(channel: str) -> str:
+    return f"message-buffer:{channel}"
+
+
+def buffer_messages(
+    channel: str, messages: List[Dict], queue_drain: Callable[[], None]
+) -> None:
+    """
+    Append `messages` (the keyword arguments of the `channel`'s sender, see
+    `drain_message_buffer`) to the buffer of `channel`, calling `queue_drain` if the
+    buffer should be drained (see the module docstring) and a drain isn't already
+    queued.
+    """
+    if not messages:
+        return
+    assert channel in CHANNELS, f"Unknown channel: {channel}"
+    key = get_buffer_key(channel)
+    buffered_at = time.time()
+    connection = get_connection()
+    pipeline = connection.pipeline()
+    pipeline.rpush(
+        key,
+        *(json.dumps({**message, "buffered_at": buffered_at}) for message in messages),
+    )
+    pipeline.lindex(key, 0)
+    length, oldest = pipeline.execute()
+
+    waited = buffered_at - json.loads(oldest)["buffered_at"]
+    if (
+        length >= settings.MESSAGE_BUFFER_BATCH_SIZE
+        or waited >= settings.MESSAGE_BUFFER_MAX_LATENCY_SECONDS
+    ) and connection.set(
+        MESSAGE_BUFFER_DRAIN_QUEUED_KEY,
+        1,
+        nx=True,
+        ex=max(settings.MESSAGE_BUFFER_MAX_LATENCY_SECONDS, 1),
+    ):
+        queue_drain()
+
+
+def pop_batch(connection, channel: str, batch_size: int) -> List[bytes]:
+    key = get_buffer_key(channel)
+    pipeline = connection.pipeline(transaction=True)
+    pipeline.lrange(key, 0, batch_size - 1)
+    pipeline.ltrim(key, batch_size, -1)
+    batch, _ = pipeline.execute()
+    return batch
+
+
+def return_batch(connection, channel: str, batch: List[bytes]) -> None:
+    """Put a popped `batch` back at the front of the buffer of `channel`, in order."""
+    connection.lpush(get_buffer_key(channel), *reversed(batch))
+
+
+def deserialize_message(serialized: bytes) -> Dict:
+    message = json.loads(serialized)
+    message.pop("buffered_at", None)
+    return message
+
+
+def drain_message_buffer(senders: Mapping[str, Callable[[List[Dict]], List]]) -> int:
+    """
+    Send the buffered messages of each channel with its sender in `senders`, a batch at
+    a time, returning the number of messages sent (or attempted). A channel stops being
+    drained at the first batch its sender raises for, which is put back in the buffer.
+    A sender must not raise once it has sent a message of the batch, or that message is
+    sent again.
+    """
+    connection = get_connection()
+    connection.delete(MESSAGE_BUFFER_DRAIN_QUEUED_KEY)
+    drained = 0
+    for channel in CHANNELS:
+        while True:
+            batch = pop_batch(connection, channel, settings.MESSAGE_BUFFER_BATCH_SIZE)
+            if not batch:
+                break
+            try:
+                senders[channel]([deserialize_message(serialized) for serialized in batch])
+            except Exception:
+                logger.exception(
+                    "Unable to send a batch of %s buffered %s messages, returning it to "
+                    "the buffer.",
+                    len(batch),
+                    channel,
+                )
+                return_batch(connection, channel, batch)
+                break
+            drained += len(batch)
+    if drained:
+        logger.info("Sent %s buffered messages", drained)
+    return drained
@@ -0,0 +1,182 @@
+"""
+Recording the database queries of a request (or any block of code) and checking them
+against a query budget.
+
+- `QueryRecorder` records the queries run on a connection: how many there were, how
+  long they took, and the fingerprint of each (see `get_fingerprint`), so the same
+  query running over and over (usually an N+1) can be spotted.
+- Views declare their budgets with a `query_budgets` class attribute, a dictionary of
+  HTTP method -> `QueryBudget`.
+- `QueryBudgetMiddleware` records a sample of requests (`QUERY_BUDGET_SAMPLE_RATE`),
+  logging their metrics and a warning for any over their view's budget. With
+  `QUERY_BUDGET_STRICT` (on for tests), every request is recorded and one over budget
+  raises `QueryBudgetExceeded`.
+- A view can swap in another budget for a request that takes a slower path (E.g. a
+  one-off build of what's usually read) with `set_query_budget`.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# E.g. `IN (%s, %s, %s)` -> `IN (...)`, so a query with a different number of
+# parameters has the same fingerprint.
+PLACEHOLDER_LIST_RE = re.compile(r"\((?:%s, )*%s\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_fingerprint(sql: str) -> str:
+    """
+    Return `sql` without what varies between runs of the "same" query. Parameters are
+    already separate from the SQL, so this only has to collapse lists of placeholders
+    and whitespace.
+    """
+    return WHITESPACE_RE.sub(" ", PLACEHOLDER_LIST_RE.sub("(...)", sql)).strip()
+
+
+class QueryRecorder:
+    """
+    Context manager recording the queries run on the `using` connection (of the
+    current thread).
+    """
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints: Counter = Counter()
+        self._execute_wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[get_fingerprint(sql)] += 1
+
+    def __enter__(self) -> "QueryRecorder":
+        self._execute_wrapper = self.connection.execute_wrapper(self)
+        self._execute_wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._execute_wrapper.__exit__(exc_type, exc_value, traceback)
+        self._execute_wrapper = None
+
+    @property
+    def duplicates(self) -> Dict[str, int]:
+        """Fingerprint -> number of times run, for queries run more than once."""
+        return {
+            fingerprint: count
+            for fingerprint, count in self.fingerprints.most_common()
+            if count > 1
+        }
+
+    @property
+    def max_duplicate_count(self) -> int:
+        return max(self.fingerprints.values(), default=0)
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    # The most queries allowed.
+    max_queries: Optional[int] = None
+    # The most times the same query (by fingerprint) can run.
+    max_duplicate_queries: Optional[int] = None
+
+    def get_violations(self, recorder: QueryRecorder) -> List[str]:
+        violations = []
+        if self.max_queries is not None and recorder.count > self.max_queries:
+            violations.append(
+                f"{recorder.count} queries ran, the budget is {self.max_queries}"
+            )
+        if self.max_duplicate_queries is not None:
+            for fingerprint, count in recorder.duplicates.items():
+                if count > self.max_duplicate_queries:
+                    violations.append(
+                        f"The same query ran {count} times, the budget is "
+                        f"{self.max_duplicate_queries}: {fingerprint}"
+                    )
+        return violations
+
+
+def set_query_budget(request, budget: QueryBudget) -> None:
+    """
+    Check `request` (a Django or Django REST Framework request) against `budget`
+    instead of its view's budget for its method.
+    """
+    # Django REST Framework's `Request` only proxies reads to the `HttpRequest`.
+    http_request = getattr(request, "_request", request)
+    http_request.query_budgets = {
+        **getattr(http_request, "query_budgets", {}),
+        http_request.method: budget,
+    }
+
+
+class QueryBudgetMiddleware:
+    """See the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        strict = settings.QUERY_BUDGET_STRICT
+        if not strict and random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        # NOTE: The queries of a streamed response's content run after this returns,
+        # so they aren't recorded.
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view_name = getattr(request, "query_budget_view_name", None)
+        if view_name is None:
+            return response
+        if not strict:
+            logger.info(
+                "Query metrics: view=%s method=%s status=%s queries=%s "
+                "max_duplicate_queries=%s db_time=%.3fs time=%.3fs",
+                view_name,
+                request.method,
+                response.status_code,
+                recorder.count,
+                recorder.max_duplicate_count,
+                recorder.duration,
+                duration,
+            )
+
+        budget: Optional[QueryBudget] = request.query_budgets.get(request.method)
+        violations = budget.get_violations(recorder) if budget is not None else []
+        if violations:
+            message = f"{view_name} ({request.method}) is over its query budget: " + (
+                "; ".join(violations)
+            )
+            if strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs) -> None:
+        # `cls` is set by Django REST Framework's `as_view`, `view_class` by Django's.
+        view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        request.query_budget_view_name = (
+            view_class.__name__ if view_class is not None else view_func.__name__
+        )
+        request.query_budgets = getattr(view_class, "query_budgets", {})
+        return None
@@ -8,10 +8,19 @@ import django_rq
 import pytz
 from django.core import mail
 from django.template.exceptions import TemplateDoesNotExist
+from django.test import override_settings
 from django_rq import get_worker
 from freezegun import freeze_time
 
-from jaspr.apps.common.jobs.messaging import message_user_from_template, text_user
+from jaspr.apps.common import message_buffer
+from jaspr.apps.common.jobs.messaging import (
+    drain_message_buffer,
+    message_user_from_template,
+    send_emails,
+    send_texts,
+    text_user,
+    text_user_from_templates,
+)
 from jaspr.apps.message_logs.models import EmailLog, SMSLog
 from jaspr.apps.test_infrastructure.mixins.common_mixins import (
     TwilioClientTestCaseMixin,
@@ -296,3 +305,175 @@ class EmailAndSMSMessagingTest(TwilioClientTestCaseMixin, MessagingTest):
                 message_id="message-sid-success",
             ).exists()
         )
+
+
+class BulkMessagingTest(TwilioClientTestCaseMixin, MessagingTest):
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            self.create_user(
+                email=f"user{number}@test.com",
+                preferred_message_type="email",
+                mobile_phone=f"+1415555267{number}",
+            )
+            for number in range(1, 4)
+        ]
+
+    def test_emails_sent_over_one_connection(self):
+        """Are the emails sent over one connection, with their logs created at once?"""
+        messages = [
+            {"user_id": user.id, "subject": "Subject", "txt": "Text", "html": None}
+            for user in self.users
+        ]
+        with patch(
+            "jaspr.apps.common.jobs.messaging.get_connection",
+            wraps=mail.get_connection,
+        ) as mock_get_connection, self.assertNumQueries(2):
+            email_log_ids = send_emails(messages)
+        self.assertEqual(mock_get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            set(EmailLog.objects.values_list("user_email", "email_response")),
+            {(user.email, "1") for user in self.users},
+        )
+        self.assertEqual(len(email_log_ids), 3)
+
+    def test_emails_logged_when_connection_fails(self):
+        """
+        Are emails that can't be sent, because the connection can't be opened, still
+        logged (without a response)?
+        """
+        messages = [
+            {"user_id": user.id, "subject": "Subject", "txt": "Text", "html": None}
+            for user in self.users
+        ]
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.open",
+            side_effect=ConnectionRefusedError,
+        ), patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=ConnectionRefusedError,
+        ):
+            email_log_ids = send_emails(messages)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(email_log_ids), 3)
+        self.assertEqual(
+            set(EmailLog.objects.values_list("user_email", "email_response")),
+            {(user.email, None) for user in self.users},
+        )
+
+    def test_texts_sent_with_their_logs_created_at_once(self):
+        """Are the text messages sent with their logs created and updated at once?"""
+        messages = [
+            {"user_id": user.id, "title": "Title", "body": "Body"} for user in self.users
+        ]
+        with self.patched_twilio_client_messages_create() as mock_create:
+            mock_create.side_effect = [
+                mock_create.side_effect(),
+                self.twilio_rest_exception_instance,
+                mock_create.side_effect(),
+            ]
+            with patch(
+                "jaspr.apps.common.jobs.messaging.retry_text_user.delay"
+            ) as mock_retry:
+                statuses = send_texts(messages)
+        self.assertEqual([status for _, status in statuses], ["sent", "retry", "sent"])
+        mock_retry.assert_called_once_with(statuses[1][0])
+        sms_log = SMSLog.objects.get(pk=statuses[0][0])
+        self.assertEqual(sms_log.mobile_phone, self.users[0].mobile_phone)
+        self.assertEqual(sms_log.message_id, "message-sid-success")
+        self.assertIsNotNone(sms_log.sent)
+        self.assertEqual(SMSLog.objects.get(pk=statuses[1][0]).status, "retry")
+
+    @override_settings(MESSAGE_BUFFER_BATCH_SIZE=3, MESSAGE_BUFFER_MAX_LATENCY_SECONDS=60)
+    def test_buffered_texts_not_sent_twice_when_a_send_fails(self):
+        """
+        Is a batch of text messages where sending one raises (with something other than
+        a `TwilioRestException`) not put back in the buffer, so the ones already sent
+        aren't sent again?
+        """
+        with self.patched_twilio_client_messages_create() as mock_create, patch(
+            "jaspr.apps.common.jobs.messaging.retry_text_user.delay"
+        ) as mock_retry:
+            mock_create.side_effect = [
+                mock_create.side_effect(),
+                ConnectionError,
+                mock_create.side_effect(),
+            ]
+            for user in self.users:
+                text_user_from_templates(user.id, "d/bf", buffered=True)
+            self.assertEqual(drain_message_buffer(), 0)
+
+        self.assertEqual(
+            [kwargs["to"] for _, kwargs in mock_create.call_args_list],
+            [user.mobile_phone.as_e164 for user in self.users],
+        )
+        self.assertEqual(
+            message_buffer.get_connection().llen(
+                message_buffer.get_buffer_key(message_buffer.SMS)
+            ),
+            0,
+        )
+        self.assertEqual(
+            list(SMSLog.objects.order_by("pk").values_list("status", flat=True)),
+            ["sent", "retry", "sent"],
+        )
+        mock_retry.assert_called_once_with(SMSLog.objects.get(status="retry").pk)
+
+    def test_sent_texts_logged_when_their_logs_cant_be_updated_at_once(self):
+        """Are the logs of sent text messages saved one at a time if `bulk_update` fails?"""
+        messages = [
+            {"user_id": user.id, "title": "Title", "body": "Body"} for user in self.users
+        ]
+        with self.patched_twilio_client_messages_create(), patch(
+            "jaspr.apps.message_logs.models.SMSLog.objects.bulk_update",
+            side_effect=Exception,
+        ):
+            statuses = send_texts(messages)
+        self.assertEqual([status for _, status in statuses], ["sent"] * 3)
+        self.assertEqual(
+            list(SMSLog.objects.values_list("status", flat=True)), ["sent"] * 3
+        )
+
+    @override_settings(MESSAGE_BUFFER_BATCH_SIZE=3, MESSAGE_BUFFER_MAX_LATENCY_SECONDS=60)
+    def test_buffered_messages_sent_in_batches(self):
+        """
+        Are buffered messages only sent once the buffer holds a batch, or the oldest
+        one has been buffered for too long?
+        """
+        message_user_from_template(self.users[0], "d/bf", buffered=True)
+        message_user_from_template(self.users[1], "d/bf", buffered=True)
+        self.assertEqual(len(mail.outbox), 0)
+        message_user_from_template(self.users[2], "d/bf", buffered=True)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(EmailLog.objects.count(), 3)
+
+        message_user_from_template(self.users[0], "d/bf", buffered=True)
+        self.assertEqual(len(mail.outbox), 3)
+        with override_settings(MESSAGE_BUFFER_MAX_LATENCY_SECONDS=0):
+            message_user_from_template(self.users[1], "d/bf", buffered=True)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[4].to, [self.users[1].email])
+
+    @override_settings(MESSAGE_BUFFER_BATCH_SIZE=3, MESSAGE_BUFFER_MAX_LATENCY_SECONDS=60)
+    def test_buffered_messages_returned_when_sender_fails(self):
+        """Is a batch whose sender raises put back in the buffer, and sent later?"""
+        message_user_from_template(self.users[0], "d/bf", buffered=True)
+        message_user_from_template(self.users[1], "d/bf", buffered=True)
+        with patch(
+            "jaspr.apps.common.jobs.messaging.send_emails", side_effect=Exception
+        ):
+            message_user_from_template(self.users[2], "d/bf", buffered=True)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            message_buffer.get_connection().llen(
+                message_buffer.get_buffer_key(message_buffer.EMAIL)
+            ),
+            3,
+        )
+
+        self.assertEqual(drain_message_buffer(), 3)
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [[user.email] for user in self.users],
+        )
@@ -0,0 +1,95 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.views import APIView
+
+from jaspr.apps.accounts.models import User
+from jaspr.apps.common.query_budget import (
+    QueryBudget,
+    QueryBudgetExceeded,
+    QueryBudgetMiddleware,
+    QueryRecorder,
+    get_fingerprint,
+    set_query_budget,
+)
+from jaspr.apps.test_infrastructure.testcases import JasprTestCase
+
+
+class BudgetedView(APIView):
+    query_budgets = {"GET": QueryBudget(max_queries=2, max_duplicate_queries=1)}
+
+
+class TestQueryBudget(JasprTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [self.create_user(email=f"user-{i}@test.com") for i in range(3)]
+
+    def run_queries(self, request) -> HttpResponse:
+        for user in self.users:
+            User.objects.filter(pk=user.pk).exists()
+        return HttpResponse()
+
+    def get_response(self, get_response=None) -> HttpResponse:
+        middleware = QueryBudgetMiddleware(get_response or self.run_queries)
+        request = RequestFactory().get("/")
+        middleware.process_view(request, BudgetedView.as_view(), (), {})
+        return middleware(request)
+
+    def test_get_fingerprint(self):
+        self.assertEqual(
+            get_fingerprint('SELECT "id"\n  FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            'SELECT "id" FROM "t" WHERE "id" IN (...)',
+        )
+        self.assertEqual(
+            get_fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s)'),
+            'SELECT "id" FROM "t" WHERE "id" IN (...)',
+        )
+
+    def test_recorder_finds_duplicate_queries(self):
+        with QueryRecorder() as recorder:
+            self.run_queries(None)
+            User.objects.count()
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.max_duplicate_count, 3)
+        self.assertEqual(list(recorder.duplicates.values()), [3])
+        self.assertEqual(QueryBudget(max_queries=4, max_duplicate_queries=3).get_violations(recorder), [])
+        violations = QueryBudget(max_queries=3, max_duplicate_queries=2).get_violations(recorder)
+        self.assertEqual(len(violations), 2)
+        self.assertIn("4 queries ran, the budget is 3", violations[0])
+        self.assertIn("The same query ran 3 times, the budget is 2", violations[1])
+
+    def test_strict_mode_raises_over_budget(self):
+        with self.assertRaisesRegex(QueryBudgetExceeded, "BudgetedView \\(GET\\)"):
+            self.get_response()
+
+    def test_set_query_budget_replaces_the_view_budget(self):
+        def run_queries_with_budget(request) -> HttpResponse:
+            set_query_budget(request, QueryBudget(max_queries=3, max_duplicate_queries=3))
+            return self.run_queries(request)
+
+        response = self.get_response(run_queries_with_budget)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BudgetedView.query_budgets["GET"].max_queries, 2)
+
+    @override_settings(QUERY_BUDGET_STRICT=False, QUERY_BUDGET_SAMPLE_RATE=1.0)
+    def test_sampled_request_logs_metrics_and_warning(self):
+        with self.assertLogs("jaspr.apps.common.query_budget", "INFO") as logs:
+            response = self.get_response()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("view=BudgetedView method=GET status=200 queries=3", logs.output[0])
+        self.assertIn("is over its query budget", logs.output[1])
+
+    @override_settings(QUERY_BUDGET_STRICT=False, QUERY_BUDGET_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_not_recorded(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs("jaspr.apps.common.query_budget", "INFO"):
+                self.get_response()
+
+    def test_assert_query_budget(self):
+        with self.assertQueryBudget(max_queries=3, max_duplicate_queries=3):
+            self.run_queries(None)
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(max_duplicate_queries=2):
+                self.run_queries(None)
@@ -0,0 +1,5 @@
+class EhrRequestError(Exception):
+    """
+    A request to the EHR failed (E.g. the EHR is down or rejected the request), as
+    opposed to the note or patient not being set up to be sent.
+    """
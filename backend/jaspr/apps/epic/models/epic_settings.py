@@ -10,12 +10,12 @@ from functools import cached_property
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 from django.db import models
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from cache_memoize import cache_memoize
 from model_utils import Choices
 from fernet_fields import EncryptedTextField
 from jaspr.apps.common.models import JasprAbstractBaseModel
+from ..errors import EhrRequestError
+from ..token_manager import token_manager
 
 logger = logging.getLogger("EPIC")
 
@@ -83,12 +83,8 @@ class EpicSettings(JasprAbstractBaseModel):
 
         url = f"{iss}/metadata"
 
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.25)
-        session.mount("https://", HTTPAdapter(max_retries=retries))
-
         try:
-            response = session.get(url, headers={"Accept": "application/json+fhir"})
+            response = token_manager.session.get(url, headers={"Accept": "application/json+fhir"})
         except requests.exceptions.RequestException as e:
             logger.warning("Unable to fetch metadata from %s", iss,)
             raise e
@@ -122,6 +118,10 @@ class EpicSettings(JasprAbstractBaseModel):
             logger.exception("ISS url is not provided")
             return None
 
+        return token_manager.get_token_url(iss, EpicSettings.get_token_url_from_metadata)
+
+    @staticmethod
+    def get_token_url_from_metadata(iss):
         try:
             metadata = EpicSettings.get_metadata(iss)
         except:
@@ -135,21 +135,28 @@ class EpicSettings(JasprAbstractBaseModel):
             if extension["url"] == "token":
                 return extension["valueUri"]
 
-
     def get_access_token(self):
+        """
+        Return a bearer token for Epic backend services, reusing the cached one if it
+        hasn't expired yet.
+        """
+        return token_manager.get_access_token(self)
+
+    def request_access_token(self, session):
+        """Request a new access token, returning the token response data."""
         private_key = self.private_key
 
         epoch_time = int(time.time())
         token_url = self.get_token_url(self.iss_url)
         if not token_url:
             logger.exception(f"Unable to get token urls from EPIC instance metadata for {self.iss_url}")
-            raise Exception("Unable to generate access token")
+            raise EhrRequestError("Unable to generate access token")
 
         encoded_jwt = jwt.encode(
             {
                 "iss": settings.EPIC_BACKEND_CLIENT_ID,
                 "sub": settings.EPIC_BACKEND_CLIENT_ID,
-                "aud": self.get_token_url(self.iss_url),
+                "aud": token_url,
                 "jti": secrets.token_urlsafe(16),
                 "exp": epoch_time + (60 * 4),
                 "nbf": epoch_time - 60,
@@ -165,24 +172,19 @@ class EpicSettings(JasprAbstractBaseModel):
             "client_assertion": encoded_jwt,
         }
 
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.25)
-        session.mount("https://", HTTPAdapter(max_retries=retries))
-
         try:
-            response = requests.post(token_url, data=payload)
+            response = session.post(token_url, data=payload)
         except requests.exceptions.RequestException as e:
             logger.warning("Unable to fetch access token from %s for EPIC Settings (%s)", token_url, self.pk)
             raise e
 
         if response.status_code == 200:
-            data = response.json()
-            return data["access_token"]
+            return response.json()
         else:
             logger.info("Request for access token failed with status code %s", response.status_code)
             logger.info(response.text)
 
-        raise Exception("Unable to generate access token")
+        raise EhrRequestError("Unable to generate access token")
 
     def save(self, *args, **kwargs):
         """Create a private key if one has not been set"""
@@ -11,6 +11,9 @@ from django.db import models
 from model_utils import Choices
 from fernet_fields import EncryptedTextField
 
+from ..errors import EhrRequestError
+from ..token_manager import token_manager
+
 
 logger = logging.getLogger(__name__)
 
@@ -166,7 +169,7 @@ class NotesLog(JasprAbstractBaseModel):
         self.status = "in-progress"
         self.save()
 
-        save_note_response = requests.post(
+        save_note_response = token_manager.session.post(
             document_reference_url,
             json.dumps(payload),
             headers={
@@ -183,6 +186,9 @@ class NotesLog(JasprAbstractBaseModel):
             self.status = "sent"
             self.save()
         else:
+            if save_note_response.status_code == requests.codes.unauthorized:
+                # Don't keep using a cached access token Epic no longer accepts.
+                token_manager.invalidate_access_token(epic_settings)
             logger.exception("Saving note to EPIC failed with response code %s and body %s",
                              save_note_response.status_code,
                              save_note_response.text
@@ -194,4 +200,4 @@ class NotesLog(JasprAbstractBaseModel):
 
             email_engineering("Saving note to EHR failed",
                               f"Sending note to EHR failed for encounter {encounter}. Check the logs for more details")
-            raise Exception("Unable to save note into EHR")
+            raise EhrRequestError("Unable to save note into EHR")
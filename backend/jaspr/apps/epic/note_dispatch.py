@@ -0,0 +1,208 @@
+"""
+Sending batches of notes to the EHR concurrently.
+
+Notes are grouped by `EpicSettings` (the EHR instance they are sent to). Each group
+is worked through by at most `EHR_NOTE_DISPATCH_MAX_WORKERS_PER_EPIC_SETTINGS`
+"lanes", and all lanes share a pool of `EHR_NOTE_DISPATCH_MAX_WORKERS` threads, so a
+slow EHR instance only ties up its own lanes.
+
+Each EHR instance has a circuit breaker. After
+`EHR_NOTE_DISPATCH_CIRCUIT_BREAKER_THRESHOLD` consecutive `EhrRequestError`s (or
+request exceptions), the remaining notes for it are skipped, and so are its notes in
+later runs until the cooldown is over.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from sentry_sdk import capture_exception
+
+from .errors import EhrRequestError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NoteDispatchTask:
+    epic_settings_id: int
+    # Human readable description for logging, e.g. "narrative note for encounter 1".
+    description: str
+    # Renders and sends the note.
+    send: Callable[[], Any]
+
+
+@dataclass
+class NoteDispatchResult:
+    OUTCOME_SENT = "sent"
+    OUTCOME_FAILED = "failed"
+    OUTCOME_SKIPPED = "skipped"
+
+    task: NoteDispatchTask
+    outcome: str
+    duration: float = 0.0
+    error: Optional[Exception] = None
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, cooldown: int):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures: Dict[int, int] = defaultdict(int)
+
+    @staticmethod
+    def get_cache_key(epic_settings_id: int) -> str:
+        return f"ehr-note-dispatch-circuit-open:{epic_settings_id}"
+
+    def is_open(self, epic_settings_id: int) -> bool:
+        return bool(cache.get(self.get_cache_key(epic_settings_id)))
+
+    def record_success(self, epic_settings_id: int) -> None:
+        with self._lock:
+            self._failures[epic_settings_id] = 0
+
+    def record_failure(self, epic_settings_id: int) -> None:
+        with self._lock:
+            self._failures[epic_settings_id] += 1
+            tripped = self._failures[epic_settings_id] >= self.threshold
+        if tripped:
+            logger.warning(
+                "Pausing sending notes to the EHR for EpicSettings %s for %s seconds "
+                "after %s consecutive failures",
+                epic_settings_id,
+                self.cooldown,
+                self.threshold,
+            )
+            cache.set(self.get_cache_key(epic_settings_id), True, self.cooldown)
+
+
+def is_ehr_request_error(error: Exception) -> bool:
+    return isinstance(error, (EhrRequestError, requests.exceptions.RequestException))
+
+
+def run_task(task: NoteDispatchTask, circuit_breaker: CircuitBreaker) -> NoteDispatchResult:
+    if circuit_breaker.is_open(task.epic_settings_id):
+        return NoteDispatchResult(task=task, outcome=NoteDispatchResult.OUTCOME_SKIPPED)
+
+    start = time.perf_counter()
+    try:
+        task.send()
+    except Exception as e:
+        duration = time.perf_counter() - start
+        logger.exception(
+            "Failed to auto send %s (EpicSettings %s)",
+            task.description,
+            task.epic_settings_id,
+            exc_info=e,
+        )
+        capture_exception(e)
+        if is_ehr_request_error(e):
+            circuit_breaker.record_failure(task.epic_settings_id)
+        return NoteDispatchResult(
+            task=task, outcome=NoteDispatchResult.OUTCOME_FAILED, duration=duration, error=e
+        )
+    circuit_breaker.record_success(task.epic_settings_id)
+    return NoteDispatchResult(
+        task=task,
+        outcome=NoteDispatchResult.OUTCOME_SENT,
+        duration=time.perf_counter() - start,
+    )
+
+
+def run_lane(
+    queue: Deque[NoteDispatchTask],
+    circuit_breaker: CircuitBreaker,
+    close_connection: bool,
+) -> List[NoteDispatchResult]:
+    results = []
+    try:
+        while True:
+            try:
+                task = queue.popleft()
+            except IndexError:
+                break
+            result = run_task(task, circuit_breaker)
+            logger.info(
+                "EHR note dispatch: %s %s (EpicSettings %s) in %.3fs",
+                result.outcome,
+                task.description,
+                task.epic_settings_id,
+                result.duration,
+            )
+            results.append(result)
+    finally:
+        if close_connection:
+            # Worker threads each open their own database connection.
+            connection.close()
+    return results
+
+
+def dispatch_notes(
+    tasks: Iterable[NoteDispatchTask],
+    max_workers: Optional[int] = None,
+    max_workers_per_epic_settings: Optional[int] = None,
+) -> List[NoteDispatchResult]:
+    """
+    Run `tasks`, returning a `NoteDispatchResult` for each one. Results are in the
+    order tasks finished within each `EpicSettings`.
+    """
+    if max_workers is None:
+        max_workers = settings.EHR_NOTE_DISPATCH_MAX_WORKERS
+    if max_workers_per_epic_settings is None:
+        max_workers_per_epic_settings = (
+            settings.EHR_NOTE_DISPATCH_MAX_WORKERS_PER_EPIC_SETTINGS
+        )
+    circuit_breaker = CircuitBreaker(
+        settings.EHR_NOTE_DISPATCH_CIRCUIT_BREAKER_THRESHOLD,
+        settings.EHR_NOTE_DISPATCH_CIRCUIT_BREAKER_COOLDOWN_SECONDS,
+    )
+
+    queues: Dict[int, Deque[NoteDispatchTask]] = defaultdict(deque)
+    for task in tasks:
+        queues[task.epic_settings_id].append(task)
+
+    # Each lane works through the queue of one `EpicSettings`.
+    lanes = [
+        queue
+        for queue in queues.values()
+        for _ in range(min(len(queue), max(1, max_workers_per_epic_settings)))
+    ]
+
+    results: List[NoteDispatchResult] = []
+    if max_workers <= 1 or len(lanes) <= 1:
+        for queue in lanes:
+            results.extend(run_lane(queue, circuit_breaker, close_connection=False))
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(lanes)),
+            thread_name_prefix="ehr-note-dispatch",
+        ) as executor:
+            futures = [
+                executor.submit(run_lane, queue, circuit_breaker, True) for queue in lanes
+            ]
+            for future in futures:
+                results.extend(future.result())
+
+    for epic_settings_id in queues:
+        epic_settings_results = [
+            r for r in results if r.task.epic_settings_id == epic_settings_id
+        ]
+        durations = [r.duration for r in epic_settings_results if r.duration]
+        logger.info(
+            "EHR note dispatch for EpicSettings %s: %s sent, %s failed, %s skipped, "
+            "%.3fs max latency",
+            epic_settings_id,
+            sum(r.outcome == NoteDispatchResult.OUTCOME_SENT for r in epic_settings_results),
+            sum(r.outcome == NoteDispatchResult.OUTCOME_FAILED for r in epic_settings_results),
+            sum(r.outcome == NoteDispatchResult.OUTCOME_SKIPPED for r in epic_settings_results),
+            max(durations, default=0.0),
+        )
+    return results
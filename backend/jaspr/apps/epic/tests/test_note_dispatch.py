@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from jaspr.apps.epic.errors import EhrRequestError
+from jaspr.apps.epic.note_dispatch import (
+    NoteDispatchResult,
+    NoteDispatchTask,
+    dispatch_notes,
+)
+from jaspr.apps.test_infrastructure.testcases import JasprSimpleTestCase
+
+
+@override_settings(
+    EHR_NOTE_DISPATCH_CIRCUIT_BREAKER_THRESHOLD=3,
+    EHR_NOTE_DISPATCH_CIRCUIT_BREAKER_COOLDOWN_SECONDS=300,
+)
+class NoteDispatchTestCase(JasprSimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def make_tasks(self, epic_settings_id, count, send):
+        return [
+            NoteDispatchTask(
+                epic_settings_id=epic_settings_id,
+                description=f"note {i}",
+                send=send,
+            )
+            for i in range(count)
+        ]
+
+    def outcomes(self, results, epic_settings_id):
+        return [r.outcome for r in results if r.task.epic_settings_id == epic_settings_id]
+
+    def test_concurrency_is_limited_per_epic_settings(self):
+        lock = threading.Lock()
+        running = defaultdict(int)
+        max_running = defaultdict(int)
+
+        def make_send(epic_settings_id):
+            def send():
+                with lock:
+                    running[epic_settings_id] += 1
+                    max_running[epic_settings_id] = max(
+                        max_running[epic_settings_id], running[epic_settings_id]
+                    )
+                time.sleep(0.02)
+                with lock:
+                    running[epic_settings_id] -= 1
+
+            return send
+
+        tasks = self.make_tasks(1, 6, make_send(1)) + self.make_tasks(2, 6, make_send(2))
+        results = dispatch_notes(tasks, max_workers=4, max_workers_per_epic_settings=2)
+
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(r.outcome == NoteDispatchResult.OUTCOME_SENT for r in results))
+        self.assertTrue(all(r.duration > 0 for r in results))
+        self.assertEqual(max_running[1], 2)
+        self.assertEqual(max_running[2], 2)
+
+    def test_circuit_breaker_skips_failing_epic_settings(self):
+        def fail():
+            raise EhrRequestError("Unable to save note into EHR")
+
+        tasks = self.make_tasks(1, 5, fail) + self.make_tasks(2, 2, lambda: None)
+        results = dispatch_notes(tasks, max_workers=1, max_workers_per_epic_settings=1)
+
+        self.assertEqual(
+            self.outcomes(results, 1),
+            [NoteDispatchResult.OUTCOME_FAILED] * 3 + [NoteDispatchResult.OUTCOME_SKIPPED] * 2,
+        )
+        self.assertEqual(self.outcomes(results, 2), [NoteDispatchResult.OUTCOME_SENT] * 2)
+
+        # The breaker stays open for later runs until the cooldown is over.
+        results = dispatch_notes(self.make_tasks(1, 1, lambda: None), max_workers=1)
+        self.assertEqual(self.outcomes(results, 1), [NoteDispatchResult.OUTCOME_SKIPPED])
+
+    def test_other_errors_do_not_trip_circuit_breaker(self):
+        def fail():
+            raise Exception("Patient does not have a FHIR ID set")
+
+        results = dispatch_notes(self.make_tasks(1, 5, fail), max_workers=1)
+
+        self.assertEqual(self.outcomes(results, 1), [NoteDispatchResult.OUTCOME_FAILED] * 5)
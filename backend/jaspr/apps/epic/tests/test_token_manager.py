@@ -0,0 +1,107 @@
+import responses
+from django.core.cache import cache
+from rest_framework import status
+
+from jaspr.apps.epic.models import EpicSettings, EpicDepartmentSettings, NotesLog, PatientEhrIdentifier
+from jaspr.apps.epic.token_manager import decrypt_access_token, token_manager
+from jaspr.apps.test_infrastructure.mixins.jaspr_mixins import (
+    JasprApiTokenMixin,
+)
+from jaspr.apps.test_infrastructure.testcases import JasprTestCase
+
+
+class EpicTokenManagerTestCase(JasprApiTokenMixin, JasprTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        token_manager.clear()
+        self.system, self.clinic, self.department = self.create_full_healthcare_system()
+        self.patient = self.create_patient(department=self.department)
+        self.encounter = self.create_patient_encounter(patient=self.patient, department=self.department, fhir_id="efhirid")
+        self.epic_settings = EpicSettings.objects.create(
+            name="Test Provider",
+            provider="Epic",
+            iss_url="https://fakeprovider.com"
+        )
+        EpicDepartmentSettings.objects.create(
+            epic_settings=self.epic_settings,
+            department=self.department,
+            location_code="abc",
+            narrative_note_key="def",
+            stability_plan_note_key="ghi",
+            narrative_note_system_key="jkl",
+            stability_plan_system_key="mno",
+        )
+        PatientEhrIdentifier.objects.create(
+            epic_settings=self.epic_settings,
+            patient=self.patient,
+            fhir_id="phirid"
+        )
+
+    def add_responses(self, token_response, document_reference_status=status.HTTP_201_CREATED):
+        responses.add(responses.GET, 'https://fakeprovider.com/metadata',
+                      json=self.epic_iss_metadata, status=status.HTTP_200_OK)
+        responses.add(responses.POST, self.epic_token_url,
+                      json=token_response, status=status.HTTP_200_OK)
+        responses.add(responses.POST, "https://fakeprovider.com/DocumentReference",
+                      json={}, headers={"location": "sample/docfhir"}, status=document_reference_status)
+
+    def send_notes(self, count):
+        for i in range(count):
+            NotesLog.objects.create(
+                encounter=self.encounter,
+                note=f"test {i}",
+                note_type="stability_plan",
+            ).send_to_ehr()
+
+    def count_calls(self, url):
+        return len([call for call in responses.calls if call.request.url == url])
+
+    @responses.activate
+    def test_access_token_is_reused_until_it_expires(self):
+        self.add_responses({"access_token": "JWT...", "expires_in": 3600})
+
+        self.send_notes(3)
+
+        self.assertEqual(self.count_calls("https://fakeprovider.com/metadata"), 1)
+        self.assertEqual(self.count_calls(self.epic_token_url), 1)
+        self.assertEqual(self.count_calls("https://fakeprovider.com/DocumentReference"), 3)
+        self.assertEqual((token_manager.hits, token_manager.misses), (2, 1))
+        for call in responses.calls:
+            if call.request.url == "https://fakeprovider.com/DocumentReference":
+                self.assertEqual(call.request.headers["Authorization"], "Bearer JWT...")
+
+    @responses.activate
+    def test_access_token_is_cached_encrypted(self):
+        self.add_responses({"access_token": "JWT...", "expires_in": 3600})
+
+        self.send_notes(1)
+
+        cached = cache.get(token_manager.get_cache_key(self.epic_settings))
+        self.assertNotIn(b"JWT...", cached)
+        self.assertEqual(decrypt_access_token(cached), "JWT...")
+
+        # Not usable (E.g. cached before the keys changed), so requested again.
+        cache.set(token_manager.get_cache_key(self.epic_settings), "JWT...")
+        self.assertEqual(token_manager.get_access_token(self.epic_settings), "JWT...")
+        self.assertEqual(self.count_calls(self.epic_token_url), 2)
+
+    @responses.activate
+    def test_access_token_without_lifetime_is_not_cached(self):
+        self.add_responses({"access_token": "JWT..."})
+
+        self.send_notes(2)
+
+        self.assertEqual(self.count_calls(self.epic_token_url), 2)
+        self.assertEqual((token_manager.hits, token_manager.misses), (0, 2))
+
+    @responses.activate
+    def test_rejected_access_token_is_invalidated(self):
+        self.add_responses(
+            {"access_token": "JWT...", "expires_in": 3600},
+            document_reference_status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+        with self.assertRaises(Exception):
+            self.send_notes(1)
+        self.assertIsNone(cache.get(token_manager.get_cache_key(self.epic_settings)))
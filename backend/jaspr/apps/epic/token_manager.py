@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from cryptography.fernet import InvalidToken
+from django.core.cache import cache
+from django.utils.encoding import force_bytes, force_str
+from fernet_fields import EncryptedTextField
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Cached access tokens expire this many seconds before Epic says they do, so a token
+# taken from the cache is never about to expire while a request is using it.
+ACCESS_TOKEN_EXPIRY_MARGIN_SECONDS = 60
+# Same as how long the FHIR metadata is cached for (see `EpicSettings.get_metadata`).
+TOKEN_URL_TIMEOUT_SECONDS = 3600
+
+# Encrypts the cached access tokens with the keys of the encrypted model fields.
+_encrypted_field = EncryptedTextField()
+
+
+def encrypt_access_token(access_token: str) -> bytes:
+    return _encrypted_field.fernet.encrypt(force_bytes(access_token))
+
+
+def decrypt_access_token(encrypted: bytes) -> Optional[str]:
+    """Return `None` if `encrypted` can't be decrypted (E.g. the keys changed)."""
+    try:
+        return force_str(_encrypted_field.fernet.decrypt(force_bytes(encrypted)))
+    except InvalidToken:
+        return None
+
+
+class EpicTokenManager:
+    """
+    Caches what is needed to talk to Epic backend services:
+
+    - A pooled keep-alive `requests.Session` (with retries) shared by the process.
+    - The token endpoint of each ISS, resolved from the FHIR metadata, in process.
+    - The bearer token of each `EpicSettings`, encrypted in the cache (Redis) so it
+      is shared by every worker until shortly before it expires.
+
+    `hits` and `misses` count access token lookups served from/not from the cache
+    (updated under the lock, since notes are sent from threads, see
+    `jaspr.apps.epic.note_dispatch`).
+    """
+
+    def __init__(self):
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+        self._token_urls: Dict[str, Tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    retries = Retry(total=3, backoff_factor=0.25)
+                    session.mount("https://", HTTPAdapter(max_retries=retries))
+                    self._session = session
+        return self._session
+
+    def get_token_url(self, iss: str, metadata_url_getter) -> Optional[str]:
+        """
+        Return the token endpoint for `iss`, calling `metadata_url_getter(iss)` to
+        resolve it from the FHIR metadata the first time. Failed lookups (`None`) are
+        not cached.
+        """
+        now = time.monotonic()
+        token_url, expires_at = self._token_urls.get(iss, (None, now))
+        if token_url is None or expires_at <= now:
+            token_url = metadata_url_getter(iss)
+            if token_url:
+                self._token_urls[iss] = (token_url, now + TOKEN_URL_TIMEOUT_SECONDS)
+        return token_url
+
+    @staticmethod
+    def get_cache_key(epic_settings) -> str:
+        iss_hash = hashlib.md5(force_bytes(epic_settings.iss_url)).hexdigest()
+        return f"epic_access_token:{epic_settings.pk}:{iss_hash}"
+
+    def get_access_token(self, epic_settings) -> str:
+        cache_key = self.get_cache_key(epic_settings)
+        encrypted = cache.get(cache_key)
+        access_token = decrypt_access_token(encrypted) if encrypted is not None else None
+        if access_token is not None:
+            with self._lock:
+                self.hits += 1
+            return access_token
+
+        with self._lock:
+            self.misses += 1
+        data = epic_settings.request_access_token(self.session)
+        access_token = data["access_token"]
+        try:
+            timeout = int(data.get("expires_in", 0)) - ACCESS_TOKEN_EXPIRY_MARGIN_SECONDS
+        except (TypeError, ValueError):
+            timeout = 0
+        if timeout > 0:
+            cache.set(cache_key, encrypt_access_token(access_token), timeout)
+        return access_token
+
+    def invalidate_access_token(self, epic_settings) -> None:
+        cache.delete(self.get_cache_key(epic_settings))
+
+    def clear(self) -> None:
+        """Clear the in process state (token endpoints and counters)."""
+        with self._lock:
+            self._token_urls.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+token_manager = EpicTokenManager()
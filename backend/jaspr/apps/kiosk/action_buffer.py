@@ -0,0 +1,173 @@
+"""
+Buffered `Action` creation.
+
+`Action`s are the highest volume write. Instead of an RQ job per `Action`, the
+validated data of each is appended to a list in Redis (`buffer_actions`), and
+`drain_action_buffer` (see `jaspr.apps.kiosk.jobs.drain_action_buffer`) writes them to
+the database with `bulk_create`, `ACTION_BUFFER_BATCH_SIZE` at a time.
+
+The buffer is drained (a job is queued) when it holds `ACTION_BUFFER_BATCH_SIZE`
+`Action`s, or when an `Action` is buffered and the oldest one has been waiting for
+`ACTION_BUFFER_MAX_LATENCY_SECONDS`. The buffer is also drained periodically (every
+minute, see the "Drain Action Buffer" cron job), so `Action`s buffered during a lull
+don't wait for the next one.
+
+`bulk_create` doesn't call `Action.save`, so the `Encounter`s of the ARRIVE `Action`s
+of a batch are moved to their sections afterwards (see `update_section_uids`). A kiosk
+resumes at its `Encounter`'s section (and technicians see its activities' statuses), so
+the buffer is drained right away when an ARRIVE `Action` is buffered.
+
+NOTE: A batch is removed from the buffer before it's written, so a worker dying in
+between loses it. An `Action` that can't be written (E.g. its `Patient` was deleted
+in the meantime) is logged and dropped.
+"""
+import json
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import django_rq
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from sentry_sdk import capture_exception
+
+from jaspr.apps.kiosk.constants import ActionNames
+
+logger = logging.getLogger(__name__)
+
+ACTION_BUFFER_KEY = "action-buffer"
+# Set while a job draining the buffer is queued, so one isn't queued per `Action`.
+ACTION_BUFFER_DRAIN_QUEUED_KEY = "action-buffer:drain-queued"
+
+DATETIME_FIELDS = ("timestamp", "client_timestamp")
+
+
+def get_connection():
+    return django_rq.get_connection("default")
+
+
+def serialize_action(valid_action_data: dict) -> str:
+    """`valid_action_data` has to have a `timestamp` (see `queue_actions_creation`)."""
+    data = {**valid_action_data}
+    for field in ("patient", "encounter"):
+        if field in data:
+            instance = data.pop(field)
+            data[f"{field}_id"] = instance.pk if instance is not None else None
+    for field in DATETIME_FIELDS:
+        if data.get(field) is not None:
+            # NOTE: Not `DjangoJSONEncoder`, which drops the microseconds.
+            data[field] = data[field].isoformat()
+    return json.dumps(data)
+
+
+def deserialize_action(serialized: bytes) -> Dict:
+    data = json.loads(serialized)
+    for field in DATETIME_FIELDS:
+        if data.get(field) is not None:
+            data[field] = parse_datetime(data[field])
+    return data
+
+
+def buffer_actions(
+    valid_actions_data: List[dict], queue_drain: Callable[[], None]
+) -> None:
+    """
+    Append `valid_actions_data` to the buffer, calling `queue_drain` if the buffer
+    should be drained (see the module docstring) and a drain isn't already queued.
+    """
+    if not valid_actions_data:
+        return
+    has_arrive = any(
+        data.get("action") == ActionNames.ARRIVE for data in valid_actions_data
+    )
+    connection = get_connection()
+    pipeline = connection.pipeline()
+    pipeline.rpush(ACTION_BUFFER_KEY, *map(serialize_action, valid_actions_data))
+    pipeline.lindex(ACTION_BUFFER_KEY, 0)
+    length, oldest = pipeline.execute()
+
+    oldest_timestamp = deserialize_action(oldest)["timestamp"]
+    waited = (timezone.now() - oldest_timestamp).total_seconds()
+    if (
+        has_arrive
+        or length >= settings.ACTION_BUFFER_BATCH_SIZE
+        or waited >= settings.ACTION_BUFFER_MAX_LATENCY_SECONDS
+    ) and connection.set(
+        ACTION_BUFFER_DRAIN_QUEUED_KEY,
+        1,
+        nx=True,
+        ex=max(settings.ACTION_BUFFER_MAX_LATENCY_SECONDS, 1),
+    ):
+        queue_drain()
+
+
+def pop_batch(connection, batch_size: int) -> List[Dict]:
+    pipeline = connection.pipeline(transaction=True)
+    pipeline.lrange(ACTION_BUFFER_KEY, 0, batch_size - 1)
+    pipeline.ltrim(ACTION_BUFFER_KEY, batch_size, -1)
+    batch, _ = pipeline.execute()
+    return [deserialize_action(serialized) for serialized in batch]
+
+
+def update_section_uids(actions: List) -> None:
+    """
+    Move the `Encounter` of each ARRIVE `Action` in `actions` to its section, like
+    `Action.save` does, once per `Encounter` with the furthest section arrived at.
+    """
+    section_uids = defaultdict(list)
+    for action in actions:
+        if action.action == ActionNames.ARRIVE and action.encounter_id is not None:
+            section_uids[action.encounter_id].append(action.section_uid)
+    if not section_uids:
+        return
+    Encounter = apps.get_model("kiosk", "Encounter")
+    for encounter in Encounter.objects.with_state().filter(pk__in=section_uids):
+        encounter.update_section_uid(
+            max(section_uids[encounter.pk], key=encounter.get_safe_index)
+        )
+
+
+def create_actions(batch: List[Dict]) -> int:
+    Action = apps.get_model("kiosk", "Action")
+    actions = [Action(**data) for data in batch]
+    try:
+        with transaction.atomic():
+            Action.objects.bulk_create(actions)
+            update_section_uids(actions)
+        return len(actions)
+    except Exception:
+        logger.exception(
+            "Unable to create a batch of %s Actions, creating them one at a time.",
+            len(actions),
+        )
+
+    created = 0
+    for data in batch:
+        try:
+            with transaction.atomic():
+                Action.objects.create(**data)
+            created += 1
+        except Exception as e:
+            logger.exception("Dropping Action that couldn't be created: %s", data)
+            capture_exception(e)
+    return created
+
+
+def drain_action_buffer() -> int:
+    """
+    Write the buffered `Action`s to the database, returning the number created.
+    """
+    connection = get_connection()
+    connection.delete(ACTION_BUFFER_DRAIN_QUEUED_KEY)
+    created = 0
+    while True:
+        batch = pop_batch(connection, settings.ACTION_BUFFER_BATCH_SIZE)
+        if not batch:
+            break
+        created += create_actions(batch)
+    if created:
+        logger.info("Created %s buffered Actions", created)
+    return created
@@ -1,7 +1,7 @@
 import os
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional, TYPE_CHECKING
+from typing import List, Mapping, Optional, TYPE_CHECKING
 
 from django.apps import apps
 from django.db import models, transaction
@@ -11,7 +11,9 @@ from django.utils.functional import cached_property
 from django.conf import settings
 
 from jaspr.apps.kiosk.activities.errors import ActivityValidationError
-from .question_json import camelcase_to_underscore, extract_answer_keys_from_json
+from jaspr.apps.kiosk.answer_history import get_history_user
+from .question_cache import CompiledQuestions, EMPTY_COMPILED_QUESTIONS
+from .question_json import camelcase_to_underscore
 from ..models import AssignmentLocks
 
 if TYPE_CHECKING:
@@ -32,6 +34,11 @@ class ActivityType(Enum):
     def is_implicit(self):
         return int(self.value) > 3
 
+    @property
+    def flag(self) -> int:
+        """The bit of the type in `Encounter.activity_type_flags`."""
+        return 1 << self.value
+
     def __str__(self):
         return ACTIVITY_STR[self]
 
@@ -111,17 +118,37 @@ class IActivity(models.Model):
         Answers from this dictionary update the values already found in
         the database.
         """
+        # The first save sets `answers`, even without changes, which (E.g.) the note
+        # sending jobs check for.
+        answers_unset = self.answers is None
         result = self.get_answers()
-        update = False
-        answer_keys = self.get_answer_keys()
+        changes = {}
+        answer_keys = self.get_compiled_questions().answer_keys
         for key in answer_keys:
             if key in answers and (key not in result or result[key] != answers[key]):
                 result[key] = answers[key]
-                update = True
+                changes[key] = answers[key]
 
         self.answers = result
-        self.update_status(update=update)
-        self.save()
+        self.update_status(update=bool(changes))
+        if changes or answers_unset:
+            self.save_answer_changes(changes)
+
+    def save_answer_changes(self, changes: dict) -> None:
+        """
+        Save the activity after its answers changed (`changes` being the changed
+        answers), recording an `AnswerChange` instead of a historical record (see
+        `jaspr.apps.kiosk.answer_history`).
+        """
+        AnswerChange = apps.get_model("kiosk", "AnswerChange")
+        with transaction.atomic():
+            self.save_without_historical_record()
+            if changes:
+                AnswerChange.objects.create(
+                    assigned_activity=self.get_assigned_activity(),
+                    changes=changes,
+                    changed_by=get_history_user(self),
+                )
 
     def lock(self) -> None:
         AssignmentLocks.objects.create(
@@ -153,17 +180,24 @@ class IActivity(models.Model):
     def locked(self) -> bool:
         return self.get_assigned_activity().locked
 
-    def get_questions(self) -> List:
+    def get_compiled_questions(self) -> CompiledQuestions:
         """
         The concrete implementation will need to return
-        the correct list of questions based on the context of
+        the correct compiled questions based on the context of
         the encounter's activity stream.
         I expect most of the question lists for this will be static JSON
         and depending on the situation a different static JSON file will be
         returned here. The one major exception will be exit questions which live in
         the database.
         """
-        return []
+        return EMPTY_COMPILED_QUESTIONS
+
+    def get_questions(self) -> List:
+        """
+        The question dictionaries are shared with the process-wide question cache
+        (see `question_cache.py`) and must not be mutated.
+        """
+        return list(self.get_compiled_questions().questions)
 
     @staticmethod
     def get_static_questions() -> List:
@@ -174,7 +208,10 @@ class IActivity(models.Model):
         """
         Based on the current instance, extract the answerkeys required.
         """
-        return extract_answer_keys_from_json(self.get_questions())
+        return list(self.get_compiled_questions().answer_keys)
+
+    def get_sections_dictionary(self) -> Mapping:
+        return self.get_compiled_questions().sections_dictionary
 
     def get_status(self) -> ActivityStatus:
         """
@@ -212,7 +249,7 @@ class IActivity(models.Model):
         encounter = self.encounter
         current_section_uid = encounter.current_section_uid
         current_index = encounter.get_safe_index(current_section_uid)
-        questions = self.get_questions()
+        questions = self.get_compiled_questions().questions
         start_uid = camelcase_to_underscore(questions[0]["uid"])
         start_index = encounter.get_safe_index(start_uid)
         end_uid = camelcase_to_underscore(questions[-1]["uid"])
@@ -256,11 +293,10 @@ class IActivity(models.Model):
         """
         Is comfort and skills the only activity being used?
         """
-        for activity in self.encounter.assignedactivity_set.all():
-            activity_type = activity.type
-            if activity_type != ActivityType.ComfortAndSkills and activity_type != ActivityType.Intro:
-                return False
-        return True
+        return not self.encounter.activity_types - {
+            ActivityType.ComfortAndSkills,
+            ActivityType.Intro,
+        }
 
     def get_template_vars(self):
         """
@@ -1,8 +1,6 @@
-import json
 from pathlib import Path
-from typing import List
-from django.template.loader import render_to_string
 from jaspr.apps.kiosk.activities.activity_utils import IActivity, ActivityType
+from jaspr.apps.kiosk.activities.question_cache import CompiledQuestions, get_compiled_questions
 
 PATH_ROOT = Path(__file__).parent / "questions"
 FILENAME = "0.0.json.tpl"
@@ -32,13 +30,12 @@ class LethalMeansActivity(IActivity):
             return {"means_yes_no_answered": False}
         return {"means_yes_no_answered": "means_yes_no" in self.answers}
 
-    def get_questions(self) -> List:
-        question_json = render_to_string(QUESTION_FILE, self.get_template_vars())
-        return json.loads(str(question_json))
+    def get_compiled_questions(self) -> CompiledQuestions:
+        return get_compiled_questions(ActivityType.LethalMeans, QUESTION_FILE, self.get_template_vars())
 
     @staticmethod
     def get_static_questions():
         """Fetch a generic question list on the model object and when a model instance is unavailable"""
-        question_json = render_to_string(QUESTION_FILE, {"means_yes_no_answered": False})
-        return json.loads(str(question_json))
+        compiled = get_compiled_questions(ActivityType.LethalMeans, QUESTION_FILE, {"means_yes_no_answered": False})
+        return list(compiled.questions)
 
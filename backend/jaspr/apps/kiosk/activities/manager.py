@@ -1,15 +1,14 @@
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from django.db.models import Model
 from django.db import transaction
 from django.utils.functional import cached_property
-from django.db.models import Prefetch
 
 
 from jaspr.apps.kiosk.models import AssignedActivity
 from jaspr.apps.kiosk.activities.activity_utils import ActivityType
-from .question_json import underscore_to_camel, create_section_dictionary, \
-    get_question_action, section_uid_to_answer_key, camelcase_to_underscore
+from .question_cache import SectionIndex, get_section_index
+from .question_json import underscore_to_camel, get_question_action, camelcase_to_underscore
 
 """
 Assigned: CSA, CSP, C&S
@@ -74,11 +73,17 @@ class ActivityManagerMixin(Model):
     def get_explicit_activities(self, active_only=False):
         return self.filter_activities(active_only=active_only, explicit_only=True)
 
+    @property
+    def activity_types(self) -> Set[ActivityType]:
+        """The types of the assigned activities."""
+        return {
+            activity_type
+            for activity_type in ActivityType
+            if self.activity_type_flags & activity_type.flag
+        }
+
     def has_activity(self, activity_type: ActivityType):
-        for activity in self.assignedactivity_set.all():
-            if activity.type == activity_type:
-                return True
-        return False
+        return bool(self.activity_type_flags & activity_type.flag)
 
     def get_activity(self, type: ActivityType):
         # This function depends on assignedactivity_set having an .order_by("-created").  We run the order_by
@@ -141,16 +146,13 @@ class ActivityManagerMixin(Model):
         if append_outro:
             assigned_activities.append(self._create_outro())
 
-        try:
-            # Remove cached property so it can be refreshed
-            del self.sections_dictionary
-        except AttributeError:
-            # Property has not been cached
-            pass
+        # The activities (if they were loaded, see `EncounterQuerySet.with_state`) are
+        # loaded again when next read, now that there are new ones.
+        getattr(self, "_prefetched_objects_cache", {}).pop("assignedactivity_set", None)
 
         try:
             # Remove cached property so it can be refreshed
-            del self.section_uid_ordered_list
+            del self.section_index
         except AttributeError:
             # Property has not been cached
             pass
@@ -162,7 +164,7 @@ class ActivityManagerMixin(Model):
         found_uid = False
         current_index = self.get_safe_index(self.current_section_uid)
         for activity in assigned_activities:
-            questions = activity.get_questions()
+            questions = activity.get_compiled_questions().questions
             for question in questions:
                 if "uid" in question:
                     if question["uid"].startswith('progressBar') or question["uid"].startswith('sectionChange'):
@@ -170,6 +172,7 @@ class ActivityManagerMixin(Model):
                     if current_index > self.get_safe_index(camelcase_to_underscore(question["uid"])):
                         self.current_section_uid = camelcase_to_underscore(question["uid"])
                         self.save()
+                        self.bump_version()
                         found_uid = True
                     break
             if found_uid:
@@ -221,17 +224,17 @@ class ActivityManagerMixin(Model):
         if not section_uid:
             section_uid = self.current_section_uid
         section_uid = underscore_to_camel(section_uid)
-        questions = self.get_questions()
-        index = -1
-        for i, question in enumerate(questions):
-            if question["uid"] == section_uid:
-                index = i + 1
-                break
-
-        if index > -1 and i < len(questions) - 1:
-            for question in questions[index:]:
-                if not unlocked_only or not question["locked"]:
-                    return camelcase_to_underscore(question["uid"])
+        # Walk the compiled questions directly rather than `get_questions()` so that
+        # every question doesn't get copied just to attach `locked`.
+        found = False
+        for activity in self.filter_activities(active_only=True):
+            locked = activity.locked
+            for question in activity.get_compiled_questions().questions:
+                if found:
+                    if not unlocked_only or not locked:
+                        return camelcase_to_underscore(question["uid"])
+                elif question["uid"] == section_uid:
+                    found = True
 
         return None
 
@@ -261,32 +264,32 @@ class ActivityManagerMixin(Model):
         # of database requests.  Locking the encounter should be sufficient for blocking requests since we typically
         # only interact with the activities through the encounter object.
         with transaction.atomic():
-            instance = type(self).objects.select_for_update(of=('self',)).select_related('patient',
-                                                                                         'department').prefetch_related(
-                Prefetch(
-                    "assignedactivity_set",
-                    queryset=AssignedActivity.objects.order_by("-created").select_related(
-                        'stability_plan', 'suicide_assessment', 'comfort_and_skills', 'intro', 'outro', 'lethal_means'
-                    ).prefetch_related(
-                        "assignmentlocks_set",
-                    ),
-                )).get(pk=self.pk)
+            instance = type(self).objects.with_state().select_for_update(of=('self',)).get(pk=self.pk)
+            previous_answers = instance.get_answers()["answers"]
             last_section_uid = instance.get_last_section_uid(answers)
             if last_section_uid is not None and not takeaway_kit:
                 # save_answer below causes an update_status already so don't do it here
                 instance.update_section_uid(last_section_uid, update_status=False)
             for activity in instance.filter_activities(active_only=True):
                 activity.save_answers(answers, takeaway_kit=takeaway_kit)
+            instance.bump_version(
+                answer_keys=[
+                    key
+                    for key, value in instance.get_answers()["answers"].items()
+                    if key not in previous_answers or previous_answers[key] != value
+                ]
+            )
 
         # Make sure changes in select_for_update instance are reflected in parent encounter instance so subsequent
-        # calls using self object have the correct data.  A potential optimization would be to switch instances, or
-        # copy changed fields from one instance to the other.
-        self.refresh_from_db()
+        # calls using self object have the correct data.  The instance was loaded with its state and saved above, so
+        # its fields and activities are copied over rather than loading them all again.
+        self.copy_state_from(instance)
 
     def update_section_uid(self, section_uid, update_status=True):
         if self.get_safe_index(section_uid) > self.get_safe_index(self.current_section_uid):
             self.current_section_uid = section_uid
             self.save(update_fields=["current_section_uid", "modified"])
+            self.bump_version()
 
         if update_status:
             for activity in self.assignedactivity_set.all():
@@ -302,7 +305,13 @@ class ActivityManagerMixin(Model):
         return result
 
     def get_question_action(self, answer_key: str) -> Optional[dict]:
-        return get_question_action(self.get_questions(), answer_key)
+        # The lock state `get_questions()` adds isn't needed here, so skip copying questions.
+        questions = [
+            question
+            for activity in self.filter_activities(active_only=True)
+            for question in activity.get_compiled_questions().questions
+        ]
+        return get_question_action(questions, answer_key)
 
     def get_current_section_uid(self) -> Optional[str]:
         current_section_uid = self.current_section_uid
@@ -311,12 +320,16 @@ class ActivityManagerMixin(Model):
         return underscore_to_camel(current_section_uid)
 
     @cached_property
+    def section_index(self) -> SectionIndex:
+        layout = tuple(activity.get_compiled_questions() for activity in self.filter_activities(active_only=True))
+        return get_section_index(layout)
+
+    @property
     def sections_dictionary(self):
-        return create_section_dictionary(self.get_questions())
+        return self.section_index.sections_dictionary
 
     def get_section_uid_for_answer_key(self, answer_key: str) -> Optional[str]:
-        section_dict = self.sections_dictionary
-        return section_uid_to_answer_key(section_dict, answer_key)
+        return self.section_index.get_section_uid_for_answer_key(answer_key)
 
     def get_last_section_uid(self, answers):
         keys = answers.keys()
@@ -0,0 +1,197 @@
+"""
+Process-wide cache of compiled activity question JSON.
+
+Rendering a `.json.tpl` question file through the Django template engine and parsing
+the resulting JSON is by far the most expensive part of `get_questions()`, and it is
+called for every active activity on every answer save, status update and section
+lookup. The rendered output only depends on the file contents and the template vars,
+so it is compiled once per (activity type, file, file version, template vars) and
+shared for the life of the process.
+
+The file version is the file's modification time, so editing a question file in a
+running dev server is picked up on the next lookup and stale compilations of that
+file are dropped.
+
+NOTE: `CompiledQuestions.questions` holds the parsed question dictionaries directly.
+They are shared between every caller in the process and must be treated as read-only.
+`IActivity.get_questions()` returns a new top level list, but the question
+dictionaries themselves are not copied.
+"""
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+from django.template.loader import render_to_string
+
+from .question_json import (
+    NUMBER_ANSWER_KEY_REGEX,
+    create_section_dictionary,
+    extract_answer_keys_from_json,
+)
+
+
+class ReadOnlyDict(dict):
+    """
+    A `dict` that can't be modified after creation. Unlike `MappingProxyType` it can
+    be pickled, which matters since encounters (and their cached section dictionary)
+    are pickled when queueing jobs.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"'{type(self).__name__}' object is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    __ior__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+# NOTE: `eq=False` keeps identity hashing so a layout of compiled questions can be
+# used as a cache key (see `get_section_index`).
+@dataclass(frozen=True, eq=False)
+class CompiledQuestions:
+    questions: Tuple[dict, ...]
+    answer_keys: Tuple[str, ...]
+    answer_key_set: frozenset
+    sections_dictionary: Mapping[str, Mapping[str, Tuple[str, ...]]]
+
+    @classmethod
+    def from_questions(cls, questions: List[dict]) -> "CompiledQuestions":
+        answer_keys = tuple(extract_answer_keys_from_json(questions))
+        sections_dictionary = ReadOnlyDict(
+            {
+                uid: ReadOnlyDict({"questions": tuple(section["questions"])})
+                for uid, section in create_section_dictionary(questions).items()
+            }
+        )
+        return cls(
+            questions=tuple(questions),
+            answer_keys=answer_keys,
+            answer_key_set=frozenset(answer_keys),
+            sections_dictionary=sections_dictionary,
+        )
+
+
+EMPTY_COMPILED_QUESTIONS = CompiledQuestions.from_questions([])
+
+
+class SectionIndex:
+    """
+    Lookup tables for the section uids of an encounter's activity layout (the compiled
+    questions of its active activities, in order).
+
+    - `sections_dictionary`: The merged section dictionary of the layout.
+    - `section_uids`: The section uids in order.
+    - Section uid -> ordinal position.
+    - Answer key -> first section uid containing it. Numeric suffixed answer keys
+      (`frustration0` -> `frustration`) are looked up without their suffix (see
+      `strip_answer_key_number`).
+    """
+
+    def __init__(self, sections_dictionary: Mapping[str, Mapping[str, Sequence[str]]]):
+        self.sections_dictionary = ReadOnlyDict(sections_dictionary)
+        self.section_uids = tuple(sections_dictionary)
+        self._positions = {uid: i for i, uid in enumerate(self.section_uids)}
+        self._answer_key_to_section_uid: Dict[str, str] = {}
+        for uid, sub_dictionary in sections_dictionary.items():
+            for keys in sub_dictionary["questions"]:
+                for key in keys.split("|"):
+                    self._answer_key_to_section_uid.setdefault(key, uid)
+
+    def get_position(self, section_uid: Optional[str]) -> int:
+        return self._positions.get(section_uid, -1)
+
+    def get_section_uid_for_answer_key(self, answer_key: str) -> Optional[str]:
+        """
+        Same behavior as `question_json.section_uid_to_answer_key`: we take the first
+        section uid the answer key shows up in, falling back to the answer key without
+        its numeric suffix.
+        """
+        section_uid = self._answer_key_to_section_uid.get(answer_key)
+        if section_uid is not None:
+            return section_uid
+        new_answer_key = strip_answer_key_number(answer_key)
+        if new_answer_key is None:
+            return None
+        return self._answer_key_to_section_uid.get(new_answer_key)
+
+
+# Bounded, since answer keys come from the client.
+@lru_cache(maxsize=1024)
+def strip_answer_key_number(answer_key: str) -> Optional[str]:
+    """The answer key without its numeric suffix, or `None` if it doesn't have one."""
+    if re.search(NUMBER_ANSWER_KEY_REGEX, answer_key):
+        return re.sub(NUMBER_ANSWER_KEY_REGEX, "", answer_key)
+    return None
+
+
+@lru_cache(maxsize=256)
+def get_section_index(layout: Tuple[CompiledQuestions, ...]) -> SectionIndex:
+    """
+    Return the (process-wide, shared) `SectionIndex` for an activity layout.
+
+    Merging the per-activity section dictionaries gives the same result as building
+    one from the questions of all the activities in the layout.
+    """
+    sections_dictionary = {}
+    for compiled in layout:
+        sections_dictionary.update(compiled.sections_dictionary)
+    return SectionIndex(sections_dictionary)
+
+
+_compiled_questions: Dict[Hashable, CompiledQuestions] = {}
+_compiled_questions_lock = threading.Lock()
+
+
+def get_file_version(filepath) -> int:
+    return os.stat(filepath).st_mtime_ns
+
+
+def make_template_vars_key(template_vars: Optional[dict]) -> Optional[tuple]:
+    if template_vars is None:
+        return None
+    return tuple(sorted(template_vars.items()))
+
+
+def compile_questions(filepath, template_vars: Optional[dict] = None) -> CompiledQuestions:
+    if template_vars is None:
+        with open(filepath, "rb") as f:
+            questions = json.load(f)
+    else:
+        questions = json.loads(str(render_to_string(filepath, template_vars)))
+    return CompiledQuestions.from_questions(questions)
+
+
+def get_compiled_questions(
+    activity_type, filepath, template_vars: Optional[dict] = None
+) -> CompiledQuestions:
+    """
+    Return the compiled questions for `filepath` rendered with `template_vars`,
+    compiling and caching them if they aren't cached yet. If `template_vars` is `None`
+    the file is treated as plain JSON and not rendered as a template.
+    """
+    filepath = str(filepath)
+    version = get_file_version(filepath)
+    key = (activity_type, filepath, version, make_template_vars_key(template_vars))
+    compiled = _compiled_questions.get(key)
+    if compiled is None:
+        compiled = compile_questions(filepath, template_vars)
+        with _compiled_questions_lock:
+            stale_keys = [
+                k for k in _compiled_questions if k[1] == filepath and k[2] != version
+            ]
+            for stale_key in stale_keys:
+                del _compiled_questions[stale_key]
+            _compiled_questions[key] = compiled
+    return compiled
+
+
+def clear_question_cache() -> None:
+    with _compiled_questions_lock:
+        _compiled_questions.clear()
+    get_section_index.cache_clear()
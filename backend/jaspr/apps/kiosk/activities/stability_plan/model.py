@@ -1,4 +1,3 @@
-import json
 import pathlib
 from typing import List
 
@@ -6,9 +5,9 @@ from django.db import transaction
 
 from jaspr.apps.kiosk.activities.activity_utils import IActivity, ActivityType
 from django.utils import timezone
-from django.template.loader import render_to_string
 
 from jaspr.apps.kiosk.activities.errors import ActivityValidationError
+from jaspr.apps.kiosk.activities.question_cache import CompiledQuestions, get_compiled_questions
 from jaspr.apps.kiosk.helpers import update_coping_fields
 
 PATH_ROOT = pathlib.Path(__file__).parent / "questions"
@@ -66,7 +65,7 @@ class StabilityPlanActivity(IActivity):
 
     @transaction.atomic
     def save_answers(self, answers: dict, takeaway_kit: bool = False) -> None:
-        update = False
+        changes = {}
         # Get instance copy before new answers are saved, so we can compare differences later
         # This also ensures we have the latest answers
         old_instance = type(self).objects.select_for_update().get(pk=self.pk)
@@ -76,11 +75,12 @@ class StabilityPlanActivity(IActivity):
         # instance = (
         #     type(self).objects.select_for_update().get(pk=self.pk)
         # )
-        if old_instance.answers is None:
+        answers_unset = old_instance.answers is None
+        if answers_unset:
             self.answers = {}
         if answers is None:
             answers = {}
-        answer_keys = self.get_answer_keys()
+        answer_keys = self.get_compiled_questions().answer_key_set
         for k in answers.keys():
             if k == "supportive_people":
                 # validate supportive people
@@ -92,14 +92,17 @@ class StabilityPlanActivity(IActivity):
             if k in FIELDS:
                 if getattr(self, k) != answers[k]:
                     setattr(self, k, answers[k])
-                    update = True
+                    changes[k] = answers[k]
             elif k in answer_keys:
                 # Key must be in the answer keys for CSP's questions
                 if k not in self.answers or self.answers[k] != answers[k]:
                     self.answers[k] = answers[k]
-                    update = True
-        self.update_status(update=update, takeaway_kit=takeaway_kit)
-        self.save()
+                    changes[k] = answers[k]
+        self.update_status(update=bool(changes), takeaway_kit=takeaway_kit)
+        # The first save sets `answers`, even without changes (see
+        # `IActivity.save_answers`).
+        if changes or answers_unset:
+            self.save_answer_changes(changes)
 
         update_coping_fields(old_instance, self)
 
@@ -109,13 +112,14 @@ class StabilityPlanActivity(IActivity):
                 self.raise_validation_error(ActivityValidationError.NOT_ALL_BLANK, "supportive_people")
         return None
 
-    def get_questions(self) -> list:
-        question_json = render_to_string(STANDARD_QUESTIONS_FILE, self.get_template_vars())
-        return json.loads(str(question_json))
+    def get_compiled_questions(self) -> CompiledQuestions:
+        return get_compiled_questions(ActivityType.StabilityPlan, STANDARD_QUESTIONS_FILE, self.get_template_vars())
 
     @staticmethod
     def get_static_questions() -> List:
         """Fetch a generic question list on the model object and when a model instance is unavailable"""
-        question_json = render_to_string(STANDARD_QUESTIONS_FILE, StabilityPlanActivity.get_default_template_vars())
-        return json.loads(str(question_json))
+        compiled = get_compiled_questions(
+            ActivityType.StabilityPlan, STANDARD_QUESTIONS_FILE, StabilityPlanActivity.get_default_template_vars()
+        )
+        return list(compiled.questions)
 
@@ -1,9 +1,8 @@
-import json
 import pathlib
 from typing import List
 
 from jaspr.apps.kiosk.activities.activity_utils import IActivity, ActivityType
-from ..question_json import extract_answer_keys
+from ..question_cache import CompiledQuestions, get_compiled_questions
 
 PATH_ROOT = pathlib.Path(__file__).parent / "questions"
 STANDARD_QUESTIONS_FILE = (PATH_ROOT / "0.0.json.tpl").resolve()
@@ -38,17 +37,13 @@ class SuicideAssessmentActivity(IActivity):
     def get_progress_bar_label(self) -> str:
         return "Guided Interview"
 
-    def get_questions(self) -> List:
-        with open(STANDARD_QUESTIONS_FILE, "rb") as f:
-            result = json.load(f)
-        return result
+    def get_compiled_questions(self) -> CompiledQuestions:
+        return get_compiled_questions(ActivityType.SuicideAssessment, STANDARD_QUESTIONS_FILE)
 
     @staticmethod
     def get_static_questions() -> List:
         """Fetch a generic question list on the model object and when a model instance is unavailable"""
-        with open(STANDARD_QUESTIONS_FILE, "rb") as f:
-            result = json.load(f)
-        return result
+        return list(get_compiled_questions(ActivityType.SuicideAssessment, STANDARD_QUESTIONS_FILE).questions)
 
     def update_status(self, update=False) -> bool:
         self.update_scores()
@@ -3,7 +3,7 @@ import logging
 from datetime import datetime
 
 from django.contrib import admin, messages
-from django.db.models import Value, Prefetch
+from django.db.models import Value, Prefetch, Q
 from django.db.models.functions import Concat
 from django.template.defaultfilters import truncatewords
 from django.utils.html import format_html
@@ -37,6 +37,7 @@ from .models import (
     PatientActivity,
     PatientCopingStrategy,
     PatientDepartmentSharing,
+    PatientSearchToken,
     PatientVideo,
     Person,
     SharedStory,
@@ -212,9 +213,22 @@ class PatientAdmin(SimpleHistoryAdmin):
             except ValueError:
                 date = False
 
-            # Only search a limited number of records to limit system impact.
-            # Users should use a list filter before searching
-            for patient in queryset[:HARD_SEARCH_LIMIT]:
+            # Narrow down to the records that could match using the search index (and
+            # `analytics_token`, which isn't encrypted), and only search a limited
+            # number of those to limit system impact.
+            candidates = queryset
+            if date:
+                candidates = candidates.filter(
+                    pk__in=PatientSearchToken.objects.patient_ids_with_date_of_birth(
+                        date.date()
+                    )
+                )
+            if search_term:
+                candidates = candidates.filter(
+                    Q(pk__in=PatientSearchToken.objects.candidate_patient_ids(search_term))
+                    | Q(analytics_token__icontains=search_term.strip())
+                )
+            for patient in candidates[:HARD_SEARCH_LIMIT]:
                 if date:
                     if date.date() != patient.date_of_birth:
                         continue
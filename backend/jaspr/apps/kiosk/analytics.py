@@ -1,9 +1,19 @@
+import csv
+import io
+import itertools
+import shutil
 import sys
+import tempfile
+import zipfile
 import pytz
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
-from typing import Iterator, Optional, Sequence
+from typing import IO, Dict, Iterator, List, Optional, Sequence
 
-from django.db.models import Prefetch, Subquery
+from django.conf import settings
+from django.db import connection
+from django.db.models import Exists, OuterRef, Prefetch, QuerySet, Subquery
 from django.utils.functional import cached_property
 from jaspr.apps.clinics.models import DepartmentTechnician, HealthcareSystem
 from jaspr.apps.epic.models import NotesLog
@@ -25,11 +35,86 @@ from jaspr.apps.kiosk.models import (
 )
 from jaspr.apps.kiosk.activities.activity_utils import ActivityType
 from jaspr.apps.kiosk.activities.question_json import extract_answer_keys_from_json
+from jaspr.apps.kiosk.activities.stability_plan.model import FIELDS as STABILITY_PLAN_FIELDS
+
+
+# Rows fetched from the database at a time (per server-side cursor fetch).
+EXPORT_CHUNK_SIZE = 2000
+
+SCORING_FIELDS = [
+    "scoring_score",
+    "scoring_current_attempt",
+    "scoring_suicide_plan_and_intent",
+    "scoring_risk",
+    "scoring_suicide_index_score",
+    "scoring_suicide_index_score_typology",
+]
+
+# Module of an `AssignedActivity` -> its fields read by the exports (the answers, the
+# fields `CrisisStabilityPlan.get_answers` adds and the scores of `Srat.get_metadata`).
+# The other (mostly encrypted) fields aren't loaded, so aren't decrypted.
+EXPORT_MODULE_FIELDS = {
+    "stability_plan": ("answers", *STABILITY_PLAN_FIELDS),
+    "suicide_assessment": ("answers", *SCORING_FIELDS),
+    "comfort_and_skills": (),
+    "intro": ("answers",),
+    "outro": ("answers",),
+    "lethal_means": ("answers",),
+}
+
+
+class Echo:
+    """A file-like object that returns what is written, for streaming CSV rows."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iterate_in_chunks(queryset: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator:
+    """
+    Iterate over `queryset` in order, `chunk_size` objects at a time.
+
+    The primary keys are streamed with a server-side cursor and the objects fetched a
+    chunk at a time, so memory use doesn't depend on the size of `queryset`. Unlike
+    `QuerySet.iterator`, `prefetch_related` lookups are kept.
+    """
+    pk_iterator = queryset.values_list("pk", flat=True).iterator(chunk_size=chunk_size)
+    while True:
+        pks = list(itertools.islice(pk_iterator, chunk_size))
+        if not pks:
+            return
+        objects = queryset.order_by().in_bulk(pks)
+        for pk in pks:
+            if pk in objects:
+                yield objects[pk]
+
+
+def get_latest_activities(encounter: Encounter) -> Dict[ActivityType, AssignedActivity]:
+    """
+    The latest `AssignedActivity` of each type of `encounter`, from its prefetched
+    `assignedactivity_set` (newest first), in that order. Like `Encounter.get_activity`
+    for each type, without sorting the activities again every time.
+    """
+    latest_activities = {}
+    for assigned_activity in encounter.assignedactivity_set.all():
+        latest_activities.setdefault(assigned_activity.type, assigned_activity)
+    return latest_activities
 
 
 class AnalyticsExporter:
     """Exports analytics data for Jaspr."""
 
+    # Export data name -> iterator of the rows of its CSV.
+    SHEETS = {
+        "visits": "visit_log_iterator",
+        "actions": "action_log_iterator",
+        "ssi": "assessment_iterator",
+        "activities": "skills_iterator",
+        "technicians": "technicians_iterator",
+        "videos": "videos_iterator",
+        "encounters": "encounters_iterator",
+    }
+
     def __init__(self, system: HealthcareSystem, start_date: datetime, end_date: datetime, include_mrn: bool,
                  include_analytics_token: bool):
         self.system = system
@@ -67,6 +152,138 @@ class AnalyticsExporter:
         tz = pytz.timezone("America/Los_Angeles")
         return timestamp.astimezone(tz).strftime("%I:%M:%S %p %Z")
 
+    def get_sheet(self, data_name: str) -> Iterator[Sequence]:
+        """Return the rows of the `data_name` CSV, starting with the headers."""
+        if data_name not in self.SHEETS:
+            raise ValueError(f"Invalid data name: {data_name}")
+        return getattr(self, self.SHEETS[data_name])
+
+    def get_filename(self, data_name: str, extension: str = "csv") -> str:
+        return (
+            f"system_{self.system.id}_jaspr_{data_name}_{self.start_date}--{self.end_date}"
+            f".{extension}"
+        )
+
+    def stream_csv(self, data_name: str) -> Iterator[str]:
+        """Yield the `data_name` CSV line by line (E.g. for a `StreamingHttpResponse`)."""
+        writer = csv.writer(Echo())
+        for row in self.get_sheet(data_name):
+            yield writer.writerow(row)
+
+    def write_csv(self, data_name: str, file: IO[str]) -> None:
+        csv.writer(file).writerows(self.get_sheet(data_name))
+
+    def write_csv_to_temporary_file(self, data_name: str, close_connection: bool = False) -> IO[bytes]:
+        """
+        Write the `data_name` CSV to a (UTF-8 encoded) temporary file, returning it
+        rewound. If `close_connection` is `True` (I.E. when called in a worker thread),
+        the database connection used is closed afterwards.
+        """
+        file = tempfile.TemporaryFile()
+        try:
+            text_file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+            self.write_csv(data_name, text_file)
+            text_file.flush()
+            text_file.detach()
+        except BaseException:
+            file.close()
+            raise
+        finally:
+            if close_connection:
+                connection.close()
+        file.seek(0)
+        return file
+
+    def write_zip(
+        self,
+        file: IO[bytes],
+        data_names: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """
+        Write a zip file with a CSV for each of `data_names` (all of them by default) to
+        `file`, which doesn't need to be seekable (E.g. an HTTP response or an upload
+        stream).
+
+        The CSVs are generated concurrently by up to `max_workers` threads
+        (`ANALYTICS_EXPORT_MAX_WORKERS` by default), each into a temporary file, so
+        memory use doesn't depend on the date range.
+        """
+        if data_names is None:
+            data_names = list(self.SHEETS)
+        for data_name in data_names:
+            if data_name not in self.SHEETS:
+                raise ValueError(f"Invalid data name: {data_name}")
+        if max_workers is None:
+            max_workers = settings.ANALYTICS_EXPORT_MAX_WORKERS
+
+        with ExitStack() as stack:
+            if max_workers > 1 and len(data_names) > 1:
+                executor = stack.enter_context(
+                    ThreadPoolExecutor(
+                        max_workers=min(max_workers, len(data_names)),
+                        thread_name_prefix="analytics-export",
+                    )
+                )
+                futures = [
+                    executor.submit(self.write_csv_to_temporary_file, data_name, True)
+                    for data_name in data_names
+                ]
+                csv_files = (future.result() for future in futures)
+            else:
+                csv_files = map(self.write_csv_to_temporary_file, data_names)
+
+            archive = stack.enter_context(
+                zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED)
+            )
+            for data_name, csv_file in zip(data_names, csv_files):
+                with csv_file, archive.open(self.get_filename(data_name), "w") as entry:
+                    shutil.copyfileobj(csv_file, entry)
+
+    def get_encounters_queryset(self) -> QuerySet:
+        """
+        The `Encounter`s of the export, with what's needed to get their activities and
+        answers without a query per `Encounter`. Only the fields the exports use are
+        loaded (and decrypted), for the `Encounter`s, their `Patient`s, `Department`s
+        and activities.
+        """
+        patient_fields = ["patient__analytics_token", "patient__tools_to_go_status"]
+        if self.include_mrn:
+            patient_fields.append("patient__mrn")
+        return Encounter.objects.select_related(
+            "patient", "department", "department__clinic"
+        ).only(
+            "created",
+            "modified",
+            "start_time",
+            "technician_operated",
+            "activity_type_flags",
+            "patient",
+            *patient_fields,
+            "department__name",
+            "department__clinic__name",
+        ).prefetch_related(
+            Prefetch(
+                "assignedactivity_set",
+                queryset=AssignedActivity.objects.order_by("-created").select_related(
+                    *EXPORT_MODULE_FIELDS
+                ).only(
+                    "created",
+                    "activity_status",
+                    "encounter",
+                    *EXPORT_MODULE_FIELDS,
+                    *(
+                        f"{module}__{field}"
+                        for module, fields in EXPORT_MODULE_FIELDS.items()
+                        for field in fields
+                    ),
+                ),
+            )
+        ).filter(
+            department__in=self.departments,
+            created__range=[self.start_date, self.end_date]
+        )
+
     @property
     def visit_log_iterator(self) -> Iterator[Sequence]:
         optional_headers = []
@@ -85,9 +302,9 @@ class AnalyticsExporter:
                 encounter__department__in=self.departments,
                 timestamp__range=[self.start_date, self.end_date]
             )
-                .select_related("encounter__department")
+                .select_related("encounter__department", "patient")
                 .order_by("timestamp")
-                .iterator()
+                .iterator(chunk_size=EXPORT_CHUNK_SIZE)
         )
 
         for record in activate_record_iterator:
@@ -125,7 +342,7 @@ class AnalyticsExporter:
             )
                 .select_related("patient")
                 .order_by("timestamp")
-                .iterator()
+                .iterator(chunk_size=EXPORT_CHUNK_SIZE)
         )
         for action in actions_iterator:
             action_name = action.action
@@ -168,39 +385,30 @@ class AnalyticsExporter:
             LethalMeans.get_static_questions()) + extract_answer_keys_from_json(
             CrisisStabilityPlan.get_static_questions()) + extract_answer_keys_from_json(Outro.get_static_questions())
 
-        scoring_fields = [
-            "scoring_score",
-            "scoring_current_attempt",
-            "scoring_suicide_plan_and_intent",
-            "scoring_risk",
-            "scoring_suicide_index_score",
-            "scoring_suicide_index_score_typology",
-        ]
-
         def _map_fields_to_answers(encounter: Encounter):
             department_name = encounter.department.name
-            analytics_token = encounter.patient.analytics_token
-            mrn = encounter.patient.mrn
-            intro = encounter.get_activity(ActivityType.Intro)
-            stability_plan = encounter.get_activity(ActivityType.StabilityPlan)
-            suicide_assessment = encounter.get_activity(ActivityType.SuicideAssessment)
-            outro = encounter.get_activity(ActivityType.Outro)
+            latest_activities = get_latest_activities(encounter)
+            suicide_assessment = None
 
             answers = {}
-            if intro:
-                answers.update(intro.get_answers()),
-            if suicide_assessment:
-                answers.update(suicide_assessment.get_answers())
-            if stability_plan:
-                answers.update(stability_plan.get_answers()),
-            if outro:
-                answers.update(outro.get_answers())
+            for activity_type in [
+                ActivityType.Intro,
+                ActivityType.SuicideAssessment,
+                ActivityType.StabilityPlan,
+                ActivityType.Outro,
+            ]:
+                assigned_activity = latest_activities.get(activity_type)
+                if assigned_activity is not None:
+                    module = assigned_activity.get_active_module()
+                    answers.update(module.get_answers())
+                    if activity_type == ActivityType.SuicideAssessment:
+                        suicide_assessment = module
 
             optional_fields = []
             if self.include_analytics_token:
-                optional_fields.append(analytics_token)
+                optional_fields.append(encounter.patient.analytics_token)
             if self.include_mrn:
-                optional_fields.append(mrn)
+                optional_fields.append(encounter.patient.mrn)
 
             if answers:
                 values = [encounter.start_time, *[answers.get(field_name, "") for field_name in field_names]]
@@ -208,7 +416,7 @@ class AnalyticsExporter:
                     metadata = suicide_assessment.get_metadata()
                 else:
                     metadata = {}
-                scores = [metadata.get(field, "") for field in scoring_fields]
+                scores = [metadata.get(field, "") for field in SCORING_FIELDS]
                 return optional_fields + [department_name] + values + scores
             return optional_fields
 
@@ -219,12 +427,11 @@ class AnalyticsExporter:
         if self.include_mrn:
             optional_headers.append('MRN')
 
-        yield [*optional_headers, "Department", "Encounter Start Time", *field_names, *scoring_fields]
+        yield [*optional_headers, "Department", "Encounter Start Time", *field_names, *SCORING_FIELDS]
 
-        yield from map(_map_fields_to_answers, Encounter.objects.filter(
-            department__in=self.departments,
-            created__range=[self.start_date, self.end_date]
-        ).select_related("patient", "department").order_by("modified").iterator())
+        yield from map(_map_fields_to_answers, iterate_in_chunks(
+            self.get_encounters_queryset().order_by("modified")
+        ))
 
     @property
     def technicians_iterator(self) -> Iterator[Sequence]:
@@ -253,7 +460,10 @@ class AnalyticsExporter:
                     department__in=self.departments,
                     created__range=[self.start_date, self.end_date]
                 ).distinct("technician").values_list("technician", flat=True)),
-            ).iterator()
+            ).annotate(
+                has_activate_record=Exists(ActivateRecord.objects.filter(technician=OuterRef("pk"))),
+                has_sent_note=Exists(NotesLog.objects.filter(sent_by=OuterRef("pk"))),
+            ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
         )
 
         for technician in technician_iterator:
@@ -268,10 +478,10 @@ class AnalyticsExporter:
                 technician.activation_email_last_sent_at is not None,
                 technician.training_complete,
                 technician.activated,
-                ActivateRecord.objects.filter(technician=technician).exists(),
+                technician.has_activate_record,
                 technician.coach_modeling_complete,
                 technician.practice_with_support_complete,
-                NotesLog.objects.filter(sent_by=technician).exists(),
+                technician.has_sent_note,
                 ""  # To be filled in manually in the export for now
             ]
 
@@ -298,7 +508,7 @@ class AnalyticsExporter:
             )
                 .select_related("patient", "activity")
                 .order_by("patient__id", "modified")
-                .iterator()
+                .iterator(chunk_size=EXPORT_CHUNK_SIZE)
         )
         for patient_activity in patient_activities_iterator:
             optional_fields = []
@@ -338,7 +548,7 @@ class AnalyticsExporter:
             )
                 .select_related("patient", "video")
                 .order_by("patient__id", "modified")
-                .iterator()
+                .iterator(chunk_size=EXPORT_CHUNK_SIZE)
         )
         for patient_video in patient_videos_iterator:
             optional_fields = []
@@ -397,12 +607,10 @@ class AnalyticsExporter:
 
         def _map_fields_to_answers(encounter: Encounter):
             optional_fields = []
-            analytics_token = encounter.patient.analytics_token
-            mrn = encounter.patient.mrn
             if self.include_analytics_token:
-                optional_fields.append(analytics_token)
+                optional_fields.append(encounter.patient.analytics_token)
             if self.include_mrn:
-                optional_fields.append(mrn)
+                optional_fields.append(encounter.patient.mrn)
 
             has_csa = encounter.has_activity(ActivityType.SuicideAssessment)
             has_csp = encounter.has_activity(ActivityType.StabilityPlan)
@@ -417,7 +625,12 @@ class AnalyticsExporter:
             if has_cs:
                 activities_assigned.append('C&S')
 
-            answers = encounter.get_answers().get('answers', {})
+            # The answers of `Encounter.get_answers`, without its metadata: the active
+            # (latest) activity of each type, the older ones' answers taking precedence.
+            latest_activities = get_latest_activities(encounter)
+            answers = {}
+            for assigned_activity in latest_activities.values():
+                answers.update(assigned_activity.get_answers())
 
             distress0 = answers.get('distress0')
             distress1 = answers.get('distress1')
@@ -440,9 +653,24 @@ class AnalyticsExporter:
                 has_cs,
                 has_lm,
                 " + ".join(activities_assigned),
-                encounter.get_activity(ActivityType.SuicideAssessment).assignedactivity.activity_status in ["completed", "updated"] if has_csa else "",
-                encounter.get_activity(ActivityType.LethalMeans).assignedactivity.activity_status in ["completed", "updated"] if has_lm else "",
-                encounter.get_activity(ActivityType.StabilityPlan).assignedactivity.activity_status in ["completed", "updated"] if has_csp else "",
+                (
+                    latest_activities[ActivityType.SuicideAssessment].activity_status
+                    in ["completed", "updated"]
+                    if has_csa
+                    else ""
+                ),
+                (
+                    latest_activities[ActivityType.LethalMeans].activity_status
+                    in ["completed", "updated"]
+                    if has_lm
+                    else ""
+                ),
+                (
+                    latest_activities[ActivityType.StabilityPlan].activity_status
+                    in ["completed", "updated"]
+                    if has_csp
+                    else ""
+                ),
                 answers.get("stability_confidence"),
                 answers.get("readiness"),
                 encounter.patient.tools_to_go_status != "Not Started",
@@ -456,7 +684,12 @@ class AnalyticsExporter:
                 frustration1,
                 change_distress,
                 change_frustration,
-                encounter.get_activity(ActivityType.StabilityPlan).assignedactivity.activity_status in ["in-progress", "completed", "updated"] if has_csp else "",
+                (
+                    latest_activities[ActivityType.StabilityPlan].activity_status
+                    in ["in-progress", "completed", "updated"]
+                    if has_csp
+                    else ""
+                ),
                 encounter.technician_operated,
                 encounter.department.clinic.name,
                 encounter.department.name
@@ -464,14 +697,4 @@ class AnalyticsExporter:
 
             return optional_fields + values
 
-        yield from map(_map_fields_to_answers,
-                       Encounter.objects.select_related('patient', 'department', 'department__clinic').prefetch_related(Prefetch(
-                           "assignedactivity_set",
-                           queryset=AssignedActivity.objects.order_by("-created").select_related(
-                               'stability_plan', 'suicide_assessment', 'comfort_and_skills', 'intro', 'outro',
-                               'lethal_means'
-                           )
-                       )).filter(
-                           department__in=self.departments,
-                           created__range=[self.start_date, self.end_date]
-                       ))
+        yield from map(_map_fields_to_answers, iterate_in_chunks(self.get_encounters_queryset()))
@@ -0,0 +1,123 @@
+"""
+Incremental history of activity answers.
+
+Each save of an activity's answers used to write a historical record (a full copy of
+the activity, `answers` and all) through `simple_history`. Now a save that changes
+answers (see `IActivity.save_answer_changes`) records only the changed answers as an
+`AnswerChange`, and saves the activity without a historical record. A save that
+doesn't change any answers doesn't write anything.
+
+`compact_answer_changes` (run periodically, see `compact_answer_history`) writes one
+historical record for each activity whose answers haven't changed for
+`ANSWER_HISTORY_COMPACTION_DELAY_SECONDS`, and marks the `AnswerChange`s it includes
+as compacted. An `AnswerChange` records the user of the request that made it
+(`changed_by`, the user `HistoryRequestMiddleware` would have recorded), and the
+historical record is attributed to the user of the last change it includes. The
+answers of an activity at any time are the historical record before that time, updated
+with the `AnswerChange`s in between.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import List
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_BATCH_SIZE = 500
+
+ACTIVITY_FIELDS = (
+    "stability_plan",
+    "suicide_assessment",
+    "comfort_and_skills",
+    "intro",
+    "outro",
+    "lethal_means",
+)
+
+
+def get_history_user(instance):
+    """
+    The user a historical record of `instance` would be attributed to: its
+    `_history_user`, or the authenticated user of the request being handled (set by
+    `HistoryRequestMiddleware`), if any.
+    """
+    history_user = getattr(instance, "_history_user", None)
+    if history_user is not None:
+        return history_user
+    user = getattr(getattr(HistoricalRecords.context, "request", None), "user", None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def get_settled_assigned_activity_ids() -> List[int]:
+    """
+    Return the primary keys of the `AssignedActivity`s with `AnswerChange`s that
+    aren't compacted, and no `AnswerChange` for the compaction delay.
+    """
+    AnswerChange = apps.get_model("kiosk", "AnswerChange")
+    settled_before = timezone.now() - timedelta(
+        seconds=settings.ANSWER_HISTORY_COMPACTION_DELAY_SECONDS
+    )
+    return list(
+        AnswerChange.objects.filter(compacted=False)
+        .values("assigned_activity")
+        .annotate(last_change=Max("created"))
+        .filter(last_change__lte=settled_before)
+        .values_list("assigned_activity", flat=True)
+    )
+
+
+def compact_answer_changes() -> int:
+    """
+    Write a historical record for each activity with settled `AnswerChange`s (see the
+    module docstring), returning the number of historical records written.
+    """
+    AnswerChange = apps.get_model("kiosk", "AnswerChange")
+    AssignedActivity = apps.get_model("kiosk", "AssignedActivity")
+
+    assigned_activity_ids = get_settled_assigned_activity_ids()
+    compacted = 0
+    for start in range(0, len(assigned_activity_ids), COMPACTION_BATCH_SIZE):
+        batch_ids = assigned_activity_ids[start : start + COMPACTION_BATCH_SIZE]
+        # `AnswerChange`s made after the activities are loaded aren't in the historical
+        # records, so they're left for the next run.
+        compacted_at = timezone.now()
+        changes = AnswerChange.objects.filter(
+            assigned_activity__in=batch_ids,
+            compacted=False,
+            created__lte=compacted_at,
+        )
+        last_changes = {
+            change.assigned_activity_id: change
+            for change in changes.select_related("changed_by")
+            .defer("changes")
+            .order_by("created", "pk")
+        }
+        activities_by_model = defaultdict(list)
+        for assigned_activity in AssignedActivity.objects.filter(
+            pk__in=batch_ids
+        ).select_related(*ACTIVITY_FIELDS):
+            activity = assigned_activity.get_active_module()
+            # Date and attribute the historical record by the last change it includes.
+            activity._history_date = activity.modified
+            last_change = last_changes.get(assigned_activity.pk)
+            activity._history_user = last_change.changed_by if last_change else None
+            activities_by_model[type(activity)].append(activity)
+
+        with transaction.atomic():
+            for model, activities in activities_by_model.items():
+                model.history.bulk_history_create(activities, update=True)
+                compacted += len(activities)
+            changes.update(compacted=True)
+
+    if compacted:
+        logger.info("Compacted the answer changes of %s activities", compacted)
+    return compacted
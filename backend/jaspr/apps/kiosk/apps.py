@@ -47,3 +47,9 @@ class KioskConfig(AppConfig):
                 _get_queryset_with_jaspr_session_, _manager
             )
             AuthToken.objects = _manager
+
+        # Connects the receivers invalidating cached `AuthToken`s.
+        from jaspr.apps.kiosk import auth_cache  # noqa: F401
+
+        # Connects the receivers invalidating the `ContentCatalog`.
+        from jaspr.apps.kiosk import content_catalog  # noqa: F401
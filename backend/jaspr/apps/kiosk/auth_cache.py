@@ -0,0 +1,145 @@
+"""
+Cached knox `AuthToken` authentication.
+
+Authenticating a request with knox looks the `AuthToken` up by its token key, compares
+digests, then loads the `User` and the `JasprSession` (and their groups) in separate
+queries. `JasprTokenAuthentication` instead caches what it authenticated for
+`AUTH_TOKEN_CACHE_SECONDS`, keyed by the token digest: the `AuthToken`, the `User`
+(without the password or encrypted fields, which are deferred), its group names and the
+`JasprSession` (with the id of its `Encounter`). A request with a cached token is
+authenticated without any queries.
+
+Renewing the expiry of a token (see `JasprTokenAuthentication.renew_token`) updates
+the cached expiry, and writes it to the database in a job (see
+`renew_auth_token_expiry`), at most once per refresh interval.
+
+The cached entry of a token is deleted when the token is deleted (E.g. logging out or
+`JasprSession.apply_policies`) and when its `JasprSession` or `User` is saved.
+Changes to the groups of a `User` take up to `AUTH_TOKEN_CACHE_SECONDS` to apply.
+"""
+import datetime
+from typing import Dict, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from fernet_fields import EncryptedField
+from knox.models import AuthToken
+
+from jaspr.apps.accounts.models import User
+
+# Not cached, the fields are loaded from the database if accessed.
+USER_UNCACHED_FIELDS = ("password",)
+
+AUTH_TOKEN_FIELDS = ("digest", "token_key", "user_id", "created", "expiry")
+JASPR_SESSION_FIELDS = (
+    "id",
+    "auth_token_id",
+    "user_type",
+    "in_er",
+    "from_native",
+    "long_lived",
+    "technician_operated",
+    "encounter_id",
+)
+
+
+def get_auth_token_cache_key(digest: str) -> str:
+    return f"auth-token:{digest}"
+
+
+def get_cached_user_fields() -> Tuple[str, ...]:
+    return tuple(
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname not in USER_UNCACHED_FIELDS
+        and not isinstance(field, EncryptedField)
+    )
+
+
+def from_cached_fields(model, fields: Dict):
+    """Return an instance of `model` as if loaded from the database with `fields`."""
+    return model.from_db(DEFAULT_DB_ALIAS, list(fields), list(fields.values()))
+
+
+def cache_auth_token(auth_token: AuthToken) -> None:
+    user = auth_token.user
+    jaspr_session = auth_token.jaspr_session
+    cache.set(
+        get_auth_token_cache_key(auth_token.digest),
+        {
+            "auth_token": {
+                name: getattr(auth_token, name) for name in AUTH_TOKEN_FIELDS
+            },
+            "user": {name: getattr(user, name) for name in get_cached_user_fields()},
+            "group_names": list(user.group_names),
+            "jaspr_session": {
+                name: getattr(jaspr_session, name) for name in JASPR_SESSION_FIELDS
+            },
+        },
+        settings.AUTH_TOKEN_CACHE_SECONDS,
+    )
+
+
+def get_cached_auth_token(digest: str) -> Optional[AuthToken]:
+    """
+    Return the cached `AuthToken` with the `digest`, with its `User` and `JasprSession`,
+    or `None` if it isn't cached or has expired.
+    """
+    cached = cache.get(get_auth_token_cache_key(digest))
+    if cached is None:
+        return None
+    expiry = cached["auth_token"]["expiry"]
+    if expiry is not None and expiry < timezone.now():
+        # Left to the regular knox authentication to clean up.
+        invalidate_auth_token(digest)
+        return None
+
+    JasprSession = apps.get_model("kiosk", "JasprSession")
+    auth_token = from_cached_fields(AuthToken, cached["auth_token"])
+    user = from_cached_fields(User, cached["user"])
+    user.__dict__["group_names"] = cached["group_names"]
+    jaspr_session = from_cached_fields(JasprSession, cached["jaspr_session"])
+    auth_token.user = user
+    jaspr_session.auth_token = auth_token
+    AuthToken.jaspr_session.related.set_cached_value(auth_token, jaspr_session)
+    return auth_token
+
+
+def update_cached_expiry(digest: str, expiry: datetime.datetime) -> None:
+    key = get_auth_token_cache_key(digest)
+    cached = cache.get(key)
+    if cached is not None:
+        cached["auth_token"]["expiry"] = expiry
+        cache.set(key, cached, settings.AUTH_TOKEN_CACHE_SECONDS)
+
+
+def invalidate_auth_token(digest: str) -> None:
+    cache.delete(get_auth_token_cache_key(digest))
+
+
+@receiver(post_delete, sender=AuthToken)
+def auth_token_deleted(sender, instance: AuthToken, **kwargs) -> None:
+    invalidate_auth_token(instance.digest)
+
+
+@receiver(post_save, sender="kiosk.JasprSession")
+def jaspr_session_saved(sender, instance, **kwargs) -> None:
+    invalidate_auth_token(instance.auth_token_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance: User, created: bool, **kwargs) -> None:
+    if not created:
+        cache.delete_many(
+            [
+                get_auth_token_cache_key(digest)
+                for digest in AuthToken.objects.filter(user=instance).values_list(
+                    "digest", flat=True
+                )
+            ]
+        )
@@ -1,8 +1,11 @@
+import binascii
 from typing import Literal, Tuple
 
 from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 from ipware import get_client_ip
 from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
 from knox.models import AuthToken
 from knox.settings import knox_settings
 from rest_framework import exceptions
@@ -11,8 +14,9 @@ from rest_framework.request import Request
 from jaspr.apps.accounts.authentication import log_login_attempt
 from jaspr.apps.accounts.models import LoggedOutAuthToken
 from jaspr.apps.common.authentication import UidAndTokenAuthentication
+from jaspr.apps.kiosk import auth_cache
 from jaspr.apps.kiosk.constants import ActionNames
-from jaspr.apps.kiosk.jobs import queue_action_creation
+from jaspr.apps.kiosk.jobs import queue_action_creation, renew_auth_token_expiry
 from jaspr.apps.kiosk.models import (
     Encounter,
     JasprSession,
@@ -28,7 +32,29 @@ from .tokens import (
 )
 
 
-class JasprTokenAuthentication(TokenAuthentication):
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Knox `TokenAuthentication`, authenticating tokens from the cache when they're
+    cached (see `jaspr.apps.kiosk.auth_cache`).
+    """
+
+    def authenticate_credentials(self, token: bytes):
+        try:
+            digest = hash_token(token.decode("utf-8"))
+        except (TypeError, binascii.Error, UnicodeDecodeError):
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        auth_token = auth_cache.get_cached_auth_token(digest)
+        if auth_token is None:
+            user, auth_token = super().authenticate_credentials(token)
+            if user.is_active:
+                auth_cache.cache_auth_token(auth_token)
+            return user, auth_token
+        if knox_settings.AUTO_REFRESH and auth_token.expiry:
+            self.renew_token(auth_token)
+        return self.validate_user(auth_token)
+
+
+class JasprTokenAuthentication(CachedTokenAuthentication):
     def renew_token(self, auth_token: AuthToken) -> None:
         jaspr_session = auth_token.jaspr_session
         session_parameters = {
@@ -55,7 +81,9 @@ class JasprTokenAuthentication(TokenAuthentication):
             )
         else:
             # The code below is copy pasted from knox at the time of writing except for
-            # the line `new_expiry = ...` (which was modified to fit our use case).
+            # the line `new_expiry = ...` (which was modified to fit our use case), and
+            # the write, which is done by a job (and the cached expiry updated right
+            # away, see `jaspr.apps.kiosk.auth_cache`).
             current_expiry = auth_token.expiry
             new_expiry = timezone.now() + JasprSession.expiration_timedelta_for(
                 **session_parameters
@@ -66,10 +94,66 @@ class JasprTokenAuthentication(TokenAuthentication):
             if delta > JasprSession.expiration_min_refresh_interval_for(
                 **session_parameters
             ):
-                auth_token.save(update_fields=("expiry",))
+                auth_cache.update_cached_expiry(auth_token.digest, new_expiry)
+                renew_auth_token_expiry.delay(auth_token.digest, new_expiry)
+
+
+def load_session_encounter_state(user, auth_token: AuthToken) -> None:
+    """
+    Load the `Encounter` of the `JasprSession` of `auth_token` with its state (see
+    `EncounterQuerySet.with_state`), if it's a `Patient`'s, so everything handling the
+    request (permissions, views, serializers) reads the same fully loaded `Encounter`.
+
+    The `Patient`'s `current_encounter` is loaded with its state too and is usually the
+    same `Encounter`, in which case it's only loaded once.
+    """
+    jaspr_session = auth_token.jaspr_session
+    if (
+        jaspr_session.user_type != "Patient"
+        or jaspr_session.encounter_id is None
+        or not hasattr(user, "patient")
+    ):
+        return
+    encounter = user.patient.current_encounter
+    if encounter is None or encounter.pk != jaspr_session.encounter_id:
+        encounter = Encounter.objects.get_state(jaspr_session.encounter_id)
+    jaspr_session.encounter = encounter
+
+
+def load_session_encounter_if_not_modified(user, auth_token: AuthToken, etags: str) -> bool:
+    """
+    Load the `Encounter` of the `JasprSession` of `auth_token` without its state, if
+    it's a `Patient`'s current `Encounter` and `etags` (an `If-None-Match` header) has
+    its `etag`, in which case the request can be answered without the state. Returns
+    whether it was loaded, nothing is loaded otherwise.
+    """
+    jaspr_session = auth_token.jaspr_session
+    if (
+        jaspr_session.user_type != "Patient"
+        or jaspr_session.encounter_id is None
+        or not hasattr(user, "patient")
+        or "current_encounter" in user.patient.__dict__
+    ):
+        return False
+    encounter = (
+        Encounter.objects.select_related("department__clinic__system")
+        .filter(patient=user.patient)
+        .order_by("-created")
+        .first()
+    )
+    if (
+        encounter is None
+        or encounter.pk != jaspr_session.encounter_id
+        or not encounter.matches_etag(etags)
+    ):
+        return False
+    encounter.patient = user.patient
+    user.patient.current_encounter = encounter
+    jaspr_session.encounter = encounter
+    return True
 
 
-class JasprTokenAuthenticationNoRenew(TokenAuthentication):
+class JasprTokenAuthenticationNoRenew(CachedTokenAuthentication):
     def renew_token(self, auth_token) -> None:
         return None
 
@@ -0,0 +1,238 @@
+"""
+Process local snapshot of the static kiosk content.
+
+Content (`Activity`, `CopingStrategy`, `CopingStrategyCategory`, `GuideMessage`,
+`Helpline`, `SharedStory` (with its `Person` and `Topic`), `Media` and its tags, and the
+`jah` `ConversationStarter`s and `CommonConcern`s) only changes through the admin, but
+was queried and serialized again by every `WalkthroughManager` run and content endpoint.
+
+`get_content_catalog` returns a `ContentCatalog`, all of the content loaded once (a
+query or two for each model) and kept in the process, along with the serialized payloads of the
+content, each serialized once per snapshot. Saving or deleting any of the content
+replaces the content version in the cache (see `invalidate_content_catalog`), so every
+process loads a new snapshot the next time it's used.
+
+The instances in a snapshot are shared by every request of the process and shouldn't be
+changed, and neither should the payloads (copy them first).
+"""
+import threading
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Type
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+from rest_framework.request import Request
+from rest_framework.serializers import BaseSerializer
+from taggit.models import Tag, TaggedItem
+
+from jaspr.apps.awsmedia.models import Media
+from jaspr.apps.jah.models import CommonConcern, ConversationStarter
+from jaspr.apps.kiosk.models import (
+    Activity,
+    CopingStrategy,
+    CopingStrategyCategory,
+    GuideMessage,
+    Helpline,
+    Person,
+    SharedStory,
+    Topic,
+)
+
+CONTENT_VERSION_CACHE_KEY = "content-catalog-version"
+
+# Name of the `Media` used as the image of custom (`PatientCopingStrategy`) coping
+# strategies.
+CUSTOM_COPING_STRATEGY_MEDIA_NAME = "Custom Coping Strategy"
+
+
+def get_content_version() -> str:
+    return cache.get_or_set(CONTENT_VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_content_catalog() -> None:
+    cache.set(CONTENT_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+class ContentCatalog:
+    """
+    All of the content, each model loaded the first time it's used, in the order its
+    endpoint lists it, whatever the `status` (filter on it where needed).
+    """
+
+    def __init__(self, version: str):
+        self.version = version
+        self._by_id: Dict[Type[Model], Dict[int, Model]] = {}
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    @cached_property
+    def activities(self) -> List[Activity]:
+        return list(Activity.objects.select_related("video").prefetch_related("video__tags"))
+
+    @cached_property
+    def coping_strategy_categories(self) -> List[CopingStrategyCategory]:
+        return list(CopingStrategyCategory.objects.all())
+
+    @cached_property
+    def coping_strategies(self) -> List[CopingStrategy]:
+        coping_strategies = list(CopingStrategy.objects.all())
+        for coping_strategy in coping_strategies:
+            # Shared with `coping_strategy_categories` instead of loaded again.
+            coping_strategy.category = self.get(
+                CopingStrategyCategory, coping_strategy.category_id
+            )
+        return coping_strategies
+
+    @cached_property
+    def guide_messages(self) -> List[GuideMessage]:
+        return list(GuideMessage.objects.all())
+
+    @cached_property
+    def helplines(self) -> List[Helpline]:
+        return list(Helpline.objects.all())
+
+    @cached_property
+    def media(self) -> List[Media]:
+        return list(Media.objects.prefetch_related("tags"))
+
+    @cached_property
+    def shared_stories(self) -> List[SharedStory]:
+        shared_stories = list(
+            SharedStory.objects.select_related("person", "topic").order_by("order")
+        )
+        for shared_story in shared_stories:
+            # Shared with `media` instead of loaded again.
+            shared_story.video = self.get(Media, shared_story.video_id)
+        return shared_stories
+
+    @cached_property
+    def conversation_starters(self) -> List[ConversationStarter]:
+        return list(ConversationStarter.objects.all())
+
+    @cached_property
+    def common_concerns(self) -> List[CommonConcern]:
+        return list(CommonConcern.objects.all())
+
+    # Model -> the attribute with all of its instances.
+    MODEL_ATTRIBUTES = {
+        Activity: "activities",
+        CopingStrategyCategory: "coping_strategy_categories",
+        CopingStrategy: "coping_strategies",
+        GuideMessage: "guide_messages",
+        Helpline: "helplines",
+        Media: "media",
+        SharedStory: "shared_stories",
+        ConversationStarter: "conversation_starters",
+        CommonConcern: "common_concerns",
+    }
+
+    def has_model(self, model: Type[Model]) -> bool:
+        return model in self.MODEL_ATTRIBUTES
+
+    def get(self, model: Type[Model], pk) -> Optional[Model]:
+        by_id = self._by_id.get(model)
+        if by_id is None:
+            instances = getattr(self, self.MODEL_ATTRIBUTES[model])
+            by_id = self._by_id[model] = {instance.pk: instance for instance in instances}
+        return by_id.get(pk)
+
+    @cached_property
+    def coping_strategies_by_title(self) -> Dict[str, List[CopingStrategy]]:
+        coping_strategies_by_title = defaultdict(list)
+        for coping_strategy in self.coping_strategies:
+            coping_strategies_by_title[coping_strategy.title.casefold()].append(
+                coping_strategy
+            )
+        return coping_strategies_by_title
+
+    @cached_property
+    def media_by_tag(self) -> Dict[str, List[Media]]:
+        media_by_tag = defaultdict(list)
+        for media in self.media:
+            for tag in media.tags.all():
+                media_by_tag[tag.name.casefold()].append(media)
+        return media_by_tag
+
+    def get_coping_strategies_by_title(self, titles: Iterable[str]) -> List[CopingStrategy]:
+        """The `CopingStrategy`s with any of the `titles`, ignoring case."""
+        return [
+            coping_strategy
+            for title in {title.casefold() for title in titles}
+            for coping_strategy in self.coping_strategies_by_title.get(title, ())
+        ]
+
+    def get_media_by_name(self, name: str) -> Optional[Media]:
+        return next((media for media in self.media if media.name == name), None)
+
+    def get_payload(
+        self,
+        serializer_class: Type[BaseSerializer],
+        instance: Model,
+        request: Optional[Request] = None,
+    ) -> Dict:
+        """
+        Return `serializer_class(instance).data`, serialized once per snapshot. With a
+        `request`, file URLs are made absolute for its host, like serializing with the
+        `request` in the context.
+        """
+        base_url = request.build_absolute_uri("/") if request is not None else None
+        key = (serializer_class, type(instance), instance.pk, base_url)
+        payload = self._payloads.get(key)
+        if payload is None:
+            context = {"request": request} if request is not None else {}
+            payload = serializer_class(instance, context=context).data
+            with self._lock:
+                payload = self._payloads.setdefault(key, payload)
+        return payload
+
+    def get_payloads(
+        self,
+        serializer_class: Type[BaseSerializer],
+        instances: Iterable[Model],
+        request: Optional[Request] = None,
+    ) -> List[Dict]:
+        return [
+            self.get_payload(serializer_class, instance, request) for instance in instances
+        ]
+
+
+_catalog: Optional[ContentCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_content_catalog() -> ContentCatalog:
+    """Return the `ContentCatalog` of the current content version, loading it if needed."""
+    global _catalog
+    version = get_content_version()
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+    with _catalog_lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = ContentCatalog(version)
+        return _catalog
+
+
+@receiver([post_save, post_delete], sender=Activity)
+@receiver([post_save, post_delete], sender=CopingStrategy)
+@receiver([post_save, post_delete], sender=CopingStrategyCategory)
+@receiver([post_save, post_delete], sender=GuideMessage)
+@receiver([post_save, post_delete], sender=Helpline)
+@receiver([post_save, post_delete], sender=Media)
+@receiver([post_save, post_delete], sender=Person)
+@receiver([post_save, post_delete], sender=SharedStory)
+@receiver([post_save, post_delete], sender=Topic)
+@receiver([post_save, post_delete], sender=ConversationStarter)
+@receiver([post_save, post_delete], sender=CommonConcern)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=TaggedItem)
+def content_changed(sender, **kwargs) -> None:
+    invalidate_content_catalog()
+    # Another process could load a snapshot between the change and the commit, and
+    # keep it until the next change, so the version is replaced again on commit.
+    transaction.on_commit(invalidate_content_catalog)
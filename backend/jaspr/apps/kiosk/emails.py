@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from django.conf import settings
 from django.utils import timezone
@@ -86,8 +86,12 @@ def send_technician_set_password_confirmation_email(
 
 
 def send_tools_to_go_setup_email(
-    user: User, template_base: str = "kiosk/tools_to_go_setup"
-) -> Job:
+    user: User, template_base: str = "kiosk/tools_to_go_setup", buffered: bool = False
+) -> Optional[Job]:
+    """
+    With `buffered`, the email is sent in bulk with other buffered messages (see
+    `jaspr.apps.common.message_buffer`) and no `Job` is returned.
+    """
     b64_uid = urlsafe_base64_encode(force_bytes(user.pk))
     token = JasprToolsToGoSetupTokenGenerator().make_token(user)
     jaspr_setup_url = (
@@ -97,6 +101,7 @@ def send_tools_to_go_setup_email(
         user.pk,
         template_base,
         context={"jaspr_setup_url": jaspr_setup_url},
+        buffered=buffered,
     )
 
 
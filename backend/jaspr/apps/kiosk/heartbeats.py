@@ -0,0 +1,84 @@
+"""
+Coalesced `Encounter.last_heartbeat` writes.
+
+Every authenticated request from a `Patient` in the ER is a heartbeat (see
+`HasRecentHeartbeat`). Instead of an `UPDATE` on the `Encounter` per request, the
+latest heartbeat of each `Encounter` is kept in the cache (Redis), and
+`flush_heartbeats` (run periodically, see `flush_encounter_heartbeats`) writes them to
+the database in one batch.
+
+The cached heartbeat, when there is one, is the source of truth. Code that sets
+`last_heartbeat` and saves the `Encounter` (E.g. `Encounter.reset_lockout`) writes the
+new value to the cache as well (see `Encounter.save`).
+
+NOTE: Heartbeats are only flushed for `Encounter`s with an ER `JasprSession`, so the
+last heartbeats of a session that is deleted (logged out) before the next flush only
+stay in the cache. The next login resets `last_heartbeat` anyway.
+"""
+import datetime
+import logging
+from typing import Dict, Iterable, Optional
+
+from django.apps import apps
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Long enough that a heartbeat is flushed well before it expires from the cache.
+HEARTBEAT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_heartbeat_cache_key(encounter_id: int) -> str:
+    return f"encounter-heartbeat:{encounter_id}"
+
+
+def set_heartbeat(encounter_id: int, timestamp: Optional[datetime.datetime]) -> None:
+    if timestamp is None:
+        cache.delete(get_heartbeat_cache_key(encounter_id))
+    else:
+        cache.set(get_heartbeat_cache_key(encounter_id), timestamp, HEARTBEAT_CACHE_TIMEOUT)
+
+
+def get_last_heartbeat(encounter) -> Optional[datetime.datetime]:
+    """Return the last heartbeat of `encounter`, preferring the cached one."""
+    cached = cache.get(get_heartbeat_cache_key(encounter.pk))
+    if cached is not None:
+        return cached
+    return encounter.last_heartbeat
+
+
+def get_cached_heartbeats(encounter_ids: Iterable[int]) -> Dict[int, datetime.datetime]:
+    keys = {get_heartbeat_cache_key(encounter_id): encounter_id for encounter_id in encounter_ids}
+    return {keys[key]: timestamp for key, timestamp in cache.get_many(list(keys)).items()}
+
+
+def flush_heartbeats() -> int:
+    """
+    Write the cached heartbeats of `Encounter`s with an ER `JasprSession` to the
+    database, returning the number of `Encounter`s updated.
+    """
+    Encounter = apps.get_model("kiosk", "Encounter")
+    JasprSession = apps.get_model("kiosk", "JasprSession")
+
+    encounter_ids = set(
+        JasprSession.objects.filter(in_er=True, encounter__isnull=False).values_list(
+            "encounter", flat=True
+        )
+    )
+    cached_heartbeats = get_cached_heartbeats(encounter_ids)
+    if not cached_heartbeats:
+        return 0
+
+    stale = []
+    for encounter_id, last_heartbeat in Encounter.objects.filter(
+        pk__in=cached_heartbeats
+    ).values_list("pk", "last_heartbeat"):
+        cached = cached_heartbeats[encounter_id]
+        if last_heartbeat is None or cached > last_heartbeat:
+            stale.append(Encounter(pk=encounter_id, last_heartbeat=cached))
+
+    # NOTE: `bulk_update` doesn't create simple history records or update `modified`,
+    # the same as the `update` this replaces.
+    Encounter.objects.bulk_update(stale, ["last_heartbeat"], batch_size=500)
+    logger.info("Flushed %s encounter heartbeats", len(stale))
+    return len(stale)
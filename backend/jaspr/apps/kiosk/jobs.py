@@ -1,22 +1,30 @@
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
+from functools import partial
+from typing import List, Optional
 from sentry_sdk import capture_exception
 
 from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.db.models import Count, DurationField, ExpressionWrapper, F, Q
 from django.utils import timezone
 from django_rq.decorators import job
 from django_rq.jobs import Job
+from knox.models import AuthToken
 
 from .emails import send_tools_to_go_setup_email
-from jaspr.apps.kiosk.models import Action, Patient, AssignedActivity
+from jaspr.apps.kiosk import action_buffer, answer_history, heartbeats
+from jaspr.apps.kiosk.models import Action, AssignedActivity, Encounter, Patient
 from jaspr.apps.kiosk.narrative_note import NarrativeNote
 from jaspr.apps.epic.models import EpicDepartmentSettings, NotesLog
+from jaspr.apps.epic.note_dispatch import NoteDispatchResult, NoteDispatchTask, dispatch_notes
 from jaspr.apps.common.jobs.messaging import email_engineering, email_support
 
 logger = logging.getLogger(__name__)
 
 
+# NOTE: `Action`s are buffered now (see `queue_action_creation`). This stays for any
+# `create_action` jobs queued before the buffer.
 @job
 def create_action(valid_action_data: dict) -> None:
     action = Action.objects.create(**valid_action_data)
@@ -31,9 +39,28 @@ def create_action(valid_action_data: dict) -> None:
     )
 
 
-def queue_action_creation(valid_action_data: dict) -> Job:
-    valid_action_data.setdefault("timestamp", timezone.now())
-    return create_action.delay(valid_action_data)
+def queue_action_creation(valid_action_data: dict) -> None:
+    queue_actions_creation([valid_action_data])
+
+
+def queue_actions_creation(valid_actions_data: List[dict]) -> None:
+    """
+    Buffer the `Action`s for creation (see `jaspr.apps.kiosk.action_buffer`).
+    """
+    for valid_action_data in valid_actions_data:
+        valid_action_data.setdefault("timestamp", timezone.now())
+    action_buffer.buffer_actions(valid_actions_data, drain_action_buffer.delay)
+
+
+@job
+def drain_action_buffer() -> Job:
+    action_buffer.drain_action_buffer()
+
+
+@job("high")
+def renew_auth_token_expiry(digest: str, expiry: datetime) -> None:
+    """Write a renewed `AuthToken` expiry (see `JasprTokenAuthentication.renew_token`)."""
+    AuthToken.objects.filter(digest=digest, expiry__lt=expiry).update(expiry=expiry)
 
 
 @job
@@ -50,7 +77,63 @@ def check_and_resend_tools_to_go_setup_email(
             kwargs["template_base"] = "kiosk/tools_to_go_setup_first_resend"
         elif email_number == 2:
             kwargs["template_base"] = "kiosk/tools_to_go_setup_second_resend"
-        send_tools_to_go_setup_email(patient.user, **kwargs)
+        # The reminders are sent in bulk, see `jaspr.apps.common.message_buffer`.
+        send_tools_to_go_setup_email(patient.user, buffered=True, **kwargs)
+
+
+# Set while a `generate_note` job is queued for an `Encounter` and note type, so
+# triggers in quick succession (E.g. several takeaway kit edits) queue one job, which
+# renders the latest answers.
+NOTE_GENERATION_QUEUED_CACHE_TIMEOUT = 60 * 10
+
+
+def get_note_generation_cache_key(encounter_id: int, note_type: str) -> str:
+    return f"note-generation-queued:{encounter_id}:{note_type}"
+
+
+def queue_note_generation(encounter_id: int, note_type: str, trigger: str) -> Optional[Job]:
+    """
+    Queue rendering the `note_type` note of the `Encounter` and sending it to the EHR,
+    unless that's already queued.
+    """
+    if not cache.add(
+        get_note_generation_cache_key(encounter_id, note_type),
+        True,
+        NOTE_GENERATION_QUEUED_CACHE_TIMEOUT,
+    ):
+        logger.info(
+            "Not queueing %s for encounter %s (%s) because one is already queued",
+            note_type,
+            encounter_id,
+            trigger,
+        )
+        return None
+    return generate_note.delay(encounter_id, note_type, trigger)
+
+
+@job("notes")
+def generate_note(encounter_id: int, note_type: str, trigger: str) -> None:
+    # Cleared first, so a trigger while the note is rendered queues another job.
+    cache.delete(get_note_generation_cache_key(encounter_id, note_type))
+    encounter = Encounter.objects.get_state(encounter_id)
+    note = NarrativeNote(encounter)
+    if note_type == NotesLog.NOTE_TYPES.narrative_note:
+        save_note = note.save_narrative_note
+    else:
+        save_note = note.save_stability_plan_note
+    try:
+        save_note(trigger=trigger)
+    except ValidationError as e:
+        if NotesLog.error_messages["duplicate"] not in e.messages:
+            raise e
+
+
+def send_narrative_note(encounter) -> None:
+    NarrativeNote(encounter).save_narrative_note(trigger="cron")
+
+
+def send_stability_plan_note(encounter) -> None:
+    NarrativeNote(encounter).save_stability_plan_note(trigger="cron")
 
 
 @job
@@ -67,7 +150,11 @@ def check_for_unsent_notes() -> Job:
     notes_sent = 0
     try:
         # We will only process departments that are integrated with the Epic EHR
-        epic_department_ids = list(EpicDepartmentSettings.objects.values_list("department", flat=True))
+        epic_settings_ids_by_department = dict(
+            EpicDepartmentSettings.objects.values_list("department", "epic_settings")
+        )
+        epic_department_ids = list(epic_settings_ids_by_department)
+        tasks = []
 
         # Time since update
         inactive_time = timezone.now() - timezone.timedelta(minutes=10)
@@ -103,14 +190,13 @@ def check_for_unsent_notes() -> Job:
                 logger.warning(message)
                 continue
 
-            try:
-                NarrativeNote(encounter).save_narrative_note(trigger="cron")
-                notes_sent = notes_sent + 1
-            except Exception as e:
-                logger.exception(
-                    f"Failed to Auto send narrative note for encounter {suicide_assessment_assignment.encounter.pk}",
-                    exc_info=e)
-                capture_exception(e)
+            tasks.append(
+                NoteDispatchTask(
+                    epic_settings_id=epic_settings_ids_by_department[encounter.department_id],
+                    description=f"narrative note for encounter {encounter.pk}",
+                    send=partial(send_narrative_note, encounter),
+                )
+            )
 
         # Find all patient CSP's where the CSP is assigned, but the note has not been sent to the EHR
         # Or the Note was sent to the EHR, but the CSP has been modified since the note was sent.
@@ -132,7 +218,7 @@ def check_for_unsent_notes() -> Job:
 
         for stability_plan_assignment in stability_plan_assignments:
             encounter = stability_plan_assignment.encounter
-            logger.info("saving stability note for assigned activity {stability_plan_assignment.pk")
+            logger.info(f"saving stability note for assigned activity {stability_plan_assignment.pk}")
 
             logger.info(
                 f"encounter {encounter.pk} has had {stability_plan_assignment.note_count} stability plan notes sent to EHR")
@@ -141,15 +227,18 @@ def check_for_unsent_notes() -> Job:
                 logger.warning(message)
                 continue
 
-            try:
-                NarrativeNote(stability_plan_assignment.encounter).save_stability_plan_note(trigger="cron")
-                notes_sent = notes_sent + 1
-            except Exception as e:
-                logger.exception("Failed to Auto send stability plan note for encounter %s",
-                                 stability_plan_assignment.encounter.pk,
-                                 exc_info=e)
-                capture_exception(e)
-
+            tasks.append(
+                NoteDispatchTask(
+                    epic_settings_id=epic_settings_ids_by_department[encounter.department_id],
+                    description=f"stability plan note for encounter {encounter.pk}",
+                    send=partial(send_stability_plan_note, encounter),
+                )
+            )
+
+        # Rendering and sending the notes is fanned out per EHR instance, see
+        # `jaspr.apps.epic.note_dispatch`.
+        results = dispatch_notes(tasks)
+        notes_sent = sum(result.outcome == NoteDispatchResult.OUTCOME_SENT for result in results)
     except Exception as e:
         logger.exception("Job Sending EHR Notes has failed", exc_info=e)
         capture_exception(e)
@@ -159,6 +248,16 @@ def check_for_unsent_notes() -> Job:
         logger.info(f"Finished Job Sending {notes_sent} EHR Notes")
 
 
+@job
+def flush_encounter_heartbeats() -> Job:
+    heartbeats.flush_heartbeats()
+
+
+@job("low")
+def compact_answer_history() -> Job:
+    answer_history.compact_answer_changes()
+
+
 @job
 def review_note_sending() -> Job:
     oversent_notes = NotesLog.objects.filter(status="sent").values("encounter", "note_type").annotate(
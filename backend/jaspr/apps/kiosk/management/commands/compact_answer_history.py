@@ -0,0 +1,13 @@
+from jaspr.apps.common.management.base import JasprBaseCommand
+from jaspr.apps.kiosk.jobs import compact_answer_history
+
+
+class Command(JasprBaseCommand):
+    """
+    Run this command to write a historical record for each activity with answer changes that have settled
+    """
+
+    help = __doc__
+
+    def handle(self, *args, **options) -> None:
+        compact_answer_history()
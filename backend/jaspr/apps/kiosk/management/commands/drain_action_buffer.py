@@ -0,0 +1,13 @@
+from jaspr.apps.common.management.base import JasprBaseCommand
+from jaspr.apps.kiosk.jobs import drain_action_buffer
+
+
+class Command(JasprBaseCommand):
+    """
+    Run this command to write the `Action`s buffered in Redis to the database
+    """
+
+    help = __doc__
+
+    def handle(self, *args, **options) -> None:
+        drain_action_buffer()
@@ -0,0 +1,53 @@
+import datetime
+
+from django.core.management.base import CommandError, CommandParser
+
+from jaspr.apps.clinics.models import HealthcareSystem
+from jaspr.apps.common.management.base import JasprBaseCommand
+from jaspr.apps.kiosk.analytics import AnalyticsExporter
+
+
+class Command(JasprBaseCommand):
+    """
+    Export the analytics CSVs of a `HealthcareSystem` into a zip file. Use this instead
+    of the admin for large exports (E.g. a whole year)
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("system_id", type=int, help="The id of the `HealthcareSystem`.")
+        parser.add_argument("start_date", type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument("end_date", type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument(
+            "-o",
+            "--output",
+            type=str,
+            help="Specify the output. If not provided, will default to the export's file name.",
+        )
+        parser.add_argument(
+            "--sheet",
+            dest="sheets",
+            action="append",
+            choices=list(AnalyticsExporter.SHEETS),
+            help="Only export this CSV. Can be given more than once.",
+        )
+        parser.add_argument("--include-mrn", action="store_true", default=False)
+        parser.add_argument("--exclude-analytics-token", action="store_true", default=False)
+
+    def handle(self, *args, **options) -> None:
+        try:
+            system = HealthcareSystem.objects.get(pk=options["system_id"])
+        except HealthcareSystem.DoesNotExist:
+            raise CommandError(f"HealthcareSystem {options['system_id']} does not exist.")
+        exporter = AnalyticsExporter(
+            system,
+            options["start_date"],
+            options["end_date"],
+            include_mrn=options["include_mrn"],
+            include_analytics_token=not options["exclude_analytics_token"],
+        )
+        output = options["output"] or exporter.get_filename("all", "zip")
+        with open(output, "wb") as file:
+            exporter.write_zip(file, data_names=options["sheets"])
+        self.stdout.write(f"Exported analytics to {output}.")
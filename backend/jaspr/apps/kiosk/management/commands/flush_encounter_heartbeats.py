@@ -0,0 +1,13 @@
+from jaspr.apps.common.management.base import JasprBaseCommand
+from jaspr.apps.kiosk.jobs import flush_encounter_heartbeats
+
+
+class Command(JasprBaseCommand):
+    """
+    Run this command to write the `Encounter` heartbeats recorded in the cache to the database
+    """
+
+    help = __doc__
+
+    def handle(self, *args, **options) -> None:
+        flush_encounter_heartbeats()
@@ -0,0 +1,21 @@
+from django.db import transaction
+
+from jaspr.apps.common.management.base import JasprBaseCommand
+from jaspr.apps.kiosk.models import Patient, PatientSearchToken
+
+
+class Command(JasprBaseCommand):
+    """
+    Rebuild the `PatientSearchToken` search index for every `Patient`. Needs to be run
+    if `PATIENT_SEARCH_INDEX_KEY` (or `SECRET_KEY` if that isn't set) changes
+    """
+
+    help = __doc__
+
+    def handle(self, *args, **options) -> None:
+        count = 0
+        for patient in Patient.objects.iterator():
+            with transaction.atomic():
+                PatientSearchToken.update_for_patient(patient)
+            count += 1
+        self.stdout.write(f"Rebuilt the search index for {count} patients.")
@@ -0,0 +1,20 @@
+from django.db import transaction
+
+from jaspr.apps.common.management.base import JasprBaseCommand
+from jaspr.apps.kiosk.models import Patient, RecentPatient
+
+
+class Command(JasprBaseCommand):
+    """
+    Rebuild the `RecentPatient`s of every `Patient` from their active `PatientDepartmentSharing`s and `ActivateRecord`s.
+    """
+
+    help = __doc__
+
+    def handle(self, *args, **options) -> None:
+        count = 0
+        for patient in Patient.objects.iterator():
+            with transaction.atomic():
+                RecentPatient.rebuild_for_patient(patient)
+            count += 1
+        self.stdout.write(f"Rebuilt the recent patients for {count} patients.")
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.13 on 2022-04-25 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_patient_search_tokens(apps, schema_editor):
+    from jaspr.apps.kiosk.models.patient_search_token import build_patient_search_tokens
+
+    Patient = apps.get_model("kiosk", "Patient")
+    PatientSearchToken = apps.get_model("kiosk", "PatientSearchToken")
+    for patient in Patient.objects.iterator():
+        PatientSearchToken.objects.bulk_create(
+            [
+                PatientSearchToken(patient=patient, field=field, token=token)
+                for field, token in set(
+                    build_patient_search_tokens(
+                        mrn=patient.mrn,
+                        ssid=patient.ssid,
+                        first_name=patient.first_name,
+                        last_name=patient.last_name,
+                        date_of_birth=patient.date_of_birth,
+                    )
+                )
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kiosk', '0078_auto_20220419_1416'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('mrn', 'MRN'), ('ssid', 'SSID'), ('first_name', 'First Name'), ('last_name', 'Last Name'), ('date_of_birth', 'Date of Birth'), ('birth_month_day', 'Birth Month and Day')], max_length=31, verbose_name='Field')),
+                ('token', models.CharField(max_length=32, verbose_name='Token')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='kiosk.patient', verbose_name='Patient')),
+            ],
+            options={
+                'verbose_name': 'Patient Search Token',
+                'verbose_name_plural': 'Patient Search Tokens',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='patientsearchtoken',
+            index=models.Index(fields=['token', 'field', 'patient'], name='patient_search_token_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='patientsearchtoken',
+            constraint=models.UniqueConstraint(fields=('patient', 'field', 'token'), name='unique_patient_search_token'),
+        ),
+        migrations.RunPython(
+            populate_patient_search_tokens, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.13 on 2026-10-18 14:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import jaspr.apps.common.fields.encrypted_json_field
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kiosk', '0079_patientsearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('status', model_utils.fields.StatusField(choices=[('active', 'Active')], default='active', max_length=100, no_check_for_status=True)),
+                ('changes', jaspr.apps.common.fields.encrypted_json_field.EncryptedJSONField()),
+                ('compacted', models.BooleanField(default=False, help_text='Whether a historical record of the activity includes this change.', verbose_name='Compacted')),
+                ('assigned_activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_changes', to='kiosk.assignedactivity', verbose_name='Assigned Activity')),
+            ],
+            options={
+                'verbose_name': 'Answer Change',
+                'verbose_name_plural': 'Answer Changes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='answerchange',
+            index=models.Index(fields=['compacted', 'assigned_activity'], name='answer_change_compacted_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.2.13 on 2026-10-18 15:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_recent_patients(apps, schema_editor):
+    ActivateRecord = apps.get_model("kiosk", "ActivateRecord")
+    PatientDepartmentSharing = apps.get_model("kiosk", "PatientDepartmentSharing")
+    RecentPatient = apps.get_model("kiosk", "RecentPatient")
+
+    last_logged_in_at = {
+        (row["patient_id"], row["technician__system_id"]): row["last_logged_in_at"]
+        for row in ActivateRecord.objects.values("patient_id", "technician__system_id")
+        .annotate(last_logged_in_at=models.Max("timestamp"))
+        .order_by()
+    }
+    sharings = (
+        PatientDepartmentSharing.objects.filter(status="active", department__isnull=False)
+        .values_list("patient_id", "department_id", "department__clinic__system_id")
+        .distinct()
+    )
+    RecentPatient.objects.bulk_create(
+        (
+            RecentPatient(
+                patient_id=patient_id,
+                department_id=department_id,
+                last_logged_in_at=last_logged_in_at.get((patient_id, system_id)),
+            )
+            for patient_id, department_id, system_id in sharings.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0037_auto_20220509_1257'),
+        ('kiosk', '0080_answerchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentPatient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_logged_in_at', models.DateTimeField(blank=True, null=True, verbose_name='Last Logged In At')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recent_patients', to='clinics.department', verbose_name='Department')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recent_patients', to='kiosk.patient', verbose_name='Patient')),
+            ],
+            options={
+                'verbose_name': 'Recent Patient',
+                'verbose_name_plural': 'Recent Patients',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recentpatient',
+            index=models.Index(fields=['department', '-last_logged_in_at', 'patient'], name='recent_patient_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recentpatient',
+            constraint=models.UniqueConstraint(fields=('department', 'patient'), name='unique_recent_patient'),
+        ),
+        migrations.RunPython(populate_recent_patients, migrations.RunPython.noop),
+    ]
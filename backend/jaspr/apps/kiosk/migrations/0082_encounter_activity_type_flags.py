@@ -0,0 +1,37 @@
+# Generated by Django 3.2.13 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+# The module field of each activity type and its `ActivityType.flag`.
+ACTIVITY_TYPE_FLAGS = (
+    ("stability_plan", 1 << 1),
+    ("suicide_assessment", 1 << 2),
+    ("comfort_and_skills", 1 << 3),
+    ("intro", 1 << 4),
+    ("outro", 1 << 5),
+    ("lethal_means", 1 << 6),
+)
+
+
+def populate_activity_type_flags(apps, schema_editor):
+    Encounter = apps.get_model("kiosk", "Encounter")
+    for field, flag in ACTIVITY_TYPE_FLAGS:
+        Encounter.objects.filter(
+            **{f"assignedactivity__{field}__isnull": False}
+        ).update(activity_type_flags=models.F("activity_type_flags").bitor(flag))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kiosk', '0081_recentpatient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='encounter',
+            name='activity_type_flags',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Activity Type Flags'),
+        ),
+        migrations.RunPython(populate_activity_type_flags, migrations.RunPython.noop),
+    ]
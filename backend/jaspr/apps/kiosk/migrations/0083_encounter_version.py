@@ -0,0 +1,24 @@
+# Generated by Django 3.2.13 on 2026-10-18 15:45
+
+from django.db import migrations, models
+import jaspr.apps.common.fields.encrypted_json_field
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kiosk', '0082_encounter_activity_type_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='encounter',
+            name='answer_versions',
+            field=jaspr.apps.common.fields.encrypted_json_field.EncryptedJSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='encounter',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Version'),
+        ),
+    ]
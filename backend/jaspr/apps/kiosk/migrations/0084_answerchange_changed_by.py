@@ -0,0 +1,21 @@
+# Generated by Django 3.2.13 on 2026-10-18 16:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('kiosk', '0083_encounter_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answerchange',
+            name='changed_by',
+            field=models.ForeignKey(blank=True, help_text='The user of the request that changed the answers, if any.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Changed By'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from .models import *
 from .assignment_locks import AssignmentLocks
 from .comfort_and_skills import ComfortAndSkills
 from .assigned_activity import AssignedActivity
+from .answer_change import AnswerChange
 from .crisis_stability_plan import CrisisStabilityPlan
 from .custom_onboarding_questions import CustomOnboardingQuestions
 from .encounter import Encounter
@@ -9,7 +10,9 @@ from .note_template import NoteTemplate
 from .outro import Outro
 from .patient_coping_strategy import PatientCopingStrategy
 from .patient_measurements import PatientMeasurements
+from .patient_search_token import PatientSearchToken
 from .provider_comment import ProviderComment
+from .recent_patient import RecentPatient
 from .srat import Srat
 from .comfort_and_skills import ComfortAndSkills
 from .lethal_means import LethalMeans
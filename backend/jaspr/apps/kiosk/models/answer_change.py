@@ -0,0 +1,55 @@
+import logging
+
+from django.db import models
+from model_utils import Choices
+
+from jaspr.apps.accounts.models import User
+from jaspr.apps.common.fields.encrypted_json_field import EncryptedJSONField
+from jaspr.apps.common.models import JasprAbstractBaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerChange(JasprAbstractBaseModel):
+    """
+    The answers changed by one save of an activity (see `IActivity.save_answer_changes`),
+    recorded instead of a full historical record of the activity. See
+    `jaspr.apps.kiosk.answer_history`.
+    """
+
+    STATUS = Choices(("active", "Active"))
+
+    assigned_activity = models.ForeignKey(
+        "kiosk.AssignedActivity",
+        on_delete=models.CASCADE,
+        related_name="answer_changes",
+        verbose_name="Assigned Activity",
+    )
+
+    changed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Changed By",
+        help_text="The user of the request that changed the answers, if any.",
+    )
+
+    # Answer key -> new value, for only the answers that changed.
+    changes = EncryptedJSONField()
+
+    compacted = models.BooleanField(
+        "Compacted",
+        default=False,
+        help_text="Whether a historical record of the activity includes this change.",
+    )
+
+    class Meta:
+        verbose_name = "Answer Change"
+        verbose_name_plural = "Answer Changes"
+        indexes = [
+            models.Index(
+                fields=["compacted", "assigned_activity"], name="answer_change_compacted_idx"
+            )
+        ]
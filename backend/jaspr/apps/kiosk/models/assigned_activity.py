@@ -1,16 +1,32 @@
 import logging
 from datetime import datetime
 
+from django.apps import apps
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.functional import cached_property
 from model_utils import Choices
 
 from jaspr.apps.common.models import JasprAbstractBaseModel
 from jaspr.apps.kiosk.activities.activity_utils import IActivity, ActivityType, ActivityStatus
+from jaspr.apps.kiosk.activities.question_cache import CompiledQuestions
 from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
+# The module field of each `ActivityType`, in the order `AssignedActivity.type` checks
+# them.
+ACTIVITY_TYPE_FIELDS = (
+    ("suicide_assessment", ActivityType.SuicideAssessment),
+    ("stability_plan", ActivityType.StabilityPlan),
+    ("comfort_and_skills", ActivityType.ComfortAndSkills),
+    ("intro", ActivityType.Intro),
+    ("outro", ActivityType.Outro),
+    ("lethal_means", ActivityType.LethalMeans),
+)
+
 
 class AssignedActivity(JasprAbstractBaseModel, IActivity):
     STATUS = Choices(("active", "Active"), ("archived", "Archived"))
@@ -94,20 +110,21 @@ class AssignedActivity(JasprAbstractBaseModel, IActivity):
     def type(self) -> ActivityType:
         if not self.pk:
             return None
-        if self.suicide_assessment is not None:
-            return ActivityType.SuicideAssessment
-        if self.stability_plan is not None:
-            return ActivityType.StabilityPlan
-        if self.comfort_and_skills is not None:
-            return ActivityType.ComfortAndSkills
-        if self.intro is not None:
-            return ActivityType.Intro
-        if self.outro is not None:
-            return ActivityType.Outro
-        if self.lethal_means is not None:
-            return ActivityType.LethalMeans
+        activity_type = self.get_module_type()
+        if activity_type is not None:
+            return activity_type
         raise Exception("No active module set on AssignActivity. This is an invalid state.")
 
+    def get_module_type(self) -> Optional[ActivityType]:
+        """
+        The type of the module that's set, if any. Going by the ids, so the modules don't
+        need to be loaded.
+        """
+        for field, activity_type in ACTIVITY_TYPE_FIELDS:
+            if getattr(self, f"{field}_id") is not None:
+                return activity_type
+        return None
+
     def get_progress_bar_label(self) -> Optional[str]:
         return self.get_active_module().get_progress_bar_label()
 
@@ -123,6 +140,9 @@ class AssignedActivity(JasprAbstractBaseModel, IActivity):
     def unlock(self) -> None:
         return self.get_active_module().unlock()
 
+    def get_compiled_questions(self) -> CompiledQuestions:
+        return self.get_active_module().get_compiled_questions()
+
     def get_questions(self) -> List:
         return self.get_active_module().get_questions()
 
@@ -166,3 +186,43 @@ class AssignedActivity(JasprAbstractBaseModel, IActivity):
         verbose_name_plural = "Assigned Activities"
 
 
+def update_activity_type_flags(encounter_id: int) -> int:
+    """
+    Set the `activity_type_flags` of the `Encounter` again from its assigned activities.
+    Returns the flags.
+    """
+    flags = 0
+    for activity in AssignedActivity.objects.filter(encounter_id=encounter_id).only(
+        *(field for field, _ in ACTIVITY_TYPE_FIELDS)
+    ):
+        activity_type = activity.get_module_type()
+        if activity_type is not None:
+            flags |= activity_type.flag
+    Encounter = apps.get_model("kiosk", "Encounter")
+    Encounter.objects.filter(pk=encounter_id).update(activity_type_flags=flags)
+    return flags
+
+
+@receiver(post_save, sender=AssignedActivity)
+def assigned_activity_saved(sender, instance: AssignedActivity, created: bool, **kwargs) -> None:
+    if not created:
+        return
+    flag = getattr(instance.get_module_type(), "flag", 0)
+    Encounter = apps.get_model("kiosk", "Encounter")
+    # Assigning an activity also changes the interview, see `Encounter.version`.
+    Encounter.objects.filter(pk=instance.encounter_id).update(
+        activity_type_flags=F("activity_type_flags").bitor(flag),
+        version=F("version") + 1,
+    )
+    if AssignedActivity.encounter.is_cached(instance):
+        instance.encounter.activity_type_flags |= flag
+        instance.encounter.version += 1
+
+
+@receiver(post_delete, sender=AssignedActivity)
+def assigned_activity_deleted(sender, instance: AssignedActivity, **kwargs) -> None:
+    flags = update_activity_type_flags(instance.encounter_id)
+    Encounter = apps.get_model("kiosk", "Encounter")
+    Encounter.objects.filter(pk=instance.encounter_id).bump_version()
+    if AssignedActivity.encounter.is_cached(instance):
+        instance.encounter.activity_type_flags = flags
@@ -1,5 +1,8 @@
 import logging
+from django.apps import apps
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from model_utils import Choices
 from jaspr.apps.common.models import JasprAbstractBaseModel
 
@@ -24,3 +27,11 @@ class AssignmentLocks(JasprAbstractBaseModel):
         verbose_name = "Assessment Lock"
         verbose_name_plural = "Assessment Locks"
         ordering = ["-modified"]
+
+
+@receiver(post_save, sender=AssignmentLocks)
+@receiver(post_delete, sender=AssignmentLocks)
+def assignment_lock_changed(sender, instance: AssignmentLocks, **kwargs) -> None:
+    # Whether an activity is locked is part of the interview, see `Encounter.version`.
+    Encounter = apps.get_model("kiosk", "Encounter")
+    Encounter.objects.filter(assignedactivity=instance.activity_id).bump_version()
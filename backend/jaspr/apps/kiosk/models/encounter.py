@@ -1,22 +1,95 @@
 import logging
 import re
+from typing import Dict, Iterable, Optional
 
 from django.apps import apps
 from django.db import models
+from django.db.models import F, Prefetch
 from django.utils import timezone
-from django.utils.functional import cached_property
+from django.utils.http import parse_etags
 from fernet_fields import EncryptedCharField, EncryptedDateTimeField
 from model_utils import Choices
 from simple_history.models import HistoricalRecords
 
 
+from jaspr.apps.common.fields.encrypted_json_field import EncryptedJSONField
 from jaspr.apps.common.models import JasprAbstractBaseModel, RoutableModel
 from jaspr.apps.kiosk.activities.manager import ActivityManagerMixin
-from jaspr.apps.kiosk.activities.activity_utils import ActivityStatus
+from jaspr.apps.kiosk.activities.activity_utils import ActivityStatus, ActivityType
+from jaspr.apps.kiosk import heartbeats
 from jaspr.apps.kiosk.narrative_note import NarrativeNote
 
 logger = logging.getLogger(__name__)
 
+# The module (activity) of each `AssignedActivity`, see `get_active_module`.
+ACTIVITY_MODULE_FIELDS = (
+    "stability_plan",
+    "suicide_assessment",
+    "comfort_and_skills",
+    "intro",
+    "outro",
+    "lethal_means",
+)
+
+
+class EncounterQuerySet(models.QuerySet):
+    def with_state(self) -> "EncounterQuerySet":
+        """
+        Load everything the interview reads with each `Encounter` (its patient,
+        department, clinic and system, and its activities with their modules and
+        assignment locks), so reading it (E.g. `filter_activities`, `get_answers`,
+        `locked`, `is_only_cs`) doesn't query any further.
+
+        NOTE: `filter_activities` and `get_activity` depend on the activities being
+        ordered by "-created".
+        """
+        AssignedActivity = apps.get_model("kiosk", "AssignedActivity")
+        return self.select_related(
+            "patient", "department__clinic__system"
+        ).prefetch_related(
+            Prefetch(
+                "assignedactivity_set",
+                queryset=AssignedActivity.objects.order_by("-created")
+                .select_related(*ACTIVITY_MODULE_FIELDS)
+                .prefetch_related("assignmentlocks_set"),
+            )
+        )
+
+    def latest_for_patients(self, patients) -> Dict[int, "Encounter"]:
+        """
+        The latest `Encounter` of each of the `patients` (what `Patient.current_encounter`
+        is), by `Patient` id, in one query for all of them.
+        """
+        return {
+            encounter.patient_id: encounter
+            for encounter in self.filter(patient__in=patients)
+            .order_by("patient_id", "-created")
+            .distinct("patient_id")
+        }
+
+    def with_activity_type(self, activity_type: ActivityType) -> "EncounterQuerySet":
+        """The `Encounter`s with an activity of the `activity_type` assigned."""
+        alias = f"has_{activity_type}"
+        return self.alias(
+            **{alias: F("activity_type_flags").bitand(activity_type.flag)}
+        ).filter(**{f"{alias}__gt": 0})
+
+    def bump_version(self) -> int:
+        """Bump the `version` of the `Encounter`s (see `Encounter.version`)."""
+        return self.update(version=F("version") + 1)
+
+    def get_state(self, pk: int) -> "Encounter":
+        return self.with_state().get(pk=pk)
+
+    def hydrate(self, encounter: "Encounter") -> "Encounter":
+        """
+        Return `encounter` if its state (see `with_state`) is already loaded, otherwise
+        the `Encounter` loaded again with it.
+        """
+        if encounter.has_state:
+            return encounter
+        return self.get_state(encounter.pk)
+
 
 class Encounter(JasprAbstractBaseModel, ActivityManagerMixin):
 
@@ -90,26 +163,145 @@ class Encounter(JasprAbstractBaseModel, ActivityManagerMixin):
         help_text="Indicates that the provider assisted the patient directly in answering questions",
         verbose_name="Technician Operated"
     )
+    # The `ActivityType.flag` of each type of the assigned activities, maintained as
+    # `AssignedActivity`s are created and deleted (see `update_activity_type_flags`).
+    activity_type_flags = models.PositiveSmallIntegerField(
+        "Activity Type Flags", default=0, editable=False
+    )
+
+    # Bumped whenever what the interview endpoints return changes (answers are saved,
+    # activities assigned, locked or unlocked, or the section changes), see `etag`.
+    version = models.PositiveIntegerField("Version", default=0, editable=False)
+    # The `version` each answer last changed in, see `get_answers_since`.
+    answer_versions = EncryptedJSONField(blank=True, null=True, editable=False)
+
+    # Only written by their own updates (see `save`).
+    SEPARATELY_SAVED_FIELDS = ("activity_type_flags", "version", "answer_versions")
+
+    history = HistoricalRecords(
+        bases=[RoutableModel], excluded_fields=list(SEPARATELY_SAVED_FIELDS)
+    )
 
-    history = HistoricalRecords(bases=[RoutableModel])
+    objects = EncounterQuerySet.as_manager()
+
+    # The `last_heartbeat` loaded from the database, see `save`.
+    _loaded_last_heartbeat = None
 
     class Meta:
         verbose_name = "Encounter"
         verbose_name_plural = "Encounters"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_last_heartbeat = instance.__dict__.get("last_heartbeat")
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or "last_heartbeat" in fields:
+            self._loaded_last_heartbeat = self.last_heartbeat
+
+    @property
+    def has_state(self) -> bool:
+        """Whether the activities were loaded by `EncounterQuerySet.with_state`."""
+        return "assignedactivity_set" in getattr(self, "_prefetched_objects_cache", {})
+
+    def copy_state_from(self, instance) -> None:
+        """
+        Copy the fields and the loaded state (see `EncounterQuerySet.with_state`) of
+        `instance`, a more recently loaded copy of this encounter.
+        """
+        for field in self._meta.concrete_fields:
+            setattr(self, field.attname, getattr(instance, field.attname))
+        # The related objects already loaded here (E.g. the `patient` of the request) are
+        # kept, so there's still only one of each.
+        self._state.fields_cache = {**instance._state.fields_cache, **self._state.fields_cache}
+        self._loaded_last_heartbeat = instance._loaded_last_heartbeat
+        self._prefetched_objects_cache = dict(instance._prefetched_objects_cache)
+        for activity in self.assignedactivity_set.all():
+            activity.encounter = self
+            # Assignment locks are made by technicians at any time, so whether an
+            # activity is locked is read again (if at all) rather than copied.
+            activity._prefetched_objects_cache.pop("assignmentlocks_set", None)
+            activity.__dict__.pop("current_assignment_lock", None)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # `activity_type_flags` is only written as activities are assigned and
+            # `version` as it's bumped, so saving a copy of the encounter loaded before
+            # then doesn't undo it.
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SEPARATELY_SAVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if (
+            update_fields is None or "last_heartbeat" in update_fields
+        ) and self.last_heartbeat != self._loaded_last_heartbeat:
+            # The cached heartbeat takes precedence over the database (see
+            # `jaspr.apps.kiosk.heartbeats`), so it needs to reflect the change too.
+            heartbeats.set_heartbeat(self.pk, self.last_heartbeat)
+        self._loaded_last_heartbeat = self.last_heartbeat
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.pk}.{self.version}"'
+
+    def matches_etag(self, etags: str) -> bool:
+        """Whether `etags` (E.g. an `If-None-Match` header) has the current `etag`."""
+        etags = parse_etags(etags)
+        return "*" in etags or self.etag in (etag.replace("W/", "", 1) for etag in etags)
+
+    def parse_etag_version(self, etag: str) -> Optional[int]:
+        """The `version` of an `etag` of this encounter, `None` if it's another's."""
+        pk, _, version = etag.replace("W/", "", 1).strip('"').partition(".")
+        if pk != str(self.pk) or not version.isdigit():
+            return None
+        return int(version)
+
+    def bump_version(self, answer_keys: Iterable[str] = ()) -> None:
+        """
+        Bump `version`, recording it as the version of the answers with `answer_keys`
+        that changed.
+
+        NOTE: Unless the encounter is locked (see `save_answers`), the `version` here
+        can be behind the database, so `answer_keys` can only be given when it is.
+        """
+        self.version += 1
+        updates = {"version": F("version") + 1}
+        answer_keys = list(answer_keys)
+        if answer_keys:
+            self.answer_versions = {
+                **(self.answer_versions or {}),
+                **dict.fromkeys(answer_keys, self.version),
+            }
+            updates["answer_versions"] = self.answer_versions
+        type(self).objects.filter(pk=self.pk).update(**updates)
+
+    def get_answers_since(self, version: int) -> dict:
+        """`get_answers`, with only the answers that changed after `version`."""
+        answers = self.get_answers()
+        answer_versions = self.answer_versions or {}
+        answers["answers"] = {
+            key: value
+            for key, value in answers["answers"].items()
+            if answer_versions.get(key, 0) > version
+        }
+        return answers
+
     def create_patient_measurement(self, **kwargs):
         PatientMeasurements = apps.get_model("kiosk", "PatientMeasurements")
         PatientMeasurements.objects.create(encounter=self, **kwargs)
 
-    @cached_property
+    @property
     def section_uid_ordered_list(self):
-        return list(self.sections_dictionary)
+        return list(self.section_index.section_uids)
 
     def get_safe_index(self, section_uid: str) -> int:
-        try:
-            return self.section_uid_ordered_list.index(section_uid)
-        except ValueError:
-            return -1
+        return self.section_index.get_position(section_uid)
 
     def reset_lockout(self):
         """Reset encounter lockouts so a patient can resume their session"""
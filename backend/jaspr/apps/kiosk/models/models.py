@@ -15,7 +15,7 @@ from django.core.validators import (
     ValidationError,
 )
 from django.db import models, transaction
-from django.db.models import OuterRef, Prefetch, Q, Subquery
+from django.db.models import Q
 
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -35,6 +35,7 @@ from jaspr.apps.common.constraints import EnhancedUniqueConstraint
 from jaspr.apps.common.models import JasprAbstractBaseModel, RoutableModel
 
 from .patient_department_sharing import PatientDepartmentSharing
+from .patient_search_token import PatientSearchToken
 from ...awsmedia.models import Media, PrivacyScreenImage
 from ..constants import ActionNames
 from ..validators import (
@@ -352,6 +353,12 @@ class Patient(JasprAbstractBaseModel):
 
     history = HistoricalRecords(bases=[RoutableModel])
 
+    # The fields indexed by `PatientSearchToken`.
+    SEARCH_FIELDS = ("mrn", "ssid", "first_name", "last_name", "date_of_birth")
+
+    # The `SEARCH_FIELDS` loaded from the database, see `save`.
+    _loaded_search_values = None
+
     class Meta:
         # NOTE/TODO: EBPI-866 added some constraints for new `Patient` creation that
         # are in `clean` and should be in associated API endpoint(s). If/once they're
@@ -367,6 +374,34 @@ class Patient(JasprAbstractBaseModel):
                 f"{self.__class__.__name__}(pk={self.pk}, mrn={self.mrn})"
             )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_search_values = instance.get_search_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._loaded_search_values = self.get_search_values()
+
+    def get_search_values(self) -> dict:
+        # From `__dict__`, so deferred fields aren't loaded.
+        return {field: self.__dict__.get(field) for field in self.SEARCH_FIELDS}
+
+    def search_values_changed(self, update_fields=None) -> bool:
+        """
+        Whether any of the `SEARCH_FIELDS` being saved (all of them, without
+        `update_fields`) changed since they were loaded.
+        """
+        if self._loaded_search_values is None:
+            return True
+        search_values = self.get_search_values()
+        return any(
+            search_values[field] != self._loaded_search_values[field]
+            for field in self.SEARCH_FIELDS
+            if update_fields is None or field in update_fields
+        )
+
     def clean(self) -> None:
         self.validate_required_fields_together(
             ssid=self.ssid,
@@ -393,9 +428,15 @@ class Patient(JasprAbstractBaseModel):
                 )[:3]
                 self.current_privacy_screen_images.add(*images)
 
+            # Not rebuilt for saves that don't change what's searched (E.g. status
+            # updates).
+            if creating or self.search_values_changed(kwargs.get("update_fields")):
+                PatientSearchToken.update_for_patient(self)
+                self._loaded_search_values = self.get_search_values()
+
     @property
     def departments(self):
-        result = [pds.department.pk for pds in self.patientdepartmentsharing_set.all() if pds.status == 'active']
+        result = [pds.department_id for pds in self.patientdepartmentsharing_set.all() if pds.status == 'active']
         #result = PatientDepartmentSharing.objects.filter(patient=self, status="active").values_list("department", flat=True)
         return result
 
@@ -408,38 +449,36 @@ class Patient(JasprAbstractBaseModel):
         return self.ssid or ""
 
     @classmethod
-    def get_related_query(cls, query):
-        Encounter = apps.get_model('kiosk.Encounter')
-        return query.prefetch_related(
-            Prefetch(
-                "encounter_set",
-                queryset=Encounter.objects.filter(id__in=Subquery(
-                    Encounter.objects.filter(
-                        patient_id=OuterRef('patient_id')
-                    ).values_list('id', flat=True)[:1]
-                )),
-                to_attr='latest_encounter'
-            )
-        )
+    def load_current_encounters(cls, patients: List[Patient]) -> None:
+        """
+        Set the `current_encounter` of each of the `patients` (without its state, see
+        `EncounterQuerySet.with_state`) in one query for all of them, instead of loading
+        it for each `Patient` when it's read.
+        """
+        Encounter = apps.get_model("kiosk.Encounter")
+        patients = [
+            patient for patient in patients if "current_encounter" not in patient.__dict__
+        ]
+        if not patients:
+            return
+        encounters = Encounter.objects.latest_for_patients(patients)
+        for patient in patients:
+            encounter = encounters.get(patient.pk)
+            if encounter is not None:
+                encounter.patient = patient
+            patient.current_encounter = encounter
 
     @cached_property
     def current_encounter(self):
         Encounter = apps.get_model("kiosk.Encounter")
-        AssignedActivity = apps.get_model('kiosk.AssignedActivity')
 
         try:
             encounter = (
-                Encounter.objects.select_related('department', 'department__clinic',
-                                                 'department__clinic__system').prefetch_related(Prefetch(
-                    "assignedactivity_set",
-                    queryset=AssignedActivity.objects.order_by("-created").select_related(
-                        'stability_plan', 'suicide_assessment', 'comfort_and_skills', 'intro', 'outro', 'lethal_means'
-                    ).all()
-                )).filter(patient=self).order_by("-created")[:1].get()
+                Encounter.objects.with_state().filter(patient=self).order_by("-created")[:1].get()
             )
-            return encounter
         except Encounter.DoesNotExist:
             return None
+        return encounter
 
 
     def get_current_department(self) -> Department:
@@ -1,6 +1,12 @@
 import logging
+import threading
+import uuid
+from collections import OrderedDict
 from django import template
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.template import Context
 from model_utils import Choices
 from simple_history.models import HistoricalRecords
@@ -8,6 +14,75 @@ from jaspr.apps.common.models import JasprAbstractBaseModel, RoutableModel
 
 logger = logging.getLogger(__name__)
 
+# The most compiled templates kept in each process (see `CompiledTemplateRegistry`).
+COMPILED_TEMPLATE_CACHE_SIZE = 32
+
+# Which `NoteTemplate` each `Department` uses is cached (see
+# `NoteTemplate.for_department`) under a version, which is replaced whenever a
+# `NoteTemplate` or anything that decides which one a `Department` uses changes.
+TEMPLATE_RESOLUTION_VERSION_CACHE_KEY = "note-template-resolution-version"
+TEMPLATE_RESOLUTION_CACHE_TIMEOUT = 60 * 60
+
+# Preferences field -> name of the `NoteTemplate` used when it isn't set.
+DEFAULT_TEMPLATE_NAMES = {
+    "narrative_note_template": "Default Narrative Note",
+    "stability_plan_template": "Default Stability Plan",
+}
+
+
+class CompiledTemplateRegistry:
+    """
+    An in process LRU cache of compiled (parsed) `NoteTemplate`s, keyed by the primary
+    key and `modified` of the `NoteTemplate`, so a template is only compiled again
+    after it changes. `hits` and `misses` count lookups.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, note_template: "NoteTemplate") -> template.Template:
+        key = (note_template.pk, note_template.modified)
+        with self._lock:
+            source, compiled = self._templates.get(key, (None, None))
+            # The source is compared as well, in case the `NoteTemplate` was changed
+            # but not saved (yet).
+            if compiled is not None and source == note_template.template:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = template.Template(note_template.template)
+        with self._lock:
+            self._templates[key] = (note_template.template, compiled)
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+compiled_templates = CompiledTemplateRegistry(COMPILED_TEMPLATE_CACHE_SIZE)
+
+
+def get_template_resolution_version() -> str:
+    return cache.get_or_set(
+        TEMPLATE_RESOLUTION_VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None
+    )
+
+
+def invalidate_template_resolution() -> None:
+    cache.set(TEMPLATE_RESOLUTION_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
 
 class NoteTemplate(JasprAbstractBaseModel):
 
@@ -26,13 +101,42 @@ class NoteTemplate(JasprAbstractBaseModel):
         verbose_name = "Note Template"
         verbose_name_plural = "Note Templates"
 
+    @classmethod
+    def for_department(cls, department, template_field: str) -> "NoteTemplate":
+        """
+        Return the `NoteTemplate` set as `template_field` (E.g.
+        "narrative_note_template") in the preferences of `department` (see
+        `Department.get_preferences`), or the default one if it isn't set.
+        """
+        cache_key = (
+            f"note-template:{get_template_resolution_version()}:{template_field}:"
+            f"{department.pk}"
+        )
+        note_template = cache.get(cache_key)
+        if note_template is None:
+            preferences = department.get_preferences()
+            note_template = getattr(preferences, template_field, None)
+            if note_template is None:
+                note_template = cls.objects.get(name=DEFAULT_TEMPLATE_NAMES[template_field])
+            cache.set(cache_key, note_template, TEMPLATE_RESOLUTION_CACHE_TIMEOUT)
+        return note_template
+
     def render(self, context={}) -> str:
         context = Context(context)
         try:
-            rendered_template = template.Template(self.template).render(context)
+            rendered_template = compiled_templates.get(self).render(context)
         except Exception as e:
             logger.exception(f"Unable to render template {self.pk}")
             raise e
 
         return rendered_template
 
+
+@receiver([post_save, post_delete], sender=NoteTemplate)
+@receiver([post_save, post_delete], sender="clinics.GlobalPreferences")
+@receiver([post_save, post_delete], sender="clinics.Preferences")
+@receiver([post_save, post_delete], sender="clinics.HealthcareSystem")
+@receiver([post_save, post_delete], sender="clinics.Clinic")
+@receiver([post_save, post_delete], sender="clinics.Department")
+def note_template_resolution_changed(sender, **kwargs) -> None:
+    invalidate_template_resolution()
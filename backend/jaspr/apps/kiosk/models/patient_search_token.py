@@ -0,0 +1,230 @@
+import hashlib
+import hmac
+import math
+from datetime import date
+from typing import Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Case, IntegerField, Sum, Value, When
+from django.utils.encoding import force_bytes
+from model_utils import Choices
+
+from jaspr.apps.common.constraints import EnhancedUniqueConstraint
+
+TRIGRAM_LENGTH = 3
+# Share of the search term's trigrams a field needs to contain for its `Patient` to be
+# a candidate. Candidates are then checked with the same fuzzy matching as before the
+# index existed, so this only needs to narrow things down to a bounded set.
+CANDIDATE_TRIGRAM_RATIO = 2 / 3
+
+
+def get_search_index_key() -> bytes:
+    return force_bytes(settings.PATIENT_SEARCH_INDEX_KEY or settings.SECRET_KEY)
+
+
+def normalize_search_value(value: str) -> str:
+    return " ".join(str(value).casefold().split())
+
+
+def make_search_token(field: str, value: str) -> str:
+    """
+    Keyed hash (HMAC) of `value` for `field`, so the tokens can be stored and searched
+    on without storing anything that can be reversed to the (encrypted) value.
+    """
+    return hmac.new(
+        get_search_index_key(),
+        force_bytes(f"{field}:{value}"),
+        hashlib.sha256,
+    ).hexdigest()[:32]
+
+
+def make_value_token(field: str, value: str) -> str:
+    return make_search_token(f"{field}:value", value)
+
+
+def make_prefix_token(field: str, value: str) -> str:
+    return make_search_token(f"{field}:prefix", value)
+
+
+def get_trigrams(value: str) -> Set[str]:
+    return {value[i : i + TRIGRAM_LENGTH] for i in range(len(value) - TRIGRAM_LENGTH + 1)}
+
+
+def build_patient_search_tokens(
+    mrn: Optional[str],
+    ssid: Optional[str],
+    first_name: Optional[str],
+    last_name: Optional[str],
+    date_of_birth: Optional[date],
+) -> List[Tuple[str, str]]:
+    """Return the `(field, token)` pairs to index for a `Patient` with these values."""
+    tokens = []
+    for field, value in (
+        (PatientSearchToken.FIELD.mrn, mrn),
+        (PatientSearchToken.FIELD.ssid, ssid),
+        (PatientSearchToken.FIELD.first_name, first_name),
+        (PatientSearchToken.FIELD.last_name, last_name),
+    ):
+        if not value:
+            continue
+        normalized = normalize_search_value(value)
+        tokens.append((field, make_value_token(field, normalized)))
+        # Search terms shorter than a trigram are matched against value prefixes.
+        for length in range(1, min(len(normalized), TRIGRAM_LENGTH - 1) + 1):
+            tokens.append((field, make_prefix_token(field, normalized[:length])))
+        for trigram in get_trigrams(normalized):
+            tokens.append((field, make_search_token(field, trigram)))
+    if date_of_birth is not None:
+        tokens.append(
+            (
+                PatientSearchToken.FIELD.date_of_birth,
+                make_search_token(
+                    PatientSearchToken.FIELD.date_of_birth, date_of_birth.isoformat()
+                ),
+            )
+        )
+        tokens.append(
+            (
+                PatientSearchToken.FIELD.birth_month_day,
+                make_search_token(
+                    PatientSearchToken.FIELD.birth_month_day,
+                    f"{date_of_birth.month:02}-{date_of_birth.day:02}",
+                ),
+            )
+        )
+    return tokens
+
+
+class PatientSearchTokenQuerySet(models.QuerySet):
+    def patient_ids_with_date_of_birth(self, date_of_birth: date) -> models.QuerySet:
+        return self.filter(
+            field=PatientSearchToken.FIELD.date_of_birth,
+            token=make_search_token(
+                PatientSearchToken.FIELD.date_of_birth, date_of_birth.isoformat()
+            ),
+        ).values("patient_id")
+
+    def patient_ids_with_birth_month_and_day(self, month: int, day: int) -> models.QuerySet:
+        return self.filter(
+            field=PatientSearchToken.FIELD.birth_month_day,
+            token=make_search_token(
+                PatientSearchToken.FIELD.birth_month_day, f"{month:02}-{day:02}"
+            ),
+        ).values("patient_id")
+
+    def candidate_patient_ids(
+        self, query: str, fields: Iterable[str] = None
+    ) -> models.QuerySet:
+        """
+        Ids of patients with a field that could fuzzy match `query`.
+
+        A field is a candidate if it contains enough of the query's trigrams, is
+        exactly the query or one of its words (E.g. searching a full name), or for
+        queries shorter than a trigram, starts with the query.
+        """
+        fields = list(fields or PatientSearchToken.TEXT_FIELDS)
+        normalized = normalize_search_value(query)
+        trigrams = get_trigrams(normalized)
+        required = max(1, math.ceil(len(trigrams) * CANDIDATE_TRIGRAM_RATIO))
+
+        exact_tokens = []
+        for field in fields:
+            for value in {normalized, *normalized.split()}:
+                exact_tokens.append(make_value_token(field, value))
+            if len(normalized) < TRIGRAM_LENGTH:
+                exact_tokens.append(make_prefix_token(field, normalized))
+        trigram_tokens = [
+            make_search_token(field, trigram) for field in fields for trigram in trigrams
+        ]
+
+        # NOTE: Tokens are unique per patient and field, so counting them is the
+        # same as counting distinct trigrams. Exact tokens count as enough by
+        # themselves.
+        return (
+            self.filter(field__in=fields, token__in=exact_tokens + trigram_tokens)
+            .values("patient_id", "field")
+            .annotate(
+                score=Sum(
+                    Case(
+                        When(token__in=exact_tokens, then=Value(required)),
+                        default=Value(1),
+                        output_field=IntegerField(),
+                    )
+                )
+            )
+            .filter(score__gte=required)
+            .values("patient_id")
+        )
+
+
+class PatientSearchToken(models.Model):
+    """
+    Blind index for searching `Patient`s on their encrypted fields.
+
+    Stores keyed hashes of the normalized MRN, SSID, names (whole values and trigrams)
+    and date of birth components, maintained in `Patient.save`. Searches look up the
+    hashes of the search term in SQL instead of decrypting every `Patient`.
+
+    NOTE: If `PATIENT_SEARCH_INDEX_KEY` (or `SECRET_KEY` if that isn't set) changes,
+    run `python manage.py rebuild_patient_search_index`.
+    """
+
+    FIELD = Choices(
+        ("mrn", "MRN"),
+        ("ssid", "SSID"),
+        ("first_name", "First Name"),
+        ("last_name", "Last Name"),
+        ("date_of_birth", "Date of Birth"),
+        ("birth_month_day", "Birth Month and Day"),
+    )
+    TEXT_FIELDS = (FIELD.mrn, FIELD.ssid, FIELD.first_name, FIELD.last_name)
+
+    patient = models.ForeignKey(
+        "kiosk.Patient",
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+        verbose_name="Patient",
+    )
+    field = models.CharField("Field", max_length=31, choices=FIELD)
+    token = models.CharField("Token", max_length=32)
+
+    objects = PatientSearchTokenQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Patient Search Token"
+        verbose_name_plural = "Patient Search Tokens"
+        constraints = [
+            EnhancedUniqueConstraint(
+                fields=["patient", "field", "token"],
+                name="unique_patient_search_token",
+                description="A `Patient` should only have each search token once.",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["token", "field", "patient"], name="patient_search_token_idx"),
+        ]
+
+    @classmethod
+    def update_for_patient(cls, patient) -> None:
+        tokens = set(
+            build_patient_search_tokens(
+                mrn=patient.mrn,
+                ssid=patient.ssid,
+                first_name=patient.first_name,
+                last_name=patient.last_name,
+                date_of_birth=patient.date_of_birth,
+            )
+        )
+        existing = set(
+            cls.objects.filter(patient=patient).values_list("field", "token")
+        )
+        stale = existing - tokens
+        if stale:
+            stale_query = models.Q()
+            for field, token in stale:
+                stale_query |= models.Q(field=field, token=token)
+            cls.objects.filter(stale_query, patient=patient).delete()
+        cls.objects.bulk_create(
+            [cls(patient=patient, field=field, token=token) for field, token in tokens - existing]
+        )
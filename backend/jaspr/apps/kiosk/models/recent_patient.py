@@ -0,0 +1,168 @@
+from typing import Optional
+
+from django.apps import apps
+from django.db import models
+from django.db.models import F, Q, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from jaspr.apps.common.constraints import EnhancedUniqueConstraint
+
+
+class RecentPatientQuerySet(models.QuerySet):
+    def for_departments(self, department_ids) -> "RecentPatientQuerySet":
+        """
+        The `RecentPatient`s of the departments, most recently activated first (with
+        the never activated ones before them, as the `Patient`s were listed before), from
+        an index scan of `recent_patient_idx`.
+        """
+        return self.filter(department__in=department_ids).order_by(
+            F("last_logged_in_at").desc(nulls_first=True), "patient_id"
+        )
+
+
+class RecentPatient(models.Model):
+    """
+    Projection of each `Patient` shared with a `Department` (through an active
+    `PatientDepartmentSharing`) and when they were last activated by a `Technician` of
+    the department's system (the latest `ActivateRecord`), so the recent `Patient`s of
+    a `Technician`'s departments are listed from an index instead of joining the
+    sharings and looking up the latest `ActivateRecord` of every `Patient`.
+
+    Maintained when `PatientDepartmentSharing`s are saved or deleted and
+    `ActivateRecord`s are created (see the receivers below). Can be rebuilt with
+    `python manage.py rebuild_recent_patients`.
+    """
+
+    department = models.ForeignKey(
+        "clinics.Department",
+        on_delete=models.CASCADE,
+        related_name="recent_patients",
+        verbose_name="Department",
+    )
+    patient = models.ForeignKey(
+        "kiosk.Patient",
+        on_delete=models.CASCADE,
+        related_name="recent_patients",
+        verbose_name="Patient",
+    )
+    last_logged_in_at = models.DateTimeField("Last Logged In At", null=True, blank=True)
+
+    objects = RecentPatientQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Recent Patient"
+        verbose_name_plural = "Recent Patients"
+        constraints = [
+            EnhancedUniqueConstraint(
+                fields=["department", "patient"],
+                name="unique_recent_patient",
+                description="A `Patient` should only be listed once for a `Department`.",
+            ),
+        ]
+        indexes = [
+            # Covers `RecentPatientQuerySet.for_departments`.
+            models.Index(
+                fields=["department", "-last_logged_in_at", "patient"],
+                name="recent_patient_idx",
+            ),
+        ]
+
+    @classmethod
+    def get_last_logged_in_at(cls, patient_id: int, department_id: int):
+        ActivateRecord = apps.get_model("kiosk", "ActivateRecord")
+        Department = apps.get_model("clinics", "Department")
+        return (
+            ActivateRecord.objects.filter(
+                patient_id=patient_id,
+                technician__system=Subquery(
+                    Department.objects.filter(pk=department_id).values("clinic__system")[:1]
+                ),
+            )
+            .order_by("-timestamp")
+            .values_list("timestamp", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def update_for_sharing(cls, patient_id: int, department_id: Optional[int]) -> None:
+        """
+        Add or remove the `RecentPatient` of the `Patient` and `Department`, depending
+        on whether the `Patient` is (still) actively shared with the `Department`.
+        """
+        if department_id is None:
+            return
+        PatientDepartmentSharing = apps.get_model("kiosk", "PatientDepartmentSharing")
+        is_shared = PatientDepartmentSharing.objects.filter(
+            patient_id=patient_id,
+            department_id=department_id,
+            status=PatientDepartmentSharing.STATUS.active,
+        ).exists()
+        if not is_shared:
+            cls.objects.filter(patient_id=patient_id, department_id=department_id).delete()
+            return
+        if not cls.objects.filter(patient_id=patient_id, department_id=department_id).exists():
+            cls.objects.bulk_create(
+                [
+                    cls(
+                        patient_id=patient_id,
+                        department_id=department_id,
+                        last_logged_in_at=cls.get_last_logged_in_at(
+                            patient_id, department_id
+                        ),
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def record_activation(cls, activate_record) -> None:
+        """
+        Update when the `Patient` was last activated in the departments of the
+        `Technician`'s system.
+        """
+        Technician = apps.get_model("kiosk", "Technician")
+        cls.objects.filter(
+            Q(last_logged_in_at__isnull=True)
+            | Q(last_logged_in_at__lt=activate_record.timestamp),
+            patient_id=activate_record.patient_id,
+            department__clinic__system=Subquery(
+                Technician.objects.filter(pk=activate_record.technician_id).values(
+                    "system"
+                )[:1]
+            ),
+        ).update(last_logged_in_at=activate_record.timestamp)
+
+    @classmethod
+    def rebuild_for_patient(cls, patient) -> None:
+        PatientDepartmentSharing = apps.get_model("kiosk", "PatientDepartmentSharing")
+        department_ids = set(
+            PatientDepartmentSharing.objects.filter(
+                patient=patient,
+                status=PatientDepartmentSharing.STATUS.active,
+                department__isnull=False,
+            ).values_list("department_id", flat=True)
+        )
+        cls.objects.filter(patient=patient).delete()
+        cls.objects.bulk_create(
+            [
+                cls(
+                    patient=patient,
+                    department_id=department_id,
+                    last_logged_in_at=cls.get_last_logged_in_at(patient.pk, department_id),
+                )
+                for department_id in department_ids
+            ]
+        )
+
+
+@receiver(post_save, sender="kiosk.PatientDepartmentSharing")
+@receiver(post_delete, sender="kiosk.PatientDepartmentSharing")
+def patient_department_sharing_changed(sender, instance, **kwargs) -> None:
+    RecentPatient.update_for_sharing(instance.patient_id, instance.department_id)
+
+
+@receiver(post_save, sender="kiosk.ActivateRecord")
+def activate_record_saved(sender, instance, created: bool, **kwargs) -> None:
+    if created:
+        RecentPatient.record_activation(instance)
@@ -6,12 +6,12 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 from datetime import datetime
 import requests
 from django.apps import apps
-from django.db.models import Prefetch
 from django.conf import settings
 from django.utils import timezone
 
 from jaspr.apps.epic.models import NotesLog
 from jaspr.apps.kiosk.activities.activity_utils import ActivityType, ActivityStatus
+from jaspr.apps.kiosk.activities.question_cache import ReadOnlyDict
 
 logger = logging.getLogger(__name__)
 
@@ -38,24 +38,23 @@ class NarrativeNote:
 
     def __init__(self, encounter, admin=False) -> None:
         Encounter = apps.get_model('kiosk', 'Encounter')
-        AssignedActivity = apps.get_model('kiosk', 'AssignedActivity')
-        self.encounter = Encounter.objects.select_related('patient', 'department').prefetch_related(Prefetch(
-            "assignedactivity_set",
-            queryset=AssignedActivity.objects.order_by("-created").select_related(
-                'stability_plan', 'suicide_assessment', 'comfort_and_skills', 'intro', 'outro', 'lethal_means'
-            )
-        )).get(pk=encounter.pk)
+        self.encounter = Encounter.objects.hydrate(encounter)
 
-        self.answers = encounter.get_answers()
+        # Merging the answers of every active activity is expensive, so it is done once
+        # here and every helper below reads from this (read-only) snapshot.
+        answers_and_meta = self.encounter.get_answers()
+        self.answers = ReadOnlyDict({
+            "answers": ReadOnlyDict(answers_and_meta["answers"]),
+            "metadata": ReadOnlyDict(answers_and_meta["metadata"]),
+        })
+        # What `display` looks values up in: the answers with the metadata on top.
+        self.display_answers = ReadOnlyDict({**answers_and_meta["answers"], **answers_and_meta["metadata"]})
         self.admin = True
 
     def display(self, prop: str, no_entry: Optional[str] = NO_ENTRY_SYMBOL) -> str:
-        answers_and_meta = self.encounter.get_answers()
-        answers = answers_and_meta["answers"]
-        answers.update(answers_and_meta["metadata"])
-        value = answers.get(prop)
+        value = self.display_answers.get(prop)
         if value or value == 0:
-            return answers.get(prop)
+            return value
         return no_entry
 
     def quote_no_entry(self, prop: str) -> str:
@@ -495,11 +494,8 @@ class NarrativeNote:
                 return f"{e.__repr__()}\n\n{traceback.format_exc()}"
             return "There has been an error while creating the Patient Stability Plan note. Please contact JasprHealth for assistance."
         else:
-            preferences = self.encounter.department.get_preferences()
-            template = preferences.stability_plan_template
-            if not template:
-                NoteTemplate = apps.get_model('kiosk.NoteTemplate')
-                template = NoteTemplate.objects.get(name="Default Stability Plan")
+            NoteTemplate = apps.get_model('kiosk.NoteTemplate')
+            template = NoteTemplate.for_department(self.encounter.department, "stability_plan_template")
             note = self.sanitize(template.render(context=context))
 
             return note
@@ -526,11 +522,8 @@ class NarrativeNote:
                 return "There has been an error while creating note. Please contact JasprHealth for assistance."
 
             else:
-                preferences = self.encounter.department.get_preferences()
-                template = preferences.narrative_note_template
-                if not template:
-                    NoteTemplate = apps.get_model('kiosk.NoteTemplate')
-                    template = NoteTemplate.objects.get(name="Default Narrative Note")
+                NoteTemplate = apps.get_model('kiosk.NoteTemplate')
+                template = NoteTemplate.for_department(self.encounter.department, "narrative_note_template")
 
                 note = self.sanitize(template.render(context=context))
 
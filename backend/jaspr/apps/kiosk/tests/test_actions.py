@@ -4,11 +4,12 @@ import unittest
 from datetime import timedelta
 from inspect import getmembers
 
+from django.test import override_settings
 from django.utils import timezone
 from django_rq import get_worker
 
 from jaspr.apps.kiosk.constants import ActionNames
-from jaspr.apps.kiosk.jobs import queue_action_creation
+from jaspr.apps.kiosk.jobs import queue_action_creation, queue_actions_creation
 from jaspr.apps.kiosk.models import Action
 from jaspr.apps.test_infrastructure.testcases import JasprRedisTestCase
 from jaspr.apps.kiosk.activities.activity_utils import ActivityType
@@ -60,8 +61,8 @@ class TestActions(JasprRedisTestCase):
     )
     def test_action_created_from_job(self):
         """
-        Explicitly allow the redis job to be queued and run separately
-        in this test. Also checks that the timestamp has a default
+        Explicitly allow the redis job draining the buffered actions to be queued and
+        run separately in this test. Also checks that the timestamp has a default
         set correctly on queueing vs. on running.
         """
         self.system, self.clinic, self.department = self.create_full_healthcare_system()
@@ -72,7 +73,7 @@ class TestActions(JasprRedisTestCase):
         )
         encounter.add_activities([ActivityType.StabilityPlan, ActivityType.SuicideAssessment])
         client_time = timezone.now()
-        with self.patch_delay_of("jaspr.apps.kiosk.jobs.create_action"):
+        with self.patch_delay_of("jaspr.apps.kiosk.jobs.drain_action_buffer"):
             queue_action_creation(
                 {
                     "patient": patient,
@@ -103,6 +104,61 @@ class TestActions(JasprRedisTestCase):
         # In this case the client server timestamp should be greater than the client timestamp.
         self.assertGreater(action.timestamp, action.client_timestamp)
 
+    @override_settings(ACTION_BUFFER_BATCH_SIZE=3, ACTION_BUFFER_MAX_LATENCY_SECONDS=60)
+    def test_actions_created_in_batches(self):
+        """
+        Are buffered actions only written once the buffer holds a batch, or the oldest
+        one has been buffered for too long?
+        """
+        patient = self.create_patient()
+        action_data = {"patient": patient, "in_er": False, "action": ActionNames.EXPLORE}
+
+        with self.assertNumQueries(0):
+            queue_actions_creation([{**action_data}, {**action_data}])
+        self.assertFalse(Action.objects.exists())
+        # One `bulk_create`, and its savepoint.
+        with self.assertNumQueries(3):
+            queue_action_creation({**action_data})
+        self.assertEqual(Action.objects.count(), 3)
+
+        queue_action_creation({**action_data})
+        self.assertEqual(Action.objects.count(), 3)
+        with override_settings(ACTION_BUFFER_MAX_LATENCY_SECONDS=0):
+            queue_action_creation({**action_data})
+        self.assertEqual(Action.objects.count(), 5)
+
+    @override_settings(ACTION_BUFFER_BATCH_SIZE=10, ACTION_BUFFER_MAX_LATENCY_SECONDS=60)
+    def test_buffered_arrive_actions_update_section_uid(self):
+        """
+        Are buffered ARRIVE actions written right away, moving their encounter to the
+        furthest section arrived at, like creating them one at a time does?
+        """
+        self.system, self.clinic, self.department = self.create_full_healthcare_system()
+        patient = self.create_patient()
+        encounter = self.create_patient_encounter(
+            patient=patient, department=self.department
+        )
+        encounter.add_activities([ActivityType.StabilityPlan, ActivityType.SuicideAssessment])
+        section_uids = [*encounter.sections_dictionary]
+        action_data = {
+            "patient": patient,
+            "encounter": encounter,
+            "in_er": True,
+            "action": ActionNames.ARRIVE,
+        }
+
+        queue_action_creation({**action_data, "action": ActionNames.EXPLORE})
+        self.assertFalse(Action.objects.exists())
+        queue_actions_creation(
+            [
+                {**action_data, "section_uid": section_uids[2]},
+                {**action_data, "section_uid": section_uids[1]},
+            ]
+        )
+        self.assertEqual(Action.objects.count(), 3)
+        encounter.refresh_from_db()
+        self.assertEqual(encounter.current_section_uid, section_uids[2])
+
     def test_jah_action_naming_consistency(self):
         """
         Check that all the `ActionNames` that have a constant or value starting with
@@ -1,13 +1,16 @@
+import csv
+import io
 import operator
 import random
 import sys
+import zipfile
 import pytz
 from datetime import datetime, timedelta, date
 
 from django.utils import timezone
 
 from jaspr.apps.kiosk.models import Encounter
-from jaspr.apps.kiosk.analytics import AnalyticsExporter
+from jaspr.apps.kiosk.analytics import AnalyticsExporter, iterate_in_chunks
 from jaspr.apps.kiosk.constants import ActionNames
 from jaspr.apps.test_infrastructure.testcases import JasprTestCase
 from jaspr.apps.kiosk.activities.activity_utils import ActivityType
@@ -395,3 +398,130 @@ class TestAnalyticsData(JasprTestCase):
             )
         )
         assert expected_set == given_set
+
+    def test_visit_log_iterator_query_count(self):
+        for _ in range(3):
+            self.create_activate_record(
+                technician=self.first_technician,
+                patient=self.first_patient,
+                encounter=self.first_patient_encounter,
+                timestamp=self.next_incremented_time,
+            )
+        # The clinics, the departments and the (joined) records, regardless of the number
+        # of records.
+        with self.assertNumQueries(3):
+            data = [*self.exporter.visit_log_iterator]
+        self.assertEqual(len(data), 4)
+
+    def test_stream_csv(self):
+        self.create_action(patient=self.first_patient, encounter=self.first_patient_encounter)
+        self.create_action(patient=self.second_patient, encounter=self.second_patient_encounter)
+
+        lines = [*self.exporter.stream_csv("actions")]
+
+        rows = [*csv.reader(io.StringIO("".join(lines)))]
+        expected_rows = [
+            ["" if value is None else str(value) for value in row]
+            for row in self.exporter.action_log_iterator
+        ]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(rows, expected_rows)
+        with self.assertRaises(ValueError):
+            [*self.exporter.stream_csv("invalid")]
+
+    def test_write_zip(self):
+        self.create_action(patient=self.first_patient, encounter=self.first_patient_encounter)
+        self.create_patient_video(patient=self.first_patient)
+
+        file = io.BytesIO()
+        self.exporter.write_zip(file)
+
+        with zipfile.ZipFile(file) as archive:
+            self.assertEqual(
+                archive.namelist(),
+                [self.exporter.get_filename(data_name) for data_name in AnalyticsExporter.SHEETS],
+            )
+            for data_name in AnalyticsExporter.SHEETS:
+                with archive.open(self.exporter.get_filename(data_name)) as entry:
+                    rows = [*csv.reader(io.TextIOWrapper(entry, encoding="utf-8", newline=""))]
+                self.assertEqual(
+                    rows,
+                    [*csv.reader(io.StringIO("".join(self.exporter.stream_csv(data_name))))],
+                )
+            encounter_rows = [*csv.reader(io.TextIOWrapper(
+                archive.open(self.exporter.get_filename("encounters")), encoding="utf-8", newline=""
+            ))]
+        self.assertEqual(len(encounter_rows), 4)
+
+    def test_iterate_in_chunks(self):
+        encounters = Encounter.objects.filter(department__clinic=self.clinic).order_by("-pk")
+
+        self.assertEqual(
+            [encounter.pk for encounter in iterate_in_chunks(encounters, chunk_size=2)],
+            [*encounters.values_list("pk", flat=True)],
+        )
+
+    def test_assessment_and_encounters_iterators(self):
+        """
+        Are the `Encounter`s loaded with only the fields the sheets use, in the same
+        number of queries whatever the number of `Encounter`s, with the answers the
+        `Encounter`s have?
+        """
+        self.first_patient_encounter.save_answers(
+            {"suicidal_yes_no": True, "rate_psych": 2, "reasons_live": ["Family"]}
+        )
+        self.second_patient_encounter.save_answers({"suicidal_yes_no": False})
+        field_names = [*self.exporter.assessment_iterator][0][4:-6]
+
+        # The `Encounter`s' ids, the chunk of `Encounter`s (with their `Patient`s and
+        # `Department`s) and their activities.
+        with self.assertNumQueries(3) as assessment_queries:
+            assessment_rows = [*self.exporter.assessment_iterator][1:]
+        with self.assertNumQueries(3) as encounter_queries:
+            encounter_rows = [*self.exporter.encounters_iterator][1:]
+        for queries in [assessment_queries, encounter_queries]:
+            sql = " ".join(query["sql"] for query in queries.captured_queries)
+            self.assertNotIn('"kiosk_encounter"."encrypted_answer"', sql)
+            self.assertNotIn('"kiosk_patient"."first_name"', sql)
+            self.assertNotIn('"kiosk_crisisstabilityplan"."note_generated"', sql)
+
+        for encounter in [
+            self.first_patient_encounter,
+            self.second_patient_encounter,
+            self.third_patient_encounter,
+        ]:
+            encounter = Encounter.objects.get(pk=encounter.pk)
+            answers = {}
+            for activity_type in [
+                ActivityType.Intro,
+                ActivityType.SuicideAssessment,
+                ActivityType.StabilityPlan,
+                ActivityType.Outro,
+            ]:
+                answers.update(encounter.get_activity(activity_type).get_answers())
+            assessment_row = next(
+                row for row in assessment_rows if row[0] == encounter.patient.analytics_token
+            )
+            self.assertEqual(assessment_row[1], encounter.patient.mrn)
+            self.assertEqual(assessment_row[3], encounter.start_time)
+            self.assertEqual(
+                assessment_row[4:-6],
+                [answers.get(field_name, "") for field_name in field_names],
+            )
+            self.assertEqual(
+                assessment_row[-6:],
+                [*encounter.get_activity(ActivityType.SuicideAssessment).get_metadata().values()],
+            )
+
+            encounter_answers = encounter.get_answers()["answers"]
+            encounter_row = next(
+                row for row in encounter_rows if row[0] == encounter.patient.analytics_token
+            )
+            self.assertEqual(encounter_row[14], encounter_answers.get("readiness"))
+            self.assertEqual(encounter_row[-3:], [False, self.clinic.name, encounter.department.name])
+
+        first_row = next(
+            row for row in assessment_rows if row[0] == self.first_patient.analytics_token
+        )
+        self.assertIn(["Family"], first_row)
+        self.assertIn(True, first_row)
@@ -0,0 +1,79 @@
+from django.test import RequestFactory, override_settings
+from simple_history.models import HistoricalRecords
+
+from jaspr.apps.kiosk.activities.activity_utils import ActivityType
+from jaspr.apps.kiosk.answer_history import compact_answer_changes
+from jaspr.apps.kiosk.models import AnswerChange
+from jaspr.apps.test_infrastructure.testcases import JasprTestCase
+
+
+class TestAnswerHistory(JasprTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.encounter = self.create_patient_encounter()
+        self.encounter.add_activities([ActivityType.SuicideAssessment])
+        self.suicide_assessment = self.encounter.get_activity(ActivityType.SuicideAssessment)
+        self.encounter.save_answers({"suicidal_yes_no": True, "intent_yes_no": False})
+        self.history_count = self.suicide_assessment.history.count()
+
+    def test_only_changed_answers_recorded(self):
+        """
+        Does saving answers record only the changed answers, without a historical
+        record, and nothing at all when no answers changed?
+        """
+        self.encounter.save_answers({"suicidal_yes_no": True, "intent_yes_no": True})
+
+        self.assertEqual(AnswerChange.objects.last().changes, {"intent_yes_no": True})
+        self.assertEqual(AnswerChange.objects.count(), 2)
+        self.assertEqual(self.suicide_assessment.history.count(), self.history_count)
+        self.suicide_assessment.refresh_from_db()
+        self.assertEqual(
+            self.suicide_assessment.answers, {"suicidal_yes_no": True, "intent_yes_no": True}
+        )
+
+        modified = self.suicide_assessment.modified
+        self.encounter.save_answers({"suicidal_yes_no": True})
+        self.assertEqual(AnswerChange.objects.count(), 2)
+        self.suicide_assessment.refresh_from_db()
+        self.assertEqual(self.suicide_assessment.modified, modified)
+
+    def test_settled_answer_changes_compacted(self):
+        """
+        Are the settled answer changes of an activity compacted into one historical
+        record?
+        """
+        self.encounter.save_answers({"intent_yes_no": True})
+
+        with override_settings(ANSWER_HISTORY_COMPACTION_DELAY_SECONDS=60):
+            self.assertEqual(compact_answer_changes(), 0)
+        with override_settings(ANSWER_HISTORY_COMPACTION_DELAY_SECONDS=0):
+            self.assertEqual(compact_answer_changes(), 1)
+            self.assertEqual(compact_answer_changes(), 0)
+
+        self.assertFalse(AnswerChange.objects.filter(compacted=False).exists())
+        self.assertEqual(self.suicide_assessment.history.count(), self.history_count + 1)
+        history = self.suicide_assessment.history.first()
+        self.assertEqual(history.answers, {"suicidal_yes_no": True, "intent_yes_no": True})
+        self.suicide_assessment.refresh_from_db()
+        self.assertEqual(history.history_date, self.suicide_assessment.modified)
+
+    def test_compacted_history_attributed_to_request_user(self):
+        """
+        Is the user of the request that changed the answers recorded, and the
+        compacted historical record attributed to them?
+        """
+        user = self.encounter.patient.user
+        request = RequestFactory().get("/")
+        request.user = user
+        HistoricalRecords.context.request = request
+        try:
+            self.encounter.save_answers({"intent_yes_no": True})
+        finally:
+            del HistoricalRecords.context.request
+
+        self.assertEqual(AnswerChange.objects.last().changed_by, user)
+        self.assertIsNone(AnswerChange.objects.first().changed_by)
+        with override_settings(ANSWER_HISTORY_COMPACTION_DELAY_SECONDS=0):
+            self.assertEqual(compact_answer_changes(), 1)
+        self.assertEqual(self.suicide_assessment.history.first().history_user, user)
@@ -6,6 +6,7 @@ from django.utils import timezone
 from freezegun import freeze_time
 from knox.models import AuthToken
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 
 from jaspr.apps.accounts.models import User
@@ -14,9 +15,12 @@ from jaspr.apps.api.v1.views import (
     PatientResetPasswordCheckPhoneNumberCodeView,
 )
 from jaspr.apps.common.tests.mixins import UidAndTokenTestMixin
+from jaspr.apps.kiosk.auth_cache import get_cached_auth_token
 from jaspr.apps.kiosk.authentication import (
     JasprResetPasswordUidAndTokenAuthentication,
+    JasprTokenAuthentication,
     JasprToolsToGoUidAndTokenAuthentication,
+    logout_kiosk_user,
 )
 from jaspr.apps.kiosk.models import (
     Encounter,
@@ -212,6 +216,64 @@ class TestJasprTokenAuthentication(
                         session.refresh_from_db()
 
 
+class TestCachedTokenAuthentication(JasprApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = self.create_patient()
+        self.encounter = self.create_patient_encounter(patient=self.patient)
+        self.jaspr_session, self.token = JasprSession.create(
+            user=self.patient.user,
+            user_type="Patient",
+            in_er=True,
+            from_native=False,
+            long_lived=False,
+            encounter=self.encounter,
+        )
+
+    def test_cached_token_authenticated_without_queries(self):
+        """
+        Is a token authenticated again from the cache, with its `User` and
+        `JasprSession`, without any queries?
+        """
+        JasprTokenAuthentication().authenticate_credentials(self.token.encode())
+
+        with self.assertNumQueries(0):
+            user, auth_token = JasprTokenAuthentication().authenticate_credentials(
+                self.token.encode()
+            )
+            self.assertTrue(user.is_patient)
+            self.assertEqual(auth_token.jaspr_session, self.jaspr_session)
+            self.assertEqual(auth_token.jaspr_session.encounter_id, self.encounter.pk)
+        self.assertEqual(user, self.patient.user)
+        self.assertEqual(user.mobile_phone, self.patient.user.mobile_phone)
+
+    def test_cached_expiry_renewed(self):
+        """Is the expiry of a cached token renewed in the cache and the database?"""
+        authentication = JasprTokenAuthentication()
+        authentication.authenticate_credentials(self.token.encode())
+
+        renew_at = timezone.now() + timedelta(minutes=5)
+        with freeze_time(renew_at):
+            _, auth_token = authentication.authenticate_credentials(self.token.encode())
+        self.assertEqual(
+            get_cached_auth_token(auth_token.digest).expiry, auth_token.expiry
+        )
+        self.assertGreater(auth_token.expiry, renew_at)
+        self.jaspr_session.auth_token.refresh_from_db()
+        self.assertEqual(self.jaspr_session.auth_token.expiry, auth_token.expiry)
+
+    def test_logged_out_token_not_authenticated(self):
+        """Is a cached token no longer authenticated once it's logged out?"""
+        authentication = JasprTokenAuthentication()
+        _, auth_token = authentication.authenticate_credentials(self.token.encode())
+
+        logout_kiosk_user(auth_token)
+
+        self.assertIsNone(get_cached_auth_token(auth_token.digest))
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials(self.token.encode())
+
+
 class TestJasprUidAndTokenBase(
     UidAndTokenTestMixin, TwilioClientTestCaseMixin, JasprApiTestCase
 ):
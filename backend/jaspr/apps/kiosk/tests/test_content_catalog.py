@@ -0,0 +1,48 @@
+from jaspr.apps.api.v1.serializers import (
+    CommonConcernSerializer,
+    MediaSerializer,
+)
+from jaspr.apps.kiosk.content_catalog import get_content_catalog
+from jaspr.apps.test_infrastructure.testcases import JasprTestCase
+
+
+class TestContentCatalog(JasprTestCase):
+    def test_content_loaded_and_serialized_once(self):
+        """
+        Is the content loaded and serialized once, and then used without any queries?
+        """
+        media = self.create_media(name="Video One", tags="PLE")
+
+        catalog = get_content_catalog()
+        payload = catalog.get_payload(MediaSerializer, catalog.get(type(media), media.pk))
+        self.assertEqual(payload, MediaSerializer(media).data)
+
+        with self.assertNumQueries(0):
+            catalog = get_content_catalog()
+            self.assertEqual(catalog.media_by_tag["ple"], [media])
+            self.assertIs(
+                catalog.get_payload(MediaSerializer, catalog.get(type(media), media.pk)),
+                payload,
+            )
+
+    def test_content_changes_load_new_catalog(self):
+        """Does saving content load a new snapshot of the content?"""
+        common_concern = self.create_common_concern(title="Old Title")
+        catalog = get_content_catalog()
+        self.assertEqual(
+            catalog.get_payloads(CommonConcernSerializer, catalog.common_concerns)[0]["title"],
+            "Old Title",
+        )
+
+        common_concern.title = "New Title"
+        common_concern.save()
+
+        new_catalog = get_content_catalog()
+        self.assertIsNot(new_catalog, catalog)
+        self.assertEqual(
+            new_catalog.get_payloads(CommonConcernSerializer, new_catalog.common_concerns)[0][
+                "title"
+            ],
+            "New Title",
+        )
+        self.assertIs(get_content_catalog(), new_catalog)
@@ -7,7 +7,7 @@ from jaspr.apps.kiosk.activities.activity_utils import ActivityType, ActivitySta
 from jaspr.apps.kiosk.activities.question_json import generate_answers_from_questions, \
     generate_answers_from_question_list
 from jaspr.apps.kiosk.constants import ActionNames
-from jaspr.apps.kiosk.models import Encounter, Action, AssignmentLocks
+from jaspr.apps.kiosk.models import AssignedActivity, Encounter, Action, AssignmentLocks
 from jaspr.apps.test_infrastructure.testcases import JasprTestCase
 
 
@@ -406,3 +406,67 @@ class EncounterTestCase(JasprTestCase):
             self.assertEqual(time2, suicide_assessment.modified)
 
         self.assertEqual(time2, suicide_assessment.modified)
+
+    def test_encounter_state(self):
+        """
+        Does an encounter loaded with its state read its activities without any more
+        queries, including after saving answers?
+        """
+        self.encounter.add_activities([ActivityType.SuicideAssessment, ActivityType.StabilityPlan])
+        encounter = Encounter.objects.get_state(self.encounter.pk)
+        self.assertIs(Encounter.objects.hydrate(encounter), encounter)
+
+        with self.assertNumQueries(0):
+            encounter.get_answers()
+            for activity in encounter.filter_activities(active_only=True):
+                self.assertFalse(activity.locked)
+                self.assertFalse(activity.get_active_module().is_only_cs())
+
+        encounter.save_answers({"rate_psych": 2})
+        self.assertTrue(encounter.has_state)
+        with self.assertNumQueries(0):
+            self.assertEqual(encounter.get_answers()["answers"]["rate_psych"], 2)
+            for activity in encounter.assignedactivity_set.all():
+                self.assertIs(activity.encounter, encounter)
+
+    def test_activity_type_flags(self):
+        """
+        Are the assigned activity types kept in `activity_type_flags`, and read without
+        any queries?
+        """
+        encounter = self.create_patient_encounter(department=self.department)
+        encounter.add_activities([ActivityType.SuicideAssessment])
+
+        with self.assertNumQueries(0):
+            self.assertTrue(encounter.has_activity(ActivityType.SuicideAssessment))
+            self.assertTrue(encounter.has_activity(ActivityType.LethalMeans))
+            self.assertFalse(encounter.has_activity(ActivityType.StabilityPlan))
+        stale_encounter = Encounter.objects.get(pk=encounter.pk)
+        encounter.refresh_from_db()
+        self.assertLessEqual(
+            {ActivityType.SuicideAssessment, ActivityType.LethalMeans},
+            encounter.activity_types,
+        )
+        self.assertNotIn(ActivityType.StabilityPlan, encounter.activity_types)
+        self.assertQuerysetEqual(
+            Encounter.objects.with_activity_type(ActivityType.SuicideAssessment),
+            [encounter],
+            transform=lambda e: e,
+        )
+        self.assertFalse(
+            Encounter.objects.with_activity_type(ActivityType.StabilityPlan).exists()
+        )
+
+        encounter.add_activities([ActivityType.StabilityPlan])
+        # Saving an instance loaded before doesn't set the flags back.
+        stale_encounter.save()
+        encounter.refresh_from_db()
+        self.assertTrue(encounter.has_activity(ActivityType.StabilityPlan))
+
+        # `AssignedActivity.delete` is the `IActivity` stub, deleted as the module would be.
+        AssignedActivity.objects.filter(
+            encounter=encounter, stability_plan__isnull=False
+        ).delete()
+        encounter.refresh_from_db()
+        self.assertFalse(encounter.has_activity(ActivityType.StabilityPlan))
+        self.assertTrue(encounter.has_activity(ActivityType.SuicideAssessment))
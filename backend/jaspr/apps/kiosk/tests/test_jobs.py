@@ -1,5 +1,18 @@
-from jaspr.apps.kiosk.jobs import check_and_resend_tools_to_go_setup_email
-from jaspr.apps.kiosk.models import Patient
+import sys
+import unittest
+
+from django.core.cache import cache
+from django_rq import get_queue, get_worker
+
+from jaspr.apps.clinics.models import GlobalPreferences
+from jaspr.apps.epic.models import NotesLog
+from jaspr.apps.kiosk.activities.activity_utils import ActivityType
+from jaspr.apps.kiosk.jobs import (
+    check_and_resend_tools_to_go_setup_email,
+    get_note_generation_cache_key,
+    queue_note_generation,
+)
+from jaspr.apps.kiosk.models import NoteTemplate, Patient
 from jaspr.apps.message_logs.models import EmailLog
 from jaspr.apps.test_infrastructure.testcases import JasprRedisTestCase
 
@@ -44,3 +57,55 @@ class TestCheckAndResendToolsToGoSetupEmail(JasprRedisTestCase):
         self.assertEqual(
             EmailLog.objects.filter(user_id=self.patient.user_id).count(), 0
         )
+
+
+class TestQueueNoteGeneration(JasprRedisTestCase):
+    fixtures = ["jaspr/apps/bootstrap/fixtures/jaspr_content.json"]
+
+    def setUp(self):
+        super().setUp()
+
+        GlobalPreferences.objects.update_or_create(
+            pk="global_preferences",
+            stability_plan_template=NoteTemplate.objects.get(name="Default Stability Plan"),
+            narrative_note_template=NoteTemplate.objects.get(name="Default Narrative Note"),
+            timezone="America/New_York",
+        )
+        self.encounter = self.create_patient_encounter()
+        self.encounter.add_activities([ActivityType.StabilityPlan, ActivityType.SuicideAssessment])
+
+    @unittest.skipIf(
+        sys.platform == "win32",
+        "'win32' platform does not support `os.fork` required by `rqworker`.",
+    )
+    def test_note_generation_queued_once_until_run(self):
+        """
+        Is rendering a note queued once for triggers in quick succession?
+        """
+        with self.patch_delay_of("jaspr.apps.kiosk.jobs.generate_note"):
+            for note_type in (
+                NotesLog.NOTE_TYPES.stability_plan,
+                NotesLog.NOTE_TYPES.stability_plan,
+                NotesLog.NOTE_TYPES.narrative_note,
+            ):
+                queue_note_generation(self.encounter.pk, note_type, "Takeaway Edit")
+            self.assertEqual(get_queue("notes").count, 2)
+            self.assertEqual(get_queue().count, 0)
+            self.assertFalse(NotesLog.objects.exists())
+
+            get_worker("notes").work(burst=True)
+        self.assertEqual(
+            sorted(NotesLog.objects.values_list("note_type", flat=True)),
+            [NotesLog.NOTE_TYPES.narrative_note, NotesLog.NOTE_TYPES.stability_plan],
+        )
+
+    def test_note_generation_queued_again_after_run(self):
+        """
+        Is rendering a note queued again once the job runs, without saving a duplicate
+        note?
+        """
+        note_type = NotesLog.NOTE_TYPES.stability_plan
+        for _ in range(2):
+            queue_note_generation(self.encounter.pk, note_type, "Takeaway Edit")
+            self.assertIsNone(cache.get(get_note_generation_cache_key(self.encounter.pk, note_type)))
+        self.assertEqual(NotesLog.objects.filter(note_type=note_type).count(), 1)
@@ -41,3 +41,28 @@ class TestPatient(JasprTestCase):
         patient.user.email = "john.doe@example.com"
         patient.user.save()
         self.assertFalse(patient.has_internal_email())
+
+    def test_search_tokens_rebuilt_only_when_searched_fields_change(self):
+        """
+        Are the search tokens only rebuilt by saves that change the searched fields?
+        """
+        patient = self.create_patient(
+            department=self.department, first_name="Jane", last_name="Doe"
+        )
+        patient = type(patient).objects.get(pk=patient.pk)
+        tokens = set(patient.search_tokens.values_list("field", "token"))
+
+        # The update and its historical record (and their savepoint), without reading
+        # or writing the search tokens.
+        with self.assertNumQueries(4):
+            patient.save(update_fields=["status", "modified"])
+        patient.tour_complete = True
+        with self.assertNumQueries(4):
+            patient.save()
+
+        patient.first_name = "Janet"
+        patient.save(update_fields=["first_name"])
+        new_tokens = set(patient.search_tokens.values_list("field", "token"))
+        self.assertNotEqual(new_tokens, tokens)
+        with self.assertNumQueries(4):
+            patient.save()
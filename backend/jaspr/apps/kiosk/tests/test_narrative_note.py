@@ -1,8 +1,11 @@
+from unittest.mock import patch
+
 import responses
 from rest_framework import status
-from jaspr.apps.clinics.models import GlobalPreferences
+from jaspr.apps.clinics.models import GlobalPreferences, Preferences
 from jaspr.apps.kiosk.narrative_note import NarrativeNote
 from jaspr.apps.kiosk.models import NoteTemplate
+from jaspr.apps.kiosk.models.note_template import compiled_templates
 from jaspr.apps.test_infrastructure.testcases import JasprTestCase, JasprApiTestCase
 from jaspr.apps.epic.models import NotesLog, EpicSettings, EpicDepartmentSettings, PatientEhrIdentifier
 from jaspr.apps.kiosk.constants import ActionNames
@@ -35,6 +38,21 @@ class TestYesNoIfy(JasprTestCase):
             NarrativeNote.QUOTED_NO_ENTRY_SYMBOL, note.yesnoify("suicidal_yes_no")
         )
 
+    def test_helpers_read_from_answers_snapshot(self):
+        """ Are answers merged once when the note is created and not on every lookup? """
+
+        suicide_assessment = self.encounter.get_activity(ActivityType.SuicideAssessment)
+
+        suicide_assessment.answers = {"suicidal_yes_no": True, "suicidal_yes_no_describe": "Often"}
+        suicide_assessment.save()
+        note = NarrativeNote(self.encounter)
+        with patch.object(type(self.encounter), "get_answers", side_effect=AssertionError):
+            self.assertEqual(NarrativeNote.YES, note.yesnoify("suicidal_yes_no"))
+            self.assertEqual("Often", note.display("suicidal_yes_no_describe"))
+            self.assertIsNone(note.display("scoring_risk", no_entry=None))
+        with self.assertRaises(TypeError):
+            note.answers["answers"]["suicidal_yes_no"] = False
+
     def test_yesnoify_displays_true_yes(self):
         """ Is True displayed as "YES"? """
 
@@ -442,6 +460,61 @@ class TestItemHighlighting(JasprTestCase):
 
 
 
+class TestNoteTemplateCache(JasprTestCase):
+    fixtures = [
+        "jaspr/apps/bootstrap/fixtures/jaspr_content.json"
+    ]
+
+    def setUp(self):
+        super().setUp()
+        compiled_templates.clear()
+
+        self.default_template = NoteTemplate.objects.get(name="Default Narrative Note")
+        self.department = self.create_department()
+
+    def test_template_is_compiled_once_until_changed(self):
+        """ Is a `NoteTemplate` only compiled again after it changes? """
+        note_template = NoteTemplate.objects.create(name="Test", template="Hello {{ name }}")
+
+        self.assertEqual(note_template.render({"name": "Ann"}), "Hello Ann")
+        self.assertEqual(note_template.render({"name": "Bob"}), "Hello Bob")
+        self.assertEqual((compiled_templates.misses, compiled_templates.hits), (1, 1))
+
+        note_template.template = "Goodbye {{ name }}"
+        self.assertEqual(note_template.render({"name": "Ann"}), "Goodbye Ann")
+        note_template.save()
+        self.assertEqual(
+            NoteTemplate.objects.get(pk=note_template.pk).render({"name": "Bob"}), "Goodbye Bob"
+        )
+        self.assertEqual((compiled_templates.misses, compiled_templates.hits), (3, 1))
+
+    def test_for_department_is_cached_until_preferences_change(self):
+        """ Is the `NoteTemplate` of a `Department` cached and resolved again when its preferences change? """
+        self.assertEqual(
+            NoteTemplate.for_department(self.department, "narrative_note_template"),
+            self.default_template,
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                NoteTemplate.for_department(self.department, "narrative_note_template"),
+                self.default_template,
+            )
+
+        note_template = NoteTemplate.objects.create(name="Department", template="Department")
+        self.department.preferences = Preferences.objects.create(
+            narrative_note_template=note_template
+        )
+        self.department.save()
+        self.assertEqual(
+            NoteTemplate.for_department(self.department, "narrative_note_template"),
+            note_template,
+        )
+        self.assertEqual(
+            NoteTemplate.for_department(self.department, "stability_plan_template"),
+            NoteTemplate.objects.get(name="Default Stability Plan"),
+        )
+
+
 class TestAutomaticNoteTriggers(JasprApiTestCase):
     fixtures = [
         "jaspr/apps/bootstrap/fixtures/jaspr_content.json",
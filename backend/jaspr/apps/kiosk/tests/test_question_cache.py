@@ -0,0 +1,149 @@
+import json
+import os
+import pickle
+import tempfile
+
+from jaspr.apps.kiosk.activities.activity_utils import ActivityType
+from jaspr.apps.kiosk.activities.question_cache import (
+    clear_question_cache,
+    get_compiled_questions,
+    strip_answer_key_number,
+)
+from jaspr.apps.kiosk.activities.question_json import (
+    create_section_dictionary,
+    section_uid_to_answer_key,
+)
+from jaspr.apps.kiosk.activities.stability_plan.model import STANDARD_QUESTIONS_FILE
+from jaspr.apps.test_infrastructure.testcases import JasprSimpleTestCase, JasprTestCase
+
+
+class TestQuestionCache(JasprSimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        clear_question_cache()
+
+    def test_compiled_questions_are_reused(self):
+        template_vars = {"csa_assigned": True, "media_root_url": "/media/"}
+        first = get_compiled_questions(
+            ActivityType.StabilityPlan, STANDARD_QUESTIONS_FILE, template_vars
+        )
+        second = get_compiled_questions(
+            ActivityType.StabilityPlan, STANDARD_QUESTIONS_FILE, dict(template_vars)
+        )
+        self.assertIs(first, second)
+
+    def test_template_vars_are_part_of_the_key(self):
+        first = get_compiled_questions(
+            ActivityType.StabilityPlan,
+            STANDARD_QUESTIONS_FILE,
+            {"csa_assigned": True, "media_root_url": "/media/"},
+        )
+        second = get_compiled_questions(
+            ActivityType.StabilityPlan,
+            STANDARD_QUESTIONS_FILE,
+            {"csa_assigned": False, "media_root_url": "/media/"},
+        )
+        self.assertIsNot(first, second)
+
+    def test_file_version_change_invalidates(self):
+        questions = [
+            {"uid": "first", "actions": [{"type": "text", "answerKey": "firstAnswer"}]}
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(questions, f)
+        self.addCleanup(os.remove, f.name)
+
+        compiled = get_compiled_questions(ActivityType.SuicideAssessment, f.name)
+        self.assertEqual(compiled.answer_keys, ("first_answer",))
+        self.assertEqual(
+            dict(compiled.sections_dictionary["first"]), {"questions": ("first_answer",)}
+        )
+
+        questions[0]["actions"][0]["answerKey"] = "secondAnswer"
+        with open(f.name, "w") as updated:
+            json.dump(questions, updated)
+        stat = os.stat(f.name)
+        os.utime(f.name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        compiled = get_compiled_questions(ActivityType.SuicideAssessment, f.name)
+        self.assertEqual(compiled.answer_keys, ("second_answer",))
+
+    def test_compiled_questions_are_immutable(self):
+        compiled = get_compiled_questions(
+            ActivityType.StabilityPlan,
+            STANDARD_QUESTIONS_FILE,
+            {"csa_assigned": True, "media_root_url": "/media/"},
+        )
+        self.assertIsInstance(compiled.questions, tuple)
+        with self.assertRaises(TypeError):
+            compiled.sections_dictionary["new_section"] = {"questions": ()}
+        # Encounters holding the section dictionary get pickled when queueing jobs.
+        self.assertEqual(
+            pickle.loads(pickle.dumps(compiled.sections_dictionary)),
+            compiled.sections_dictionary,
+        )
+
+
+class TestEncounterQuestionCache(JasprTestCase):
+    def test_encounter_sections_dictionary_matches_questions(self):
+        system, clinic, department = self.create_full_healthcare_system()
+        patient = self.create_patient()
+        encounter = self.create_patient_encounter(patient=patient, department=department)
+        encounter.add_activities(
+            [ActivityType.StabilityPlan, ActivityType.SuicideAssessment]
+        )
+
+        expected = create_section_dictionary(encounter.get_questions())
+        actual = {
+            uid: {"questions": list(section["questions"])}
+            for uid, section in encounter.sections_dictionary.items()
+        }
+        self.assertEqual(list(actual), list(expected))
+        self.assertEqual(actual, expected)
+
+    def test_section_index_matches_section_dictionary_lookups(self):
+        system, clinic, department = self.create_full_healthcare_system()
+        patient = self.create_patient()
+        encounter = self.create_patient_encounter(patient=patient, department=department)
+        encounter.add_activities(
+            [ActivityType.StabilityPlan, ActivityType.SuicideAssessment]
+        )
+
+        sections_dictionary = create_section_dictionary(encounter.get_questions())
+        section_uids = list(sections_dictionary)
+        answer_keys = {
+            key
+            for section in sections_dictionary.values()
+            for key in section["questions"]
+        }
+        for answer_key in [*answer_keys, "frustration0", "distress12", "not_a_key", "not_a_key1"]:
+            with self.subTest(answer_key=answer_key):
+                self.assertEqual(
+                    encounter.get_section_uid_for_answer_key(answer_key),
+                    section_uid_to_answer_key(sections_dictionary, answer_key),
+                )
+        for position, section_uid in enumerate(section_uids):
+            self.assertEqual(encounter.get_safe_index(section_uid), position)
+        self.assertEqual(encounter.get_safe_index("not_a_section"), -1)
+        self.assertEqual(encounter.get_safe_index(None), -1)
+
+    def test_numbered_answer_key_lookups_are_bounded(self):
+        """
+        Do lookups of (client supplied) numbered answer keys only keep a bounded number
+        of keys?
+        """
+        system, clinic, department = self.create_full_healthcare_system()
+        encounter = self.create_patient_encounter(department=department)
+        encounter.add_activities([ActivityType.SuicideAssessment])
+        answer_key = "suicidal_yes_no"
+        section_uid = encounter.get_section_uid_for_answer_key(answer_key)
+        self.assertIsNotNone(section_uid)
+
+        maxsize = strip_answer_key_number.cache_info().maxsize
+        for number in range(maxsize * 2):
+            self.assertEqual(
+                encounter.get_section_uid_for_answer_key(f"{answer_key}{number}"),
+                section_uid,
+            )
+        self.assertEqual(strip_answer_key_number.cache_info().currsize, maxsize)
+        pickle.loads(pickle.dumps(encounter))
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-18 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_logs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emaillog',
+            name='email_response',
+            field=models.TextField(blank=True, help_text="The response from Django's `send_mail` function. Currently returns the number of emails successfully delivered (I.E. '0' or '1'), or empty if the email couldn't be sent.", null=True),
+        ),
+    ]
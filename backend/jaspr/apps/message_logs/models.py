@@ -32,8 +32,9 @@ class EmailLog(JasprAbstractBaseModel):
         help_text="The html body of the email. Used if present and the email is viewed with an email client that supports HTML.",
     )
     email_response = models.TextField(
+        null=True,
         blank=True,
-        help_text="The response from Django's `send_mail` function. Currently returns the number of emails successfully delivered (I.E. '0' or '1').",
+        help_text="The response from Django's `send_mail` function. Currently returns the number of emails successfully delivered (I.E. '0' or '1'), or empty if the email couldn't be sent.",
     )
 
     # Don't want to inherit the `status` field from the abstract parent.
@@ -0,0 +1,24 @@
+import logging
+from typing import List
+
+from django_rq.decorators import job
+from django_rq.jobs import Job
+
+logger = logging.getLogger(__name__)
+
+
+@job
+def build_patient_walkthroughs(patient_ids: List[int]) -> Job:
+    # Imported here, `walkthrough_manager` imports the api serializers, which queue this.
+    from jaspr.apps.stability_plan.walkthrough_manager import (
+        build_patient_walkthroughs as build,
+    )
+
+    try:
+        patient_walkthroughs = build(patient_ids)
+    except AssertionError:
+        # The content is missing something every walkthrough needs (E.g. the Paced
+        # Breathing activity), the walkthroughs are built on request instead.
+        logger.exception("Could not build patient walkthroughs.")
+        return
+    logger.info(f"Built {len(patient_walkthroughs)} Patient Walkthroughs")
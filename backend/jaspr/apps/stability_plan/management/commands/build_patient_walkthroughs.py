@@ -0,0 +1,31 @@
+from django.core.management.base import CommandParser
+
+from jaspr.apps.common.management.base import JasprBaseCommand
+from jaspr.apps.kiosk.models import Patient
+from jaspr.apps.stability_plan.walkthrough_manager import build_patient_walkthroughs
+
+
+class Command(JasprBaseCommand):
+    """
+    Run this command to build new PatientWalkthroughs for all of the Jaspr at Home
+    patients (E.g. after the walkthrough content changed), in batches of patients.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "-b", "--batch_size", type=int, default=200, help="patients per batch",
+        )
+
+    def handle(self, *args, **options) -> None:
+        batch_size = options["batch_size"]
+        patient_ids = list(
+            Patient.objects.filter(jahaccount__isnull=False)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        built = 0
+        for start in range(0, len(patient_ids), batch_size):
+            built += len(build_patient_walkthroughs(patient_ids[start : start + batch_size]))
+        self.stdout.write(f"Built {built} Patient Walkthroughs.")
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.13 on 2026-10-18 15:27
+
+from django.db import migrations
+import jaspr.apps.common.fields.encrypted_json_field
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stability_plan', '0004_auto_20220216_1628'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientwalkthrough',
+            name='step_payloads',
+            field=jaspr.apps.common.fields.encrypted_json_field.EncryptedJSONField(blank=True, null=True),
+        ),
+    ]
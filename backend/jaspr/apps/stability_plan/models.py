@@ -4,6 +4,8 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from model_utils import Choices
 from simple_history.models import HistoricalRecords
 
@@ -148,6 +150,11 @@ class PatientWalkthrough(JasprAbstractBaseModel):
     patient = models.ForeignKey("kiosk.Patient", on_delete=models.CASCADE)
     walkthrough = models.ForeignKey(Walkthrough, on_delete=models.PROTECT)
 
+    # What `PatientWalkthroughView` responds with for the active steps, serialized when
+    # the steps are built (see `WalkthroughManager`). Cleared when a step is changed,
+    # and serialized again on the next request.
+    step_payloads = EncryptedJSONField(blank=True, null=True)
+
     @property
     def _history_user(self):
         return self.changed_by
@@ -172,7 +179,7 @@ class PatientWalkthrough(JasprAbstractBaseModel):
 
     # TODO Further, if a patient has begun a Walkthrough and the Walkthrough has not reset, the PatientWalkthrough cannot be modified.
 
-    history = HistoricalRecords(bases=[RoutableModel])
+    history = HistoricalRecords(bases=[RoutableModel], excluded_fields=["step_payloads"])
 
     def __str__(self):
         return f"{self.patient} - {self.walkthrough.name}"
@@ -235,3 +242,20 @@ class PatientWalkthroughStep(JasprAbstractBaseModel):
         return f"{self.patient_walkthrough} - {self.step}"
 
     # TODO: enforce non-editability with patient step -- just add ...
+
+
+@receiver(post_save, sender=PatientWalkthroughStep)
+@receiver(post_delete, sender=PatientWalkthroughStep)
+def patient_walkthrough_step_changed(sender, instance, **kwargs) -> None:
+    PatientWalkthrough.objects.filter(pk=instance.patient_walkthrough_id).update(
+        step_payloads=None
+    )
+
+
+@receiver(post_save, sender=Step)
+def step_saved(sender, instance, created: bool, **kwargs) -> None:
+    # The payloads have the name of the step.
+    if not created:
+        PatientWalkthrough.objects.filter(
+            patientwalkthroughstep__step=instance
+        ).update(step_payloads=None)
@@ -19,7 +19,11 @@ from jaspr.apps.stability_plan.models import (
 )
 from jaspr.apps.test_infrastructure.testcases import JasprTestCase
 
-from ..walkthrough_manager import FRONTEND_RENDER_MAP, WalkthroughManager
+from ..walkthrough_manager import (
+    FRONTEND_RENDER_MAP,
+    WalkthroughManager,
+    build_patient_walkthroughs,
+)
 
 
 class TestCreatePatientWalkthroughSteps(JasprTestCase):
@@ -1773,3 +1777,113 @@ class TestCreatePatientWalkthroughSteps(JasprTestCase):
             step=step,
             status="active",
         )
+
+
+class TestBuildPatientWalkthroughs(JasprTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.create_activity(name="Paced Breathing", target_url="/breathe")
+        self.create_coping_strategy_category(name="Physical", slug="physical")
+        self.walkthrough = self.create_walkthrough(name="Default")
+        media_content_type = ContentType.objects.get(
+            model="media", app_label="awsmedia"
+        )
+        self.step = self.create_step(
+            name="PLE Video",
+            content_type=media_content_type,
+            object_id=self.create_media(file_type="video", name="Welcome Video").pk,
+            skip_if_blank=False,
+            frontend_render_type="videoDescription",
+        )
+        self.create_walkthrough_step(walkthrough=self.walkthrough, step=self.step, order=0)
+        self.reasons_step = self.create_step(
+            name="Reasons for Living",
+            content_type=None,
+            object_id=None,
+            frontend_render_type="reasonsForLiving",
+        )
+        self.create_walkthrough_step(
+            walkthrough=self.walkthrough, step=self.reasons_step, order=1
+        )
+
+        self.patients = []
+        for index in range(3):
+            patient = self.create_patient(ssid=f"test-patient-{index}")
+            jah_account = JAHAccount.objects.create(patient=patient)
+            CrisisStabilityPlan.objects.create(
+                jah_account=jah_account, reasons_live=[f"Reason {index}"]
+            )
+            self.patients.append(patient)
+
+    def test_builds_walkthroughs_for_the_patients(self):
+        """
+        Are the walkthroughs of all of the patients built in one pass, replacing their
+        active ones, with the payloads of the steps?
+        """
+        WalkthroughManager(self.patients[0]).handle()
+        old_patient_walkthrough = PatientWalkthrough.objects.get(
+            patient=self.patients[0], status="active"
+        )
+        patient_without_plan = self.create_patient(ssid="test-patient-no-plan")
+        JAHAccount.objects.create(patient=patient_without_plan)
+
+        # The same number of queries for any number of patients.
+        with self.assertNumQueries(17):
+            patient_walkthroughs = build_patient_walkthroughs(
+                [patient.pk for patient in self.patients] + [patient_without_plan.pk]
+            )
+
+        self.assertEqual(
+            [patient_walkthrough.patient for patient_walkthrough in patient_walkthroughs],
+            self.patients,
+        )
+        old_patient_walkthrough.refresh_from_db()
+        self.assertEqual(old_patient_walkthrough.status, "inactive")
+        self.assertFalse(
+            old_patient_walkthrough.patientwalkthroughstep_set.filter(
+                status="active"
+            ).exists()
+        )
+        self.assertFalse(
+            PatientWalkthrough.objects.filter(patient=patient_without_plan).exists()
+        )
+        for index, patient in enumerate(self.patients):
+            patient_walkthrough = PatientWalkthrough.objects.get(
+                patient=patient, status="active"
+            )
+            steps = patient_walkthrough.patientwalkthroughstep_set.filter(status="active")
+            self.assertEqual(
+                [(step.step_id, step.order) for step in steps],
+                [(self.step.pk, 0), (self.reasons_step.pk, 1)],
+            )
+            self.assertEqual(steps[1].value, [f"Reason {index}"])
+            self.assertEqual(steps[0].history.first().history_user, patient.user)
+            self.assertEqual(
+                patient_walkthrough.history.first().history_user, patient.user
+            )
+            self.assertEqual(
+                patient_walkthrough.step_payloads,
+                [
+                    {
+                        "step_name": "PLE Video",
+                        "frontend_render_type": "videoDescription",
+                        "value": steps[0].value,
+                    },
+                    {
+                        "step_name": "Reasons for Living",
+                        "frontend_render_type": "reasonsForLiving",
+                        "value": [f"Reason {index}"],
+                    },
+                ],
+            )
+
+    def test_changing_a_step_clears_the_payloads(self):
+        """Are the payloads cleared when a step of the walkthrough is changed?"""
+        (patient_walkthrough,) = build_patient_walkthroughs([self.patients[0].pk])
+
+        self.step.name = "Welcome"
+        self.step.save()
+
+        patient_walkthrough.refresh_from_db()
+        self.assertIsNone(patient_walkthrough.step_payloads)
@@ -1,7 +1,12 @@
 import logging
+from typing import Dict, Iterable, List, Optional, Set
 
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.functional import cached_property
 from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
 from jaspr.apps.api.v1.serializers import (
@@ -11,17 +16,18 @@ from jaspr.apps.api.v1.serializers import (
     ReadOnlyGenericCopingStrategySerializer,
     ReadOnlyGuideMessageSerializer,
     ReadOnlyHelplineSerializer,
+    ReadOnlyPatientWalkthroughStepSerializer,
     ReadOnlySharedStorySerializer,
 )
 from jaspr.apps.awsmedia.models import Media
-from jaspr.apps.jah.models import CrisisStabilityPlan, JAHAccount
+from jaspr.apps.kiosk.content_catalog import get_content_catalog
 from jaspr.apps.kiosk.models import (
     Activity,
     CopingStrategy,
-    CopingStrategyCategory,
     GuideMessage,
     Helpline,
     Patient,
+    PatientActivity,
     PatientVideo,
     SharedStory,
 )
@@ -96,56 +102,147 @@ FRONTEND_RENDER_MAP = {
 }
 
 
+class WalkthroughContent:
+    """
+    What every `Patient`'s walkthrough is built from (the content, the `Walkthrough`s
+    and their steps), loaded once and shared by the `WalkthroughManager`s building
+    the walkthroughs of many `Patient`s (see `build_patient_walkthroughs`).
+    """
+
+    def __init__(self):
+        # The content (activities, coping strategies, media, etc.) comes from the
+        # process local `ContentCatalog` instead of being queried for every step.
+        self.content_catalog = get_content_catalog()
+        self._steps: Dict[int, List[Step]] = {}
+        self._function_step_ids: Dict[tuple, Set[int]] = {}
+
+        # We meed to be able to reference the paced breathing activity
+        paced_breathing_activities = [
+            activity
+            for activity in self.content_catalog.activities
+            if activity.target_url == "/breathe"
+        ]
+        self.paced_breathing_activity = next(
+            (
+                activity
+                for activity in paced_breathing_activities
+                if activity.status == "active"
+            ),
+            None,
+        )
+        assert self.paced_breathing_activity, "Missing a Paced Breathing activity."
+
+        assert (
+            len(paced_breathing_activities) == 1
+        ), "More than 1 Paced Breathing activities found."
+
+        self.physical_coping_strategy_category = next(
+            (
+                category
+                for category in self.content_catalog.coping_strategy_categories
+                if category.status == "active" and category.slug == "physical"
+            ),
+            None,
+        )
+        assert (
+            self.physical_coping_strategy_category
+        ), "Missing a Physical Coping Strategy Category with a slug of 'physical'."
+
+    @cached_property
+    def active_walkthrough(self) -> Optional[Walkthrough]:
+        return Walkthrough.objects.filter(status="active").order_by("-created").first()
+
+    @cached_property
+    def favorited_video_ids(self) -> Set[int]:
+        return set(
+            PatientVideo.objects.filter(
+                save_for_later=True,
+                status="active",
+            ).values_list("video_id", flat=True)
+        )
+
+    def get_steps(self, walkthrough: Walkthrough) -> List[Step]:
+        steps = self._steps.get(walkthrough.pk)
+        if steps is None:
+            steps = self._steps[walkthrough.pk] = list(
+                Step.objects.filter(
+                    walkthroughstep__status="active",
+                    walkthroughstep__walkthrough__status="active",
+                    walkthroughstep__walkthrough=walkthrough,
+                ).order_by("walkthroughstep__order")
+            )
+        return steps
+
+    def get_function_step_ids(self, walkthrough: Walkthrough, function: str) -> Set[int]:
+        """The ids of the active steps of the `walkthrough` with the `function`."""
+        key = (walkthrough.pk, function)
+        step_ids = self._function_step_ids.get(key)
+        if step_ids is None:
+            step_ids = self._function_step_ids[key] = set(
+                WalkthroughStep.objects.filter(
+                    walkthrough=walkthrough,
+                    step__function=function,
+                    status="active",
+                ).values_list("step__id", flat=True)
+            )
+        return step_ids
+
+
 class WalkthroughManager:
     """ Manage relationships between Walkthrough, Patient and Steps """
 
     def __init__(
-        self, patient, walkthrough=None, use_existing_patient_walkthrough=False
+        self,
+        patient,
+        walkthrough=None,
+        use_existing_patient_walkthrough=False,
+        content: Optional[WalkthroughContent] = None,
     ):
         """  Initialize state here, not making any database changes."""
 
         self.use_existing_patient_walkthrough = use_existing_patient_walkthrough
         self.walkthrough = walkthrough
         self.patient = patient
-        self.jah_account = patient.jahaccount
+        self.content = content
         self.new_patient_walkthrough_steps = []
 
         # initializing these attributes here; defined further in setup
+        self.jah_account = None
         self.crisis_stability_plan = None
         self.existing_patient_walkthrough = None
+        self.patient_walkthrough = None
         self.physical_coping_strategy_category = None
         self.paced_breathing_activity = None
+        self.content_catalog = None
 
     def setup(self):
         """ Set up all attributes that require a database call. """
 
-        # We meed to be able to reference the paced breathing activity
-        self.paced_breathing_activity = Activity.objects.filter(
-            target_url="/breathe",
-            status="active",
-        ).first()
-        assert self.paced_breathing_activity, "Missing a Paced Breathing activity."
-
-        assert (
-            Activity.objects.filter(target_url="/breathe").count() == 1
-        ), "More than 1 Paced Breathing activities found."
-
-        self.physical_coping_strategy_category = CopingStrategyCategory.objects.filter(
-            status="active",
-            slug="physical",
-        ).first()
-        assert (
-            self.physical_coping_strategy_category
-        ), "Missing a Physical Coping Strategy Category with a slug of 'physical'."
+        if self.content is None:
+            self.content = WalkthroughContent()
+        self.content_catalog = self.content.content_catalog
+        self.paced_breathing_activity = self.content.paced_breathing_activity
+        self.physical_coping_strategy_category = (
+            self.content.physical_coping_strategy_category
+        )
 
         # for clarification: allow walkthrough XOR use_existing_patient_walkthrough, not both
         assert not (
             self.walkthrough and self.use_existing_patient_walkthrough
         ), "Only set walkthrough or use_existing_patient_walkthrough"
 
-        self.existing_patient_walkthrough = PatientWalkthrough.objects.filter(
-            patient=self.patient, status="active"
-        ).first()
+        # Prefetched by `build_patient_walkthroughs`.
+        active_patient_walkthroughs = getattr(
+            self.patient, "active_patient_walkthroughs", None
+        )
+        if active_patient_walkthroughs is not None:
+            self.existing_patient_walkthrough = next(
+                iter(active_patient_walkthroughs), None
+            )
+        else:
+            self.existing_patient_walkthrough = PatientWalkthrough.objects.filter(
+                patient=self.patient, status="active"
+            ).first()
 
         # If we need to use an existing walkthrough, we need to have one to use.
         if self.use_existing_patient_walkthrough:
@@ -155,51 +252,25 @@ class WalkthroughManager:
 
             self.walkthrough = self.existing_patient_walkthrough.walkthrough
 
+        self.jah_account = self.patient.jahaccount
         self.crisis_stability_plan = self.jah_account.crisisstabilityplan
 
         assert (
             self.crisis_stability_plan
         ), "A Crisis Stability Plan is required for this patient to build a patient walkthrough."
 
-    def deactivate_old_records(self):
-        """ Mark as archived and inactive various related records. """
-
-        # if there is an existing patient walkthrough, let's mark records related to it as inactive.
-        if self.existing_patient_walkthrough:
-
-            pws_qs = PatientWalkthroughStep.objects.filter(
-                patient_walkthrough__patient=self.patient
-            )
-
-            for pws in pws_qs:
-                pws.status = "inactive"
-
-            bulk_update_with_history(
-                pws_qs,
-                PatientWalkthroughStep,
-                ["status"],
-                batch_size=500,
-                default_user=self.patient.user,
-            )
-
-            self.existing_patient_walkthrough.status = "inactive"
-            self.existing_patient_walkthrough._history_user = self.patient.user
-
-            self.existing_patient_walkthrough.save()
-
     def set_walkthrough(self):
         # Use most recent Walkthrough if we don't already have a walkthrough.
         if not self.walkthrough:
-            self.walkthrough = (
-                Walkthrough.objects.filter(status="active").order_by("-created").first()
-            )
+            self.walkthrough = self.content.active_walkthrough
             assert self.walkthrough, "Could not find an active Walkthrough"
 
-    def create_patient_walkthrough(self):
+    def prepare_patient_walkthrough(self):
         """
-        Create a new, active patient_walkthrough to contain our new PatientWalkthroughStep records.
+        Prepare a new, active patient_walkthrough to contain our new PatientWalkthroughStep
+        records. Saved by `save_patient_walkthroughs`.
         """
-        self.patient_walkthrough = PatientWalkthrough.objects.create(
+        self.patient_walkthrough = PatientWalkthrough(
             patient=self.patient,
             _history_user=self.patient.user,
             walkthrough=self.walkthrough,
@@ -208,11 +279,56 @@ class WalkthroughManager:
 
     def get_steps(self):
         # use the steps of this walkthrough to create the patient steps
-        return Step.objects.filter(
-            walkthroughstep__status="active",
-            walkthroughstep__walkthrough__status="active",
-            walkthroughstep__walkthrough=self.walkthrough,
-        ).order_by("walkthroughstep__order")
+        return self.content.get_steps(self.walkthrough)
+
+    def get_favorite_patient_activity(self) -> Optional[PatientActivity]:
+        # Prefetched by `build_patient_walkthroughs`.
+        favorite_patient_activities = getattr(
+            self.patient, "favorite_patient_activities", None
+        )
+        if favorite_patient_activities is not None:
+            return next(iter(favorite_patient_activities), None)
+        return (
+            self.patient.patientactivity_set.filter(
+                save_for_later=True, status="active"
+            )
+            .order_by("-rating", "-created")
+            .first()
+        )
+
+    def get_patient_coping_strategies(self, titles) -> List[PatientCopingStrategy]:
+        """The active `PatientCopingStrategy`s with any of the `titles`, ignoring case."""
+        titles = {title.casefold() for title in titles}
+        # Prefetched by `build_patient_walkthroughs`.
+        patient_coping_strategies = getattr(
+            self.jah_account, "active_patient_coping_strategies", None
+        )
+        if patient_coping_strategies is None:
+            patient_coping_strategies = PatientCopingStrategy.objects.filter(
+                jah_account=self.jah_account, status="active"
+            )
+        return [
+            coping_strategy
+            for coping_strategy in patient_coping_strategies
+            if coping_strategy.title.casefold() in titles
+        ]
+
+    def get_content_object(self, step):
+        """`step.content_object`, from the `ContentCatalog` if it's content."""
+        if step.content_type_id is not None and step.object_id is not None:
+            model = ContentType.objects.get_for_id(step.content_type_id).model_class()
+            if self.content_catalog.has_model(model):
+                return self.content_catalog.get(model, step.object_id)
+        return step.content_object
+
+    def serialize(self, serializer_class, instance):
+        """
+        `serializer_class(instance).data`, serialized once per `ContentCatalog` snapshot
+        if `instance` is content.
+        """
+        if instance is not None and self.content_catalog.has_model(type(instance)):
+            return self.content_catalog.get_payload(serializer_class, instance)
+        return serializer_class(instance).data
 
     def is_step_special(self, step):
         if step.function:
@@ -236,12 +352,13 @@ class WalkthroughManager:
 
     def _prepare_standard_patient_walkthrough_step(self, step):
         """ Create Standard Patient Walkthrough Step (no functions) based on a step"""
-        if step.content_object:
+        content_object = self.get_content_object(step)
+        if content_object:
             # get serialized version of content_object
             serializer_class = FRONTEND_RENDER_MAP[step.frontend_render_type][
                 "serializer_class"
             ]
-            serialized_obj = serializer_class(step.content_object).data
+            serialized_obj = self.serialize(serializer_class, content_object)
         else:
             serialized_obj = None
 
@@ -256,25 +373,27 @@ class WalkthroughManager:
     def favorite_shared_story(self, step):
         """ Find a favorited video that is also a video on a shared story and make a PatientWalkthroughStep"""
 
-        favorited_video_ids = PatientVideo.objects.filter(
-            save_for_later=True,
-            status="active",
-        ).values_list("video_id", flat=True)
+        favorited_video_ids = self.content.favorited_video_ids
 
-        shared_story = (
-            SharedStory.objects.filter(video_id__in=favorited_video_ids)
-            .order_by("-created")
-            .first()
+        shared_story = max(
+            (
+                shared_story
+                for shared_story in self.content_catalog.shared_stories
+                if shared_story.video_id in favorited_video_ids
+            ),
+            key=lambda shared_story: shared_story.created,
+            default=None,
         )
 
+        content_object = self.get_content_object(step)
         if shared_story:
-            serialized_obj = MediaSerializer(shared_story.video).data
+            serialized_obj = self.serialize(MediaSerializer, shared_story.video)
 
-        elif step.content_object:
-            if step.content_object.__class__ == SharedStory:
-                serialized_obj = MediaSerializer(step.content_object.video).data
-            elif step.content_object.__class__ == Media:
-                serialized_obj = MediaSerializer(step.content_object).data
+        elif content_object:
+            if content_object.__class__ == SharedStory:
+                serialized_obj = self.serialize(MediaSerializer, content_object.video)
+            elif content_object.__class__ == Media:
+                serialized_obj = self.serialize(MediaSerializer, content_object)
             else:
                 return
         else:
@@ -303,20 +422,20 @@ class WalkthroughManager:
         processed_coping_strategies = []
 
         if coping_top := self.crisis_stability_plan.coping_top:
-            q_qs = Q()
-            for title in coping_top:
-                q_qs |= Q(title__iexact=title)
-
             # Let's first establish if there are, in fact, any non-physical coping strategies selected.
-            for coping_strategy in CopingStrategy.objects.filter(q_qs, status="active"):
-                if coping_strategy.category != self.physical_coping_strategy_category:
+            for coping_strategy in self.content_catalog.get_coping_strategies_by_title(
+                coping_top
+            ):
+                if (
+                    coping_strategy.status == "active"
+                    and coping_strategy.category_id
+                    != self.physical_coping_strategy_category.pk
+                ):
                     original_coping_strategies.append(coping_strategy)
 
             # Now find non-physical patient coping strategies
-            for coping_strategy in PatientCopingStrategy.objects.filter(
-                q_qs, jah_account=self.jah_account, status="active"
-            ):
-                if coping_strategy.category != self.physical_coping_strategy_category:
+            for coping_strategy in self.get_patient_coping_strategies(coping_top):
+                if coping_strategy.category_id != self.physical_coping_strategy_category.pk:
                     original_coping_strategies.append(coping_strategy)
 
             # Sort by order in coping_top
@@ -328,15 +447,9 @@ class WalkthroughManager:
         # If we found originals then make steps.
         if original_coping_strategies:
             # get other steps that have this function in this walkthrough
-            step_ids = (
-                WalkthroughStep.objects.filter(
-                    walkthrough=self.walkthrough,
-                    step__function="top_non_physical_coping_strategies",
-                    status="active",
-                )
-                .exclude(step=step)
-                .values_list("step__id", flat=True)
-            )
+            step_ids = self.content.get_function_step_ids(
+                self.walkthrough, "top_non_physical_coping_strategies"
+            ) - {step.pk}
 
             num_pws = len(
                 [
@@ -351,8 +464,8 @@ class WalkthroughManager:
                 processed_coping_strategies = original_coping_strategies
 
         # If no originals, then substitute with defaults if available.
-        elif not original_coping_strategies and step.content_object:
-            processed_coping_strategies.append(step.content_object)
+        elif not original_coping_strategies and self.get_content_object(step):
+            processed_coping_strategies.append(self.get_content_object(step))
 
         # do nothing if step.content_object is None
         else:
@@ -360,7 +473,7 @@ class WalkthroughManager:
 
         new_steps = []
         for coping_strategy in processed_coping_strategies[:3]:
-            serialized_obj = ReadOnlyCopingStrategySerializer(coping_strategy).data
+            serialized_obj = self.serialize(ReadOnlyCopingStrategySerializer, coping_strategy)
             new_steps.append(
                 PatientWalkthroughStep(
                     patient_walkthrough=self.patient_walkthrough,
@@ -377,9 +490,10 @@ class WalkthroughManager:
 
         if self.crisis_stability_plan.coping_body:
             title = self.crisis_stability_plan.coping_body[0]
-            try:
-                coping_strategy = CopingStrategy.objects.get(title__iexact=title)
-            except CopingStrategy.DoesNotExist:
+            coping_strategies = self.content_catalog.get_coping_strategies_by_title([title])
+            if coping_strategies:
+                coping_strategy = coping_strategies[0]
+            else:
                 # Get or create -- although should never have to create --
                 # a related custom coping strategy, since we weren't able to find
                 # a matching Pre-defined one.  We expect it to be a custom one at this point,
@@ -402,8 +516,8 @@ class WalkthroughManager:
                         f"System found patient_coping_strategy `{coping_strategy.title}`"
                         f"with status of archived while attempting to generate patient walkthrough step for {step.name}"
                     )
-        elif step.content_object:
-            coping_strategy = step.content_object
+        elif self.get_content_object(step):
+            coping_strategy = self.get_content_object(step)
         else:
             # ignoring skip if blank for the time being
             coping_strategy = None
@@ -411,9 +525,9 @@ class WalkthroughManager:
         if coping_strategy:
             # We'll use the ReadOnlyGenericCopingStrategySerializer for both
             # classes of objects: PatientCopingStrategy and CopingStrategy
-            serialized_obj = ReadOnlyGenericCopingStrategySerializer(
-                coping_strategy
-            ).data
+            serialized_obj = self.serialize(
+                ReadOnlyGenericCopingStrategySerializer, coping_strategy
+            )
             return PatientWalkthroughStep(
                 patient_walkthrough=self.patient_walkthrough,
                 step=step,
@@ -432,22 +546,16 @@ class WalkthroughManager:
 
     def favorite_activity(self, step):
 
-        patient_activity = (
-            self.patient.patientactivity_set.filter(
-                save_for_later=True, status="active"
-            )
-            .order_by("-rating", "-created")
-            .first()
-        )
+        patient_activity = self.get_favorite_patient_activity()
 
         if not patient_activity:
             activity = None
         else:
-            activity = patient_activity.activity
+            activity = self.content_catalog.get(Activity, patient_activity.activity_id)
 
         # Substitute content_object, if activity is not found.
-        if not activity and step.content_object:
-            activity = step.content_object
+        if not activity and self.get_content_object(step):
+            activity = self.get_content_object(step)
 
         # skip step if no activity and skip_if_blank True
         if not activity and step.skip_if_blank:
@@ -481,7 +589,7 @@ class WalkthroughManager:
             else:
                 # Assume `activity` is an instance of `Activity` in this case.
                 media = activity.video
-            serialized_obj = MediaSerializer(media).data
+            serialized_obj = self.serialize(MediaSerializer, media)
             return PatientWalkthroughStep(
                 patient_walkthrough=self.patient_walkthrough,
                 step=step,
@@ -553,8 +661,11 @@ class WalkthroughManager:
             function = getattr(self, step.function)
             return function(step)
 
-    def create_patient_walkthrough_steps(self):
-        """ Create PatientWalkthroughStep for a patient. """
+    def prepare_patient_walkthrough_steps(self):
+        """
+        Prepare the PatientWalkthroughSteps for a patient, and the payloads of the
+        patient_walkthrough. Saved by `save_patient_walkthroughs`.
+        """
         # use the steps of this walkthrough to create the patient steps
         for step in self.get_steps():
             if self.skip_step(step):
@@ -576,31 +687,176 @@ class WalkthroughManager:
         for counter, pws in enumerate(self.new_patient_walkthrough_steps):
             pws.order = counter
 
-        bulk_create_with_history(
-            self.new_patient_walkthrough_steps,
-            PatientWalkthroughStep,
-            batch_size=500,
-            default_user=self.patient.user,
+        self.patient_walkthrough.step_payloads = get_step_payloads(
+            self.new_patient_walkthrough_steps
         )
 
-    def handle(self):
-        """ Handling changes here """
+    def prepare(self):
+        """ Prepare the new records, without saving them. """
         # setting this to [] here as well as init in case of calling multiple times with same instantiation.
         self.new_patient_walkthrough_steps = []
+        self.setup()
+        self.set_walkthrough()
+        self.prepare_patient_walkthrough()
+        self.prepare_patient_walkthrough_steps()
+
+    def handle(self):
+        """ Handling changes here """
         try:
             with transaction.atomic():
                 # prevent race conditions by locking down patient record
                 self.patient = (
                     Patient.objects.filter(pk=self.patient.pk).select_for_update().get()
                 )
-                self.setup()
-                self.deactivate_old_records()
-                self.set_walkthrough()
-                self.create_patient_walkthrough()
-                self.create_patient_walkthrough_steps()
+                self.prepare()
+                save_patient_walkthroughs([self])
         except Exception as e:
             logger.exception(
                 "Caught exception in Walkthrough Manager.\n" "Exception: %s",
                 str(e),
             )
             raise
+
+
+def get_step_payloads(patient_walkthrough_steps: Iterable[PatientWalkthroughStep]) -> List:
+    """What `PatientWalkthroughView` responds with for the steps."""
+    return ReadOnlyPatientWalkthroughStepSerializer(
+        patient_walkthrough_steps, many=True
+    ).data
+
+
+def update_step_payloads(patient_walkthrough: PatientWalkthrough) -> List:
+    """Serialize and save the payloads of the active steps of the `patient_walkthrough`."""
+    patient_walkthrough.step_payloads = get_step_payloads(
+        PatientWalkthroughStep.objects.filter(
+            status="active", patient_walkthrough=patient_walkthrough
+        ).select_related("step")
+    )
+    PatientWalkthrough.objects.filter(pk=patient_walkthrough.pk).update(
+        step_payloads=patient_walkthrough.step_payloads
+    )
+    return patient_walkthrough.step_payloads
+
+
+def save_patient_walkthroughs(managers: List[WalkthroughManager]) -> None:
+    """
+    Save the records prepared by the `managers` (see `WalkthroughManager.prepare`),
+    marking the `Patient`s' previous records inactive, in a few bulk queries for all of
+    them. Call in a transaction, with the `Patient`s locked.
+    """
+    users_by_patient_id = {manager.patient.pk: manager.patient.user for manager in managers}
+
+    # if there is an existing patient walkthrough, let's mark records related to it as inactive.
+    existing_patient_walkthroughs = [
+        manager.existing_patient_walkthrough
+        for manager in managers
+        if manager.existing_patient_walkthrough
+    ]
+    if existing_patient_walkthroughs:
+        old_patient_walkthrough_steps = list(
+            PatientWalkthroughStep.objects.filter(
+                patient_walkthrough__patient__in=[
+                    patient_walkthrough.patient_id
+                    for patient_walkthrough in existing_patient_walkthroughs
+                ],
+                status="active",
+            ).select_related("patient_walkthrough")
+        )
+        for pws in old_patient_walkthrough_steps:
+            pws.status = "inactive"
+            pws._history_user = users_by_patient_id[pws.patient_walkthrough.patient_id]
+        bulk_update_with_history(
+            old_patient_walkthrough_steps,
+            PatientWalkthroughStep,
+            ["status"],
+            batch_size=500,
+        )
+
+        now = timezone.now()
+        for patient_walkthrough in existing_patient_walkthroughs:
+            patient_walkthrough.status = "inactive"
+            patient_walkthrough.modified = now
+            patient_walkthrough._history_user = users_by_patient_id[
+                patient_walkthrough.patient_id
+            ]
+        bulk_update_with_history(
+            existing_patient_walkthroughs,
+            PatientWalkthrough,
+            ["status", "modified"],
+            batch_size=500,
+        )
+
+    bulk_create_with_history(
+        [manager.patient_walkthrough for manager in managers],
+        PatientWalkthrough,
+        batch_size=500,
+    )
+
+    new_patient_walkthrough_steps = []
+    for manager in managers:
+        for pws in manager.new_patient_walkthrough_steps:
+            # Set again now that it's saved, for its id.
+            pws.patient_walkthrough = manager.patient_walkthrough
+            pws._history_user = manager.patient.user
+            new_patient_walkthrough_steps.append(pws)
+    bulk_create_with_history(
+        new_patient_walkthrough_steps,
+        PatientWalkthroughStep,
+        batch_size=500,
+    )
+
+
+def build_patient_walkthroughs(patient_ids: Iterable[int]) -> List[PatientWalkthrough]:
+    """
+    Build new `PatientWalkthrough`s (replacing the active ones) for the Jaspr at Home
+    `Patient`s in one pass: the content and the `Walkthrough` steps are loaded once,
+    each kind of `Patient` data in one query for all of them, and the records are
+    written in bulk for all of them (see `save_patient_walkthroughs`).
+
+    `Patient`s a walkthrough can't be built for (E.g. without a `CrisisStabilityPlan`)
+    are logged and skipped. Returns the new `PatientWalkthrough`s.
+    """
+    content = WalkthroughContent()
+    with transaction.atomic():
+        patients = (
+            Patient.objects.filter(pk__in=patient_ids, jahaccount__isnull=False)
+            .select_related("user", "jahaccount__crisisstabilityplan")
+            .prefetch_related(
+                Prefetch(
+                    "patientwalkthrough_set",
+                    queryset=PatientWalkthrough.objects.filter(status="active"),
+                    to_attr="active_patient_walkthroughs",
+                ),
+                Prefetch(
+                    "patientactivity_set",
+                    queryset=PatientActivity.objects.filter(
+                        save_for_later=True, status="active"
+                    ).order_by("-rating", "-created"),
+                    to_attr="favorite_patient_activities",
+                ),
+                Prefetch(
+                    "jahaccount__patientcopingstrategy_set",
+                    queryset=PatientCopingStrategy.objects.filter(status="active"),
+                    to_attr="active_patient_coping_strategies",
+                ),
+            )
+            # prevent race conditions by locking down patient records, in the same
+            # order every time.
+            .select_for_update(of=("self",))
+            .order_by("pk")
+        )
+        managers = []
+        for patient in patients:
+            manager = WalkthroughManager(patient, content=content)
+            try:
+                manager.prepare()
+            except (AssertionError, ObjectDoesNotExist):
+                logger.exception(
+                    f"Could not build a patient walkthrough for patient {patient.pk}."
+                )
+                continue
+            managers.append(manager)
+
+        if managers:
+            save_patient_walkthroughs(managers)
+    return [manager.patient_walkthrough for manager in managers]
@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 from django.conf import settings
 from django.contrib.auth.models import Group, GroupManager
+from django.core.cache import cache
 from django.test import TestCase, TransactionTestCase
 from django.utils.text import slugify
 
@@ -134,6 +135,12 @@ class BaseTestCaseMixin:
     Useful for both API and non-API tests.
     """
 
+    def setUp(self) -> None:
+        # Cached lookups (E.g. `jaspr.apps.clinics.ip_whitelist`) would otherwise
+        # outlive the test transaction they were computed in.
+        cache.clear()
+        super().setUp()
+
     @staticmethod
     def extract_nested_kwargs(
         prefix: str, kwargs: KwargsType
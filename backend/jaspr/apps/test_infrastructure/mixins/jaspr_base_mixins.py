@@ -13,11 +13,14 @@ from jaspr.apps.test_infrastructure.mixins.base_mixins import (
     BaseGroupMixin,
     BaseTestCaseMixin,
 )
+from jaspr.apps.test_infrastructure.mixins.query_budget_mixins import (
+    QueryBudgetTestCaseMixin,
+)
 
 from jaspr.apps.kiosk.models.patient_department_sharing import PatientDepartmentSharing
 
 
-class JasprBaseTestCaseMixin(BaseGroupMixin, BaseTestCaseMixin):
+class JasprBaseTestCaseMixin(BaseGroupMixin, BaseTestCaseMixin, QueryBudgetTestCaseMixin):
     """
     Collection of helper methods for tests involving kiosk.
     Useful for both API and non-API tests. Only methods that
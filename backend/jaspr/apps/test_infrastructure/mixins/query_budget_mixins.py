@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+from typing import Generator, Optional
+
+from jaspr.apps.common.query_budget import QueryBudget, QueryRecorder
+
+
+class QueryBudgetTestCaseMixin:
+    """
+    Provides `assertQueryBudget`, for checking the queries of a block of code (E.g. an
+    API request) against a budget, so N+1s and other query regressions get caught.
+
+    NOTE: Requests made in tests are already checked against the `query_budgets` of
+    their view (see `QUERY_BUDGET_STRICT`). Use this for code outside of views, or to
+    check a particular request against a tighter budget.
+    """
+
+    @contextmanager
+    def assertQueryBudget(
+        self,
+        max_queries: Optional[int] = None,
+        max_duplicate_queries: Optional[int] = None,
+    ) -> Generator[QueryRecorder, None, None]:
+        with QueryRecorder() as recorder:
+            yield recorder
+        violations = QueryBudget(max_queries, max_duplicate_queries).get_violations(
+            recorder
+        )
+        if violations:
+            self.fail("Over the query budget: " + "; ".join(violations))
@@ -15,6 +15,18 @@ from jaspr.apps.common.jobs.rq import (
 )
 
 
+def get_delay_queue_name(delay: Callable[..., Any]) -> str:
+    """
+    The name of the queue the `delay` of a `@job` function queues it on (its decorator
+    keeps the queue in the closure of `delay`).
+    """
+    for cell in getattr(delay, "__closure__", None) or ():
+        queue = getattr(cell.cell_contents, "queue", None)
+        if queue is not None:
+            return queue if isinstance(queue, str) else queue.name
+    return "default"
+
+
 class RedisTestCaseMixin(SerializeMixin):
     """
     This mixin should be used if any part of job/redis dependent
@@ -119,10 +131,13 @@ class RedisTestCaseMixin(SerializeMixin):
             to_patch = f"{to_patch.__module__}.{to_patch.__qualname__}.delay"
             original_function = to_patch
 
+        queue_name = get_delay_queue_name(original_function)
+
         def patched_delay(*args, **kwargs):
-            # NOTE: Does not pass any other arguments, so you only get defaults right now.
-            # If this is not desired, might have to test some other way.
-            queue = django_rq.get_queue(is_async=run_async)
+            # NOTE: Does not pass any other arguments (other than the queue), so you only
+            # get defaults right now. If this is not desired, might have to test some
+            # other way.
+            queue = django_rq.get_queue(queue_name, is_async=run_async)
             kwargs.setdefault("result_ttl", default_result_ttl())
             kwargs.setdefault("failure_ttl", default_failure_ttl())
             queue.enqueue(original_function, *args, **kwargs)
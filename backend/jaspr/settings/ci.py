@@ -81,6 +81,29 @@ RQ_ASYNC = False
 for queue_config in RQ_QUEUES.values():
     queue_config["ASYNC"] = RQ_ASYNC
 
+# EHR Note Dispatch
+# ------------------------------------------------------------------------------
+# Send notes and generate analytics exports in the calling thread. Other threads use
+# their own database connection, which can't see the data of a test running inside a
+# transaction.
+EHR_NOTE_DISPATCH_MAX_WORKERS = 1
+ANALYTICS_EXPORT_MAX_WORKERS = 1
+
+# Action Buffer
+# ------------------------------------------------------------------------------
+# Write each `Action` as soon as it's buffered, so tests can check for it.
+ACTION_BUFFER_BATCH_SIZE = 1
+
+# Message Buffer
+# ------------------------------------------------------------------------------
+# Send each buffered message as soon as it's buffered, so tests can check for it.
+MESSAGE_BUFFER_BATCH_SIZE = 1
+
+# Query Budgets
+# ------------------------------------------------------------------------------
+# Fail tests making a request over its view's query budget.
+QUERY_BUDGET_STRICT = True
+
 # Necessary to test admin pages.
 SHOW_DEVADMIN = True
 
@@ -146,6 +146,7 @@ PASSWORD_RESET_TIMEOUT = 15 * 3600 * 24
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "jaspr.apps.common.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django_feature_policy.FeaturePolicyMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -371,7 +372,7 @@ elif ENVIRONMENT == "integration":
 
 CORS_ORIGIN_REGEX_WHITELIST = corw
 CORS_ALLOW_CREDENTIALS = True
-CORS_EXPOSE_HEADERS = ["Has-Validation-Error", "Content-Disposition"]
+CORS_EXPOSE_HEADERS = ["Has-Validation-Error", "Content-Disposition", "ETag"]
 CORS_ALLOW_HEADERS = [
     "accept",
     "accept-encoding",
@@ -380,6 +381,7 @@ CORS_ALLOW_HEADERS = [
     "content-type",
     "dnt",
     "if-modified-since",
+    "if-none-match",
     "keep-alive",
     "origin",
     "user-agent",
@@ -484,6 +486,10 @@ REST_KNOX = {
     "MIN_REFRESH_INTERVAL": 30,
 }
 
+# How long an authenticated `AuthToken` (with its `User` and `JasprSession`) is cached
+# (see `jaspr.apps.kiosk.auth_cache`).
+AUTH_TOKEN_CACHE_SECONDS = env.int("AUTH_TOKEN_CACHE_SECONDS", default=60)
+
 # Jaspr Session Knox Integration (With Our Modifications)
 # ------------------------------------------------------------------------------
 IN_ER_TECHNICIAN_DEFAULT_TOKEN_EXPIRES_AFTER = timedelta(minutes=10)
@@ -506,6 +512,12 @@ FERNET_KEYS = env("FERNET_KEYS", cast=list)
 # assuming a comma separated list in the environment key if there is more than one.
 FERNET_USE_HKDF = False
 
+# Patient Search Index
+# ------------------------------------------------------------------------------
+# Key for the keyed hashes in `kiosk.PatientSearchToken`. Falls back to `SECRET_KEY`.
+# If it changes, run `python manage.py rebuild_patient_search_index`.
+PATIENT_SEARCH_INDEX_KEY = env("PATIENT_SEARCH_INDEX_KEY", default=None)
+
 # AWS
 # ------------------------------------------------------------------------------
 AWS_ACCESS_KEY_ID = env("AWS_ACCESS_KEY_ID")
@@ -535,6 +547,53 @@ JASPR_PRIVATE_KEY = serialization.load_pem_private_key(
 )
 JASPR_PUBLIC_KEY = JASPR_PRIVATE_KEY.public_key()
 
+# Sending notes to the EHR (see `jaspr.apps.epic.note_dispatch`).
+# The most notes sent at once, overall and per `EpicSettings` (EHR instance).
+EHR_NOTE_DISPATCH_MAX_WORKERS = env.int("EHR_NOTE_DISPATCH_MAX_WORKERS", default=8)
+EHR_NOTE_DISPATCH_MAX_WORKERS_PER_EPIC_SETTINGS = env.int(
+    "EHR_NOTE_DISPATCH_MAX_WORKERS_PER_EPIC_SETTINGS", default=2
+)
+# After this many consecutive failed requests to an EHR instance, stop sending notes to
+# it for the cooldown. The notes are picked up again by a later run.
+EHR_NOTE_DISPATCH_CIRCUIT_BREAKER_THRESHOLD = 3
+EHR_NOTE_DISPATCH_CIRCUIT_BREAKER_COOLDOWN_SECONDS = 300
+
+# The most analytics export CSVs generated at once (see
+# `jaspr.apps.kiosk.analytics.AnalyticsExporter.write_zip`).
+ANALYTICS_EXPORT_MAX_WORKERS = env.int("ANALYTICS_EXPORT_MAX_WORKERS", default=4)
+
+# Buffered `Action` creation (see `jaspr.apps.kiosk.action_buffer`).
+# The most `Action`s written at once, and the number buffered that triggers a write.
+ACTION_BUFFER_BATCH_SIZE = env.int("ACTION_BUFFER_BATCH_SIZE", default=200)
+# How long an `Action` is buffered before the next one triggers a write.
+ACTION_BUFFER_MAX_LATENCY_SECONDS = env.int("ACTION_BUFFER_MAX_LATENCY_SECONDS", default=30)
+
+# Buffered emails and text messages (see `jaspr.apps.common.message_buffer`).
+# The most messages of a channel sent at once, and the number buffered that triggers
+# sending them.
+MESSAGE_BUFFER_BATCH_SIZE = env.int("MESSAGE_BUFFER_BATCH_SIZE", default=100)
+# How long a message is buffered before the next one triggers sending them.
+MESSAGE_BUFFER_MAX_LATENCY_SECONDS = env.int("MESSAGE_BUFFER_MAX_LATENCY_SECONDS", default=30)
+
+# Activity answer history (see `jaspr.apps.kiosk.answer_history`).
+# How long an activity's answers have to go unchanged before the changes are compacted
+# into a historical record.
+ANSWER_HISTORY_COMPACTION_DELAY_SECONDS = env.int(
+    "ANSWER_HISTORY_COMPACTION_DELAY_SECONDS", default=60 * 15
+)
+
+# Failed login counters (see `jaspr.apps.accounts.login_attempts`).
+# The failed logins from one IP address in 15 minutes after which logins from it are
+# refused (0 turns it off). Kiosks in a clinic can share an IP address, so this is well
+# above what a clinic would reach.
+LOGIN_FAILURES_PER_IP_LIMIT = env.int("LOGIN_FAILURES_PER_IP_LIMIT", default=100)
+
+# Query budgets (see `jaspr.apps.common.query_budget`).
+# The fraction of requests to log the query metrics of (0 turns it off).
+QUERY_BUDGET_SAMPLE_RATE = env.float("QUERY_BUDGET_SAMPLE_RATE", default=0.0)
+# Record every request, and raise an error for any over its view's query budget.
+QUERY_BUDGET_STRICT = False
+
 # Deprecated URLs
 # ------------------------------------------------------------------------------
 # Enable the toggling on/off of if deprecated URLs are included or not. Currently
@@ -15,6 +15,14 @@ RQ_QUEUES = {
         # High jobs shouldn't take longer than 30 minutes to run
         "DEFAULT_TIMEOUT": 1800,
     },
+    "notes": {
+        "URL": env("REDIS_URL"),
+        # Default database is 0. Override in local if you want a different one.
+        "DB": 0,
+        # Rendering notes and sending them to the EHR shouldn't take longer than 10
+        # minutes.
+        "DEFAULT_TIMEOUT": 600,
+    },
     "default": {
         "URL": env("REDIS_URL"),
         # Default database is 0. Override in local in if you want a different one.